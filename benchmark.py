@@ -0,0 +1,675 @@
+"""
+أداة قياس أداء المتحكمات والتقارير على قاعدة بيانات (مولّدة بـ generate_data.py)
+النتائج تُحفظ في ملف JSON للمقارنة بين التشغيلات
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from database.connection import db
+from config import DB_POOL_SIZE
+from database.backup import copy_database
+from database.records import SaleItem
+
+# عدد مرات تكرار كل قياس بعد التشغيل الأول (البارد)
+BENCHMARK_REPEAT = 5
+
+# عدد سطور المبيعات في مقارنة تحميلها كقواميس وكسجلات (--records)
+RECORDS_BENCHMARK_LINES = 1000000
+
+# قياس مجمّع الاتصالات (--pool): عدد الاستدعاءات لكل خيط، وعدد الخيوط في الحالة المتزامنة
+# (ضعف DB_POOL_SIZE حتى تنتظر بعض الخيوط اتصالاً يعود للمجمّع)
+POOL_BENCHMARK_CALLS = 2000
+POOL_BENCHMARK_THREADS = 2 * DB_POOL_SIZE
+
+# عدد صفوف قياس الجدول الافتراضي (--table)
+TABLE_BENCHMARK_ROWS = 100000
+TABLE_BENCHMARK_COLUMNS = ('id', 'sale_id', 'product_name', 'quantity', 'total_price')
+
+# الجداول المعروضة في عدد سجلات القاعدة
+COUNTED_TABLES = ('products', 'sales', 'sale_items', 'external_traders',
+                  'customers', 'expenses', 'purchases', 'returns')
+
+SALE_LINES_QUERY = """SELECT si.*, p.name as product_name
+    FROM sale_items si
+    JOIN products p ON si.product_id = p.id
+    ORDER BY si.id
+    LIMIT ?"""
+
+# البحث القديم قبل فهرس FTS5 (للمقارنة معه في قياسات products.search_like_*)
+LIKE_SEARCH_QUERY = """SELECT id FROM products
+    WHERE name LIKE ? OR barcode LIKE ?
+    ORDER BY name"""
+
+
+def like_search(query):
+    """معرفات المنتجات بالبحث القديم: LIKE '%نص%' على الاسم أو الباركود"""
+    pattern = f"%{query}%"
+    return [row['id'] for row in db.fetch_all(LIKE_SEARCH_QUERY, (pattern, pattern))]
+
+
+def get_reference_dates():
+    """تواريخ القياس نسبةً لآخر فاتورة في القاعدة (وليس اليوم) حتى تتطابق التشغيلات"""
+    row = db.fetch_one("SELECT MAX(created_at) as last_sale FROM sales")
+    end = datetime.strptime(row['last_sale'][:10], '%Y-%m-%d') if row['last_sale'] else datetime.now()
+    
+    def back(days):
+        return (end - timedelta(days=days)).strftime('%Y-%m-%d')
+    
+    return {
+        'day': (back(0), back(0)),
+        'month': (back(29), back(0)),
+        'year': (back(364), back(0)),
+    }
+
+
+def build_cases():
+    """قائمة القياسات: (الاسم، الدالة، المعاملات)
+    
+    الاستيراد هنا وليس أعلى الملف حتى تُقرأ القاعدة المختارة (db.configure) أولاً.
+    """
+    from controllers.product_controller import ProductController
+    from controllers.sales_controller import SalesController
+    from controllers.trader_controller import TraderController
+    from controllers.customer_controller import CustomerController
+    from controllers.expense_controller import ExpenseController
+    from controllers.purchase_controller import PurchaseController
+    from controllers.report_engine import ReportEngine
+    from controllers.product_catalog import ProductCatalog
+    
+    dates = get_reference_dates()
+    month, year = dates['month'], dates['year']
+    
+    top_product = db.fetch_one(
+        """SELECT p.id, p.barcode, p.sell_price, p.cost_price FROM products p
+           JOIN sale_items si ON si.product_id = p.id
+           GROUP BY p.id ORDER BY COUNT(*) DESC LIMIT 1"""
+    )
+    last_sale = db.fetch_one("SELECT MAX(id) as id FROM sales")['id']
+    user_id = db.fetch_one("SELECT MIN(id) as id FROM users")['id']
+    trader_id = db.fetch_one("SELECT MIN(id) as id FROM external_traders")['id']
+    customer_id = db.fetch_one("SELECT MIN(customer_id) as id FROM sales")['id']
+    product_ids = [row['id'] for row in db.fetch_all("SELECT id FROM products ORDER BY id LIMIT 20")]
+    
+    # الكتابة: المخزون يكفي دائماً لعمليات البيع المتكررة
+    db.execute("UPDATE products SET stock = 1000000 WHERE id = ?", (top_product['id'],))
+    sale_items = [{'product_id': top_product['id'], 'price': top_product['sell_price'], 'quantity': 1}]
+    purchase_items = [
+        {'product_id': product_id, 'quantity': 5, 'cost_price': 10, 'total': 50}
+        for product_id in product_ids
+    ]
+    
+    return [
+        # المنتجات
+        ('products.get_all_products', ProductController.get_all_products, ()),
+        ('products.search_name', ProductController.get_all_products, ('فلتر زيت',)),
+        ('products.search_product_ids', ProductController.search_product_ids, ('فلتر', 50)),
+        # البحث أثناء الكتابة (50 ألف صنف: generate_data.py --scale production):
+        # الزمن البارد أول ضغطة بالنص، والتكرار من نتائج الكتالوج المحفوظة
+        ('products.search_catalog_1char', ProductController.get_all_products, ('ف',)),
+        ('products.search_catalog_2chars', ProductController.get_all_products, ('فل',)),
+        ('products.search_catalog_word', ProductController.get_all_products, ('فلتر',)),
+        ('products.search_catalog_3words', ProductController.get_all_products, ('فلتر زيت تويوتا',)),
+        ('products.search_catalog_barcode_prefix', ProductController.get_all_products, ('6220000012',)),
+        ('products.match_catalog_1char', ProductController.search_product_ids, ('ف',)),
+        # فهرس FTS5 وحده مقابل البحث القديم بـ LIKE (يمر على كل المنتجات)
+        ('products.search_fts_word', ProductCatalog._match_fts, ('فلتر',)),
+        ('products.search_like_word', like_search, ('فلتر',)),
+        ('products.search_fts_2words', ProductCatalog._match_fts, ('فلتر زيت',)),
+        ('products.search_like_2words', like_search, ('فلتر زيت',)),
+        ('products.search_fts_barcode', ProductCatalog._match_fts, (top_product['barcode'],)),
+        ('products.search_like_barcode', like_search, (top_product['barcode'],)),
+        ('products.get_by_barcode', ProductController.get_product_by_barcode, (top_product['barcode'],)),
+        ('products.get_by_id', ProductController.get_product_by_id, (top_product['id'],)),
+        ('products.low_stock', ProductController.get_low_stock_products, ()),
+        ('products.inventory_value', ProductController.get_total_inventory_value, ()),
+        ('products.categories', ProductController.get_all_categories, ()),
+        # المبيعات
+        ('sales.get_all_sales_month', SalesController.get_all_sales, month),
+        ('sales.get_sale_by_id', SalesController.get_sale_by_id, (last_sale,)),
+        ('sales.summary_month', SalesController.get_sales_summary, month),
+        ('sales.summary_year', SalesController.get_sales_summary, year),
+        ('sales.profit_year', SalesController.calculate_profit, year),
+        ('sales.daily_kpis_month', SalesController.get_daily_kpis, month),
+        ('sales.returns_summary_month', SalesController.get_returns_summary, ('month',)),
+        ('sales.recent_sales_week', SalesController.get_recent_sales, ('week',)),
+        # التجار
+        ('traders.get_all_traders', TraderController.get_all_traders, ()),
+        ('traders.trader_products', TraderController.get_trader_products, (trader_id,)),
+        ('traders.settlements_month', TraderController.compute_settlements, month),
+        ('traders.settlements_year', TraderController.compute_settlements, year),
+        ('traders.settlements_all', TraderController.compute_settlements, ()),
+        ('traders.report_month', TraderController.get_all_traders_report, month),
+        # العملاء والمصروفات والمشتريات
+        ('customers.get_all_customers', CustomerController.get_all_customers, ()),
+        ('customers.purchases', CustomerController.get_customer_purchases, (customer_id,)),
+        ('expenses.get_all_expenses_month', ExpenseController.get_all_expenses, month),
+        ('purchases.get_all_purchases_month', PurchaseController.get_all_purchases, month),
+        # التقارير
+        ('reports.build_report_month', ReportEngine.build_report, month),
+        ('reports.build_report_year', ReportEngine.build_report, year),
+        ('reports.product_sales_month', SalesController.get_product_sales, month),
+        ('reports.product_sales_year', SalesController.get_product_sales, year),
+        ('reports.product_sales_all', SalesController.get_product_sales, ()),
+        # الكتابة
+        ('write.create_sale', SalesController.create_sale, (user_id, sale_items)),
+        ('write.quick_sale', SalesController.create_quick_sale, (user_id, 'خدمة', '50')),
+        ('write.bulk_purchase_20', PurchaseController.process_bulk_purchase, (None, purchase_items, user_id)),
+        ('write.update_product', lambda: ProductController.update_product(top_product['id'], min_stock=5), ()),
+    ]
+
+
+def count_rows(result):
+    """عدد الصفوف في نتيجة دالة (إن كانت قائمة أو مجموعة)"""
+    if isinstance(result, (list, set)):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ('sales', 'products', 'items', 'traders'):
+            if isinstance(result.get(key), list):
+                return len(result[key])
+    return None
+
+
+def run_case(func, args, repeat):
+    """تشغيل قياس واحد: الزمن البارد ثم repeat تكراراً (مللي ثانية)"""
+    started = time.perf_counter()
+    result = func(*args)
+    cold = (time.perf_counter() - started) * 1000
+    
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - started) * 1000)
+    
+    return {
+        'cold_ms': round(cold, 3),
+        'min_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'max_ms': round(max(timings), 3),
+        'rows': count_rows(result)
+    }
+
+
+def get_git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextlib.contextmanager
+def working_copy(db_path):
+    """نسخة مؤقتة من القاعدة تُستخدم في db أثناء القياس ثم تُحذف"""
+    work_dir = tempfile.mkdtemp(prefix='pos_benchmark_')
+    work_path = os.path.join(work_dir, os.path.basename(db_path))
+    copy_database(db_path, work_path, pages=-1, pause=0)
+    
+    try:
+        db.configure(db_name=work_path)
+        yield work_path
+    finally:
+        db.close_all()
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+def get_counts():
+    return {
+        table: db.fetch_one(f"SELECT COUNT(*) as count FROM {table}")['count']
+        for table in COUNTED_TABLES
+    }
+
+
+def run_benchmarks(db_path, repeat=BENCHMARK_REPEAT, only=None):
+    """تشغيل جميع القياسات على نسخة مؤقتة من القاعدة (حتى لا تغيّرها قياسات الكتابة)"""
+    with working_copy(db_path):
+        counts = get_counts()
+        
+        results = []
+        for name, func, args in build_cases():
+            if only and only not in name:
+                continue
+            result = run_case(func, args, repeat)
+            result['name'] = name
+            results.append(result)
+            print(f"   {name:38} {result['median_ms']:10.2f}ms  (بارد {result['cold_ms']:.2f}ms)")
+        
+        return {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': os.path.abspath(db_path),
+            'database_mb': round(os.path.getsize(db_path) / 1024 / 1024, 1),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'storage_profile': db.profile_name,
+            'repeat': repeat,
+            'counts': counts,
+            'results': results
+        }
+
+
+class ConnectPerCall:
+    """الاتصال كما كان قبل المجمّع: sqlite3.connect جديد لكل استدعاء ثم إغلاقه"""
+    
+    def __init__(self, db_path):
+        self.db_path = db_path
+    
+    @contextlib.contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+    
+    def fetch_one(self, query, params=()):
+        with self.get_connection() as conn:
+            return conn.execute(query, params).fetchone()
+    
+    def fetch_all(self, query, params=()):
+        with self.get_connection() as conn:
+            return conn.execute(query, params).fetchall()
+
+
+def build_pool_calls(count=200):
+    """استدعاءات fetch_one/fetch_all قصيرة كالتي تنفذها الشاشات: (الدالة، الاستعلام، المعاملات)"""
+    sales = db.fetch_all("SELECT id, created_at FROM sales ORDER BY id DESC LIMIT ?", (count,))
+    barcodes = [row['barcode'] for row in db.fetch_all(
+        "SELECT barcode FROM products WHERE barcode IS NOT NULL ORDER BY id LIMIT ?", (count,)
+    )]
+    
+    calls = []
+    for sale, barcode in zip(sales, barcodes):
+        day = sale['created_at'][:10]
+        next_day = (datetime.strptime(day, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        calls += [
+            ('fetch_one', "SELECT * FROM products WHERE barcode = ?", (barcode,)),
+            ('fetch_one', "SELECT * FROM sales WHERE id = ?", (sale['id'],)),
+            ('fetch_all', """SELECT si.*, p.name as product_name FROM sale_items si
+                             JOIN products p ON si.product_id = p.id WHERE si.sale_id = ?""", (sale['id'],)),
+            ('fetch_one', """SELECT COUNT(*) as count, COALESCE(SUM(total_amount), 0) as total FROM sales
+                             WHERE created_at >= ? AND created_at < ?""", (day, next_day)),
+        ]
+    return calls
+
+
+def time_calls(backend, calls, per_thread, threads):
+    """تنفيذ per_thread استدعاءً في كل خيط معاً، ويعيد (أزمنة الاستدعاءات بالمللي ثانية، الزمن الكلي)"""
+    timings = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads + 1)
+    
+    def worker(index):
+        own = timings[index]
+        barrier.wait()
+        for number in range(per_thread):
+            method, query, params = calls[(index * 7 + number) % len(calls)]
+            started = time.perf_counter()
+            getattr(backend, method)(query, params)
+            own.append((time.perf_counter() - started) * 1000)
+    
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = (time.perf_counter() - started) * 1000
+    
+    return [ms for own in timings for ms in own], elapsed
+
+
+def run_pool_benchmark(db_path, per_thread=POOL_BENCHMARK_CALLS, threads=POOL_BENCHMARK_THREADS):
+    """مقارنة الاستدعاءات نفسها عبر مجمّع الاتصالات وعبر sqlite3.connect لكل استدعاء
+    
+    في خيط واحد ثم في threads خيطاً متزامناً (يقيس حجز الاتصال من المجمّع وانتظاره).
+    القاعدة المقترحة: generate_data.py --sale-lines 220000 (نحو 100 ألف فاتورة).
+    """
+    with working_copy(db_path) as work_path:
+        counts = get_counts()
+        calls = build_pool_calls()
+        backends = {'pool': db, 'connect': ConnectPerCall(work_path)}
+        
+        results = []
+        for thread_count in (1, threads):
+            for backend_name, backend in backends.items():
+                # تشغيل أولي يفتح اتصالات المجمّع ويملأ ذاكرة الصفحات
+                time_calls(backend, calls, min(per_thread, 50), thread_count)
+                timings, elapsed = time_calls(backend, calls, per_thread, thread_count)
+                timings.sort()
+                result = {
+                    'name': f"pool.{thread_count}_threads.{backend_name}",
+                    'calls': len(timings),
+                    'total_ms': round(elapsed, 1),
+                    'median_ms': round(timings[len(timings) // 2], 4),
+                    'p95_ms': round(timings[int(len(timings) * 0.95)], 4),
+                    'calls_per_second': round(len(timings) / elapsed * 1000)
+                }
+                results.append(result)
+                print(f"   {result['name']:38} {result['median_ms'] * 1000:8.0f}µs/استدعاء  "
+                      f"(p95 {result['p95_ms'] * 1000:.0f}µs، {result['calls_per_second']} استدعاء/ث)")
+        
+        return {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': os.path.abspath(db_path),
+            'database_mb': round(os.path.getsize(db_path) / 1024 / 1024, 1),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'storage_profile': db.profile_name,
+            'pool_size': db.pool_size,
+            'counts': counts,
+            'results': results
+        }
+
+
+def table_formatter(index, record):
+    """تنسيق صف كما تفعل الشاشات: القيم ووسم تلوين بالتناوب"""
+    return [record[column] for column in TABLE_BENCHMARK_COLUMNS], ('odd' if index % 2 else 'even',)
+
+
+def scroll_rows(rows, formatter=table_formatter):
+    """تمرير الجدول من أوله لآخره صفحة شاشة بعد أخرى مع تنسيق الصفوف الظاهرة"""
+    rows.offset = 0
+    screens = 0
+    while True:
+        for i, record in enumerate(rows.window()):
+            formatter(rows.offset + i, record)
+        screens += 1
+        if rows.offset + rows.visible >= len(rows):
+            return screens
+        rows.offset += rows.visible
+
+
+def open_table_widget():
+    """جدول VirtualTreeview حقيقي في نافذة مخفية، أو None بدون customtkinter أو شاشة"""
+    try:
+        import customtkinter as ctk
+        from ui.virtual_table import VirtualTreeview
+        root = ctk.CTk()
+    except Exception as e:
+        print(f"   ⚠️ تخطي قياس VirtualTreeview: {e}")
+        return None
+    
+    root.withdraw()
+    table = VirtualTreeview(root, TABLE_BENCHMARK_COLUMNS, table_formatter, height=25)
+    table.pack(fill="both", expand=True)
+    root.update()
+    return table
+
+
+def scroll_widget(table):
+    """تمرير VirtualTreeview لآخره صفحة شاشة بعد أخرى مع تحديث العرض"""
+    table.rows.offset = 0
+    screens = 0
+    while True:
+        table.scroll(0 if screens == 0 else table.rows.visible)
+        table.update_idletasks()
+        screens += 1
+        if table.rows.offset + table.rows.visible >= len(table):
+            return screens
+
+
+def run_table_benchmark(db_path, rows=TABLE_BENCHMARK_ROWS, repeat=BENCHMARK_REPEAT):
+    """عرض وتمرير rows سطر مبيعات في الجدول الافتراضي
+    
+    الحساب وحده (VirtualRows) يُقاس دائماً، و VirtualTreeview نفسه عند توفر
+    customtkinter وشاشة.
+    """
+    from ui.virtual_rows import ListSource, VirtualRows
+    
+    try:
+        db.configure(db_name=db_path)
+        records = db.fetch_all(SALE_LINES_QUERY, (rows,), record=SaleItem)
+        print(f"   {len(records)} صف")
+        
+        model = VirtualRows(key=lambda record: record['id'], visible=25)
+        
+        def set_model_data():
+            model.set_source(ListSource(records))
+            return model.window()
+        
+        cases = [
+            ('table.rows.set_data', set_model_data, ()),
+            ('table.rows.full_scroll', scroll_rows, (model,)),
+        ]
+        
+        table = open_table_widget()
+        if table is not None:
+            def set_widget_data():
+                table.set_data(records)
+                table.update_idletasks()
+            
+            cases += [
+                ('table.widget.set_data', set_widget_data, ()),
+                ('table.widget.full_scroll', scroll_widget, (table,)),
+            ]
+        
+        results = []
+        try:
+            for name, func, args in cases:
+                result = run_case(func, args, repeat)
+                result['name'] = name
+                results.append(result)
+                print(f"   {name:38} {result['median_ms']:10.2f}ms  (بارد {result['cold_ms']:.2f}ms)")
+        finally:
+            if table is not None:
+                table.winfo_toplevel().destroy()
+        
+        return {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': os.path.abspath(db_path),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'rows': len(records),
+            'visible_rows': model.visible,
+            'repeat': repeat,
+            'results': results
+        }
+    finally:
+        db.close_all()
+
+
+def load_sale_lines(mode, limit):
+    """تحميل سطور المبيعات بإحدى الطرق: dicts (Row ثم dict) أو rows أو records"""
+    if mode == 'records':
+        return db.fetch_all(SALE_LINES_QUERY, (limit,), record=SaleItem)
+    rows = db.fetch_all(SALE_LINES_QUERY, (limit,))
+    if mode == 'dicts':
+        return [dict(row) for row in rows]
+    return rows
+
+
+def measure_loading(mode, limit):
+    """زمن التحميل، ثم ذاكرة بايثون (tracemalloc) المحجوزة للنتيجة وذروتها أثناء التحميل"""
+    gc.collect()
+    started = time.perf_counter()
+    rows = load_sale_lines(mode, limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    count = len(rows)
+    del rows
+    gc.collect()
+    
+    tracemalloc.start()
+    try:
+        rows = load_sale_lines(mode, limit)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del rows
+    
+    return {
+        'mode': mode,
+        'rows': count,
+        'load_ms': round(elapsed, 1),
+        'retained_mb': round(retained / 1024 / 1024, 1),
+        'peak_mb': round(peak / 1024 / 1024, 1),
+        'bytes_per_row': round(retained / count) if count else 0
+    }
+
+
+def run_record_benchmark(db_path, lines=RECORDS_BENCHMARK_LINES):
+    """مقارنة تحميل lines سطر مبيعات كقواميس وكصفوف sqlite3.Row وكسجلات SaleItem (قراءة فقط)"""
+    try:
+        db.configure(db_name=db_path)
+        results = []
+        for mode in ('dicts', 'rows', 'records'):
+            result = measure_loading(mode, lines)
+            results.append(result)
+            print(f"   {mode:8} {result['rows']:>9,} سطر  {result['load_ms']:10.1f}ms  "
+                  f"{result['retained_mb']:8.1f} MB  (ذروة {result['peak_mb']:.1f} MB، "
+                  f"{result['bytes_per_row']} بايت/سطر)")
+        
+        return {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': os.path.abspath(db_path),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'lines': lines,
+            'records': results
+        }
+    finally:
+        db.close_all()
+
+
+def run_import_benchmark(sql_path, repeat=1):
+    """استيراد ملف SQL (generate_data.py --dump) إلى قاعدة جديدة repeat مرة بـ import_data"""
+    from database.migrations import DatabaseMigrations
+    from import_data import import_data_to_database
+    
+    work_dir = tempfile.mkdtemp(prefix='pos_benchmark_')
+    timings = []
+    counts = {}
+    try:
+        for run in range(max(repeat, 1)):
+            work_path = os.path.join(work_dir, f"import_{run}.db")
+            with contextlib.redirect_stdout(io.StringIO()):
+                db.configure(db_name=work_path)
+                DatabaseMigrations.initialize()
+                db.close_all()
+                
+                started = time.perf_counter()
+                ok = import_data_to_database(sql_path, work_path, progress=None)
+                timings.append((time.perf_counter() - started) * 1000)
+            if not ok:
+                raise RuntimeError(f"فشل استيراد {sql_path}")
+            
+            conn = sqlite3.connect(work_path)
+            try:
+                counts = {
+                    table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                    for table in COUNTED_TABLES
+                }
+            finally:
+                conn.close()
+        
+        result = {
+            'name': 'import.sql_dump',
+            'cold_ms': round(timings[0], 3),
+            'min_ms': round(min(timings), 3),
+            'median_ms': round(statistics.median(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'rows': sum(counts.values())
+        }
+        print(f"   {result['name']:38} {result['median_ms']:10.2f}ms  ({result['rows']} سجل)")
+        
+        return {
+            'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'database': os.path.abspath(sql_path),
+            'database_mb': round(os.path.getsize(sql_path) / 1024 / 1024, 1),
+            'git_commit': get_git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'repeat': repeat,
+            'counts': counts,
+            'results': [result]
+        }
+    finally:
+        db.close_all()
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+
+def print_comparison(previous, current):
+    """مقارنة الوسيط لكل قياس مع تشغيل سابق"""
+    before = {result['name']: result for result in previous['results']}
+    print(f"\n📊 مقارنة مع {previous['created_at']} ({previous.get('git_commit') or '-'}):")
+    for result in current['results']:
+        old = before.get(result['name'])
+        if old is None or not old['median_ms']:
+            continue
+        ratio = result['median_ms'] / old['median_ms']
+        marker = '🔺' if ratio > 1.1 else ('🔻' if ratio < 0.9 else '  ')
+        print(f"   {marker} {result['name']:38} {old['median_ms']:10.2f} → {result['median_ms']:10.2f}ms  (×{ratio:.2f})")
+
+
+def main():
+    """أمر القياس: python benchmark.py DB_PATH [--output FILE] [--compare OLD.json] [--records [LINES] | --table [ROWS] | --pool | --import]"""
+    parser = argparse.ArgumentParser(description="قياس أداء المتحكمات والتقارير")
+    parser.add_argument('db_path', help="قاعدة البيانات (لا تتغير: القياس على نسخة مؤقتة)")
+    parser.add_argument('--output', help="ملف النتائج (افتراضياً benchmark_YYYYmmdd_HHMMSS.json)")
+    parser.add_argument('--compare', help="ملف نتائج سابق للمقارنة")
+    parser.add_argument('--repeat', type=int, default=BENCHMARK_REPEAT)
+    parser.add_argument('--only', help="تشغيل القياسات التي يحتوي اسمها على هذا النص فقط")
+    parser.add_argument('--records', type=int, nargs='?', const=RECORDS_BENCHMARK_LINES, metavar='LINES',
+                        help="بدلاً من القياسات: مقارنة زمن وذاكرة تحميل سطور المبيعات كقواميس وكسجلات")
+    parser.add_argument('--table', type=int, nargs='?', const=TABLE_BENCHMARK_ROWS, metavar='ROWS',
+                        help="بدلاً من القياسات: عرض وتمرير ROWS صف في الجدول الافتراضي")
+    parser.add_argument('--pool', action='store_true',
+                        help="بدلاً من القياسات: زمن الاستعلام عبر مجمّع الاتصالات مقابل اتصال جديد لكل استدعاء")
+    parser.add_argument('--import', dest='import_dump', action='store_true',
+                        help="بدلاً من القياسات: db_path ملف SQL (generate_data.py --dump) يُقاس استيراده إلى قاعدة جديدة")
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.db_path):
+        parser.error(f"الملف غير موجود: {args.db_path}")
+    
+    print(f"⏱️ قياس الأداء على {args.db_path}")
+    if args.records:
+        report = run_record_benchmark(args.db_path, args.records)
+    elif args.table:
+        report = run_table_benchmark(args.db_path, args.table, args.repeat)
+    elif args.pool:
+        report = run_pool_benchmark(args.db_path)
+    elif args.import_dump:
+        report = run_import_benchmark(args.db_path, args.repeat)
+    else:
+        report = run_benchmarks(args.db_path, args.repeat, args.only)
+    
+    output = args.output or f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 النتائج: {output}")
+    
+    if args.compare and not args.records:
+        with open(args.compare, encoding='utf-8') as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,99 @@ APP_AUTHOR = "Samir Auto Parts"
 # إعدادات قاعدة البيانات
 DB_NAME = "pos_system.db"
 
+# مجمّع الاتصالات: الحد الأقصى للاتصالات المفتوحة، ومهلة الانتظار، وفترة فحص الاتصالات الخاملة (بالثواني)
+DB_POOL_SIZE = 4
+DB_POOL_TIMEOUT = 10.0
+DB_HEALTH_CHECK_INTERVAL = 60.0
+
+# عدد الصفوف في كل دفعة عند قراءة النتائج الكبيرة تدريجياً (db.fetch_batches / db.iter_query)
+DB_FETCH_BATCH_SIZE = 1000
+
+# ملفات ضبط التخزين (PRAGMA) التي تُطبَّق عند فتح كل اتصال
+# - till: جهاز الكاشير، ذاكرة متوسطة وأولوية لسرعة الكتابة
+# - back-office: جهاز الإدارة، ذاكرة أكبر للتقارير الثقيلة
+# checkpoint_interval: أقصى عدد ثوانٍ بين عمليات دمج ملف WAL في قاعدة البيانات
+DB_STORAGE_PROFILE = "till"
+
+DB_STORAGE_PROFILES = {
+    "till": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,           # 16 ميجابايت
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,           # ميلي ثانية
+        "wal_autocheckpoint": 1000,     # صفحات
+        "journal_size_limit": 64 * 1024 * 1024,
+        "checkpoint_interval": 300
+    },
+    "back-office": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,           # 64 ميجابايت
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+        "wal_autocheckpoint": 2000,
+        "journal_size_limit": 128 * 1024 * 1024,
+        "checkpoint_interval": 600
+    }
+}
+
+# مراقبة الاستعلامات (معطلة افتراضياً، وتُفعَّل من شاشة الإعدادات): الاستعلامات الأبطأ
+# من QUERY_SLOW_MS مللي ثانية تُكتب في QUERY_SLOW_LOG مع خطة تنفيذها، ويُحتفظ بآخر
+# QUERY_STATS_WINDOW زمناً لكل استعلام لحساب النسب المئوية
+QUERY_STATS_ENABLED = False
+QUERY_SLOW_MS = 50
+QUERY_SLOW_LOG = "slow_queries.log"
+QUERY_STATS_WINDOW = 500
+
+# رقم هذا الجهاز (الكاشير) وعدد أرقام الفواتير التي يحجزها دفعة واحدة
+TILL_ID = 1
+INVOICE_BLOCK_SIZE = 50
+
+# كتالوج المنتجات في الذاكرة: أقصى عدد ثوانٍ قبل إعادة تحميله بالكامل
+# (لالتقاط تعديلات الأجهزة الأخرى على نفس قاعدة البيانات)
+CATALOG_REFRESH_INTERVAL = 300
+
+# البحث في الكتالوج من فهرس الكلمات في الذاكرة، إلا إذا طابقت كلمة من نص البحث
+# أكثر من هذا العدد من الكلمات المختلفة (مثل رقم واحد يطابق بدايات كل الباركودات) فمن FTS5
+CATALOG_SEARCH_MAX_WORDS = 2000
+# عدد نتائج البحث المحفوظة في الكتالوج (تُلغى مع أي تعديل على المنتجات)
+CATALOG_SEARCH_CACHE_SIZE = 64
+
+# الشاشات تعيد تحميل بياناتها عند العودة إليها إذا تغيّرت جداولها من هذا الجهاز،
+# أو بعد هذه المدة بالثواني (لالتقاط تعديلات الأجهزة الأخرى)
+VIEW_REFRESH_INTERVAL = 60
+
+# النسخ الاحتياطي: المجلد (بجوار قاعدة البيانات)، وعدد النسخ المحفوظة، والضغط،
+# وعدد الصفحات في كل خطوة نسخ مع استراحة قصيرة بينها (بالثواني) حتى لا يتأثر البيع،
+# وموعد النسخة الليلية (None لإيقافها)
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 14
+BACKUP_COMPRESS = True
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_PAUSE = 0.005
+BACKUP_NIGHTLY_TIME = "02:00"
+
 # إعدادات الواجهة
 WINDOW_SIZE = "1200x700"
 MIN_WINDOW_SIZE = (1024, 600)
 
+# البحث أثناء الكتابة: مهلة الانتظار بعد آخر حرف (مللي ثانية) قبل تنفيذ الاستعلام،
+# وفترة فحص وصول النتائج من خيط البحث
+SEARCH_DEBOUNCE_MS = 200
+SEARCH_POLL_MS = 15
+
+# الشاشات تبقى في الذاكرة بعد أول فتح: الشاشات الدائمة لا تُحذف أبداً،
+# ويُحتفظ بآخر VIEW_CACHE_SIZE من باقي الشاشات (شاشات الإدارة) فقط
+PINNED_VIEWS = ('home', 'pos')
+VIEW_CACHE_SIZE = 3
+
+# التنقل بين الشاشات أبطأ من هذا (مللي ثانية حتى انتهاء رسم الشاشة) يُطبع زمن مراحله
+# (الهدف للعودة لشاشة البيع 50ms، و 0 لطباعة كل تنقل)
+VIEW_SWITCH_SLOW_MS = 50
+
 # الألوان (Light Theme)
 COLORS = {
     "primary": "#1976d2",
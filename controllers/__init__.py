@@ -1,3 +1,6 @@
 """
 متحكمات منطق الأعمال (Controllers)
+
+لا تعتمد على الواجهة (Tkinter): تعيد قواميس وصفوفاً عادية، فيمكن استدعاؤها
+من الشاشات أو من أدوات القياس (benchmark.py) أو من عمليات أخرى.
 """
@@ -2,6 +2,7 @@
 متحكم المصادقة وإدارة المستخدمين
 """
 from database.connection import db
+from controllers.data_versions import data_versions
 from utils.helpers import hash_password, verify_password
 
 
@@ -55,6 +56,7 @@ class AuthController:
                 (username, hashed_pwd, full_name, role)
             )
             
+            data_versions.bump('users')
             return {
                 'success': True,
                 'message': 'تم إضافة المستخدم بنجاح'
@@ -96,6 +98,7 @@ class AuthController:
                 values
             )
             
+            data_versions.bump('users')
             return {'success': True, 'message': 'تم التحديث بنجاح'}
         
         except Exception as e:
@@ -139,6 +142,7 @@ class AuthController:
                 (user_id,)
             )
             
+            data_versions.bump('users')
             return {'success': True, 'message': 'تم حذف المستخدم بنجاح'}
         
         except Exception as e:
@@ -0,0 +1,61 @@
+"""
+متحكم النسخ الاحتياطي
+"""
+import os
+from database import backup
+from database.migrations import DatabaseMigrations
+from controllers.product_catalog import catalog
+from controllers.data_versions import data_versions
+
+
+class BackupController:
+    """متحكم النسخ الاحتياطي والاستعادة
+    
+    العمليات تستغرق وقتاً على قاعدة بيانات كبيرة، لذلك تُستدعى من خيط خلفي
+    (BackgroundStream) وتعيد النتيجة كقاموس كباقي المتحكمات.
+    """
+    
+    @staticmethod
+    def create_backup(compress=backup.BACKUP_COMPRESS, progress=None):
+        """إنشاء نسخة احتياطية الآن"""
+        try:
+            path = backup.create_backup(compress=compress, progress=progress)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            return {
+                'success': True,
+                'message': f'تم إنشاء نسخة احتياطية ({size_mb:.1f} MB)\n{path}',
+                'path': path
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'خطأ: {str(e)}'}
+    
+    @staticmethod
+    def get_backups():
+        """النسخ الاحتياطية الموجودة، الأحدث أولاً"""
+        return [
+            {
+                'path': path,
+                'name': os.path.basename(path),
+                'size': os.path.getsize(path)
+            }
+            for path in backup.list_backups()
+        ]
+    
+    @staticmethod
+    def restore_backup(backup_path, progress=None):
+        """استعادة نسخة احتياطية بعد فحصها
+        
+        بعد الاستعادة يُحدَّث المخطط إذا كانت النسخة من إصدار أقدم، ويُعاد تحميل الكتالوج.
+        """
+        try:
+            safety_path = backup.restore_backup(backup_path, progress=progress)
+            DatabaseMigrations.initialize()
+            data_versions.invalidate_all()
+            catalog.invalidate()
+            return {
+                'success': True,
+                'message': f'تمت استعادة النسخة الاحتياطية بنجاح\nالحالة السابقة محفوظة في:\n{safety_path}',
+                'safety_path': safety_path
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -2,6 +2,7 @@
 متحكم إدارة العملاء
 """
 from database.connection import db
+from controllers.data_versions import data_versions
 
 
 class CustomerController:
@@ -38,6 +39,7 @@ class CustomerController:
                 (name, phone, address, email, notes)
             )
             
+            data_versions.bump('customers')
             return {'success': True, 'message': 'تم إضافة العميل بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -65,6 +67,7 @@ class CustomerController:
                 values
             )
             
+            data_versions.bump('customers')
             return {'success': True, 'message': 'تم تحديث العميل بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -74,6 +77,7 @@ class CustomerController:
         """حذف عميل"""
         try:
             db.execute("DELETE FROM customers WHERE id = ?", (customer_id,))
+            data_versions.bump('customers')
             return {'success': True, 'message': 'تم حذف العميل بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
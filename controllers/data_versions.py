@@ -0,0 +1,43 @@
+"""
+أرقام إصدار الجداول (لتعرف الشاشات هل تغيّرت بياناتها منذ آخر تحميل)
+"""
+import threading
+import time
+from utils.helpers import get_current_date
+from config import VIEW_REFRESH_INTERVAL
+
+
+class DataVersions:
+    """رقم إصدار لكل جدول يزيد مع كل تعديل تنفذه المتحكمات
+    
+    الشاشة تحفظ stamp() للجداول التي تعرضها عند التحميل، وعند العودة إليها لا تعيد
+    التحميل إلا إذا اختلف. الختم يتضمن اليوم الحالي (لأرقام "اليوم") ورقماً يتغير
+    كل VIEW_REFRESH_INTERVAL ثانية حتى تظهر تعديلات الأجهزة الأخرى، كما في الكتالوج.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        
+        # يزيد مع invalidate_all (استعادة نسخة احتياطية: كل الجداول تغيّرت)
+        self._generation = 0
+    
+    def bump(self, *tables):
+        """تسجيل تعديل على جداول"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+    
+    def invalidate_all(self):
+        with self._lock:
+            self._generation += 1
+    
+    def stamp(self, *tables):
+        """ختم حالة الجداول: يختلف إذا عُدّل أحدها أو تغيّر اليوم أو انتهت فترة التحديث"""
+        with self._lock:
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+            generation = self._generation
+        return generation, versions, get_current_date(), int(time.monotonic() // VIEW_REFRESH_INTERVAL)
+
+
+data_versions = DataVersions()
@@ -2,7 +2,10 @@
 متحكم المصروفات
 """
 from database.connection import db
-from utils.helpers import get_current_datetime
+from database.records import Expense
+from controllers.data_versions import data_versions
+from database.rollup import add_to_rollup, get_rollup_totals
+from utils.helpers import get_current_datetime, date_range_filter
 
 
 class ExpenseController:
@@ -12,11 +15,15 @@ class ExpenseController:
     def add_expense(user_id, amount, description, category="عام"):
         """إضافة مصروف"""
         try:
-            db.execute(
-                """INSERT INTO expenses (user_id, amount, description, category, created_at)
-                   VALUES (?, ?, ?, ?, ?)""",
-                (user_id, amount, description, category, get_current_datetime())
-            )
+            created_at = get_current_datetime()
+            with db.transaction() as conn:
+                conn.execute(
+                    """INSERT INTO expenses (user_id, amount, description, category, created_at)
+                       VALUES (?, ?, ?, ?, ?)""",
+                    (user_id, amount, description, category, created_at)
+                )
+                add_to_rollup(conn, created_at, user_id, expenses_count=1, expenses_total=amount)
+            data_versions.bump('expenses')
             return {'success': True, 'message': 'تم إضافة المصروف بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -25,13 +32,15 @@ class ExpenseController:
     def get_all_expenses(start_date=None, end_date=None):
         """الحصول على جميع المصروفات"""
         if start_date and end_date:
+            date_filter, date_params = date_range_filter('e.created_at', start_date, end_date)
             return db.fetch_all(
-                """SELECT e.*, u.full_name as user_name
+                f"""SELECT e.*, u.full_name as user_name
                    FROM expenses e
                    LEFT JOIN users u ON e.user_id = u.id
-                   WHERE DATE(e.created_at) BETWEEN ? AND ?
+                   WHERE {date_filter}
                    ORDER BY e.created_at DESC""",
-                (start_date, end_date)
+                date_params,
+                record=Expense
             )
         else:
             return db.fetch_all(
@@ -39,37 +48,40 @@ class ExpenseController:
                    FROM expenses e
                    LEFT JOIN users u ON e.user_id = u.id
                    ORDER BY e.created_at DESC
-                   LIMIT 100"""
+                   LIMIT 100""",
+                record=Expense
             )
     
     @staticmethod
     def get_today_expenses():
-        """مصروفات اليوم"""
-        result = db.fetch_one(
-            """SELECT SUM(amount) as total, COUNT(*) as count
-               FROM expenses
-               WHERE DATE(created_at) = DATE('now')"""
-        )
+        """مصروفات اليوم (من الملخص اليومي)"""
+        totals = get_rollup_totals()
         return {
-            'total': result['total'] or 0,
-            'count': result['count'] or 0
+            'total': totals['expenses_total'],
+            'count': int(totals['expenses_count'])
         }
     
     @staticmethod
     def get_today_total():
         """إجمالي مصروفات اليوم (للاستخدام السريع)"""
-        result = db.fetch_one(
-            """SELECT SUM(amount) as total
-               FROM expenses
-               WHERE DATE(created_at) = DATE('now')"""
-        )
-        return result['total'] or 0
+        return get_rollup_totals()['expenses_total']
     
     @staticmethod
     def delete_expense(expense_id):
         """حذف مصروف"""
         try:
-            db.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+            with db.transaction() as conn:
+                expense = conn.execute(
+                    "SELECT user_id, amount, created_at FROM expenses WHERE id = ?",
+                    (expense_id,)
+                ).fetchone()
+                conn.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+                if expense:
+                    add_to_rollup(
+                        conn, expense['created_at'], expense['user_id'],
+                        expenses_count=-1, expenses_total=-expense['amount']
+                    )
+            data_versions.bump('expenses')
             return {'success': True, 'message': 'تم حذف المصروف'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -0,0 +1,310 @@
+"""
+ذاكرة مؤقتة لكتالوج المنتجات (للبحث السريع في شاشة نقاط البيع)
+"""
+import bisect
+import threading
+import time
+from itertools import compress
+from database.connection import db
+from utils.helpers import build_fts_query, search_words
+from config import CATALOG_REFRESH_INTERVAL, CATALOG_SEARCH_MAX_WORDS, CATALOG_SEARCH_CACHE_SIZE
+
+# أكبر حرف، لإيجاد نهاية نطاق الكلمات التي تبدأ ببادئة في قائمة مرتبة
+_LAST_CHAR = '\U0010ffff'
+
+
+class ProductCatalog:
+    """كتالوج المنتجات في الذاكرة
+    
+    يحمل جميع المنتجات مرة واحدة مع فهارس ثانوية حسب الباركود والقسم والتاجر،
+    وتقوم المتحكمات التي تعدّل المنتجات بتحديثه جزئياً بدلاً من إعادة تحميله.
+    البحث النصي من فهرس كلمات في الذاكرة (بدايات كلمات الاسم والباركود بعد توحيد
+    الحروف العربية، كما في products_fts)، ولا يُستخدم FTS5 إلا لبادئة تطابق أكثر
+    من CATALOG_SEARCH_MAX_WORDS كلمة مختلفة.
+    """
+    
+    SELECT_PRODUCTS = """SELECT p.*, c.name as category_name,
+                         COALESCE(et.name, 'بدون تاجر') as trader_name
+                         FROM products p
+                         LEFT JOIN categories c ON p.category_id = c.id
+                         LEFT JOIN external_traders et ON p.external_trader_id = et.id"""
+    
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded_at = None
+        
+        # رقم إصدار يزيد مع أي تعديل (لتعرف الشاشات هل تغيّرت المنتجات)
+        self.version = 0
+        
+        self._by_id = {}
+        self._by_barcode = {}
+        self._by_category = {}
+        self._by_trader = {}
+        
+        # فهرس البحث: {كلمة: معرفات المنتجات}، وكلمات كل منتج لحذفه من الفهرس
+        self._by_word = {}
+        self._product_words = {}
+        
+        # الكلمات مرتبة للبحث بالبادئة (تُبنى عند الحاجة بعد إضافة أو حذف كلمة)
+        self._sorted_words = None
+        
+        # معرفات المنتجات مرتبة بالاسم وموضع كل منتج فيها (تُبنى عند الحاجة بعد أي تعديل)
+        self._ordered_ids = None
+        self._positions = None
+        
+        # نتائج آخر عمليات البحث: {(الكلمات، القسم): المنتجات} حتى أي تعديل على المنتجات
+        # (تعديل المخزون لا يلغيها: المنتجات نفسها تتغير في مكانها)
+        self._search_cache = {}
+    
+    def _is_stale(self):
+        """هل يجب إعادة التحميل (أول استخدام أو انتهاء فترة التحديث)"""
+        if self._loaded_at is None:
+            return True
+        return time.monotonic() - self._loaded_at > CATALOG_REFRESH_INTERVAL
+    
+    def _ensure_loaded(self):
+        if self._is_stale():
+            self.reload()
+    
+    def reload(self):
+        """إعادة تحميل الكتالوج بالكامل من قاعدة البيانات"""
+        rows = db.fetch_all(self.SELECT_PRODUCTS)
+        
+        with self._lock:
+            self._by_id.clear()
+            self._by_barcode.clear()
+            self._by_category.clear()
+            self._by_trader.clear()
+            self._by_word.clear()
+            self._product_words.clear()
+            for row in rows:
+                self._put(dict(row))
+            # بناء الترتيب وقائمة الكلمات هنا حتى لا تتحملها أول ضغطة في البحث
+            self._ordered_ids = None
+            self._get_ordered_ids()
+            self._sorted_words = sorted(self._by_word)
+            self._loaded_at = time.monotonic()
+            self.version += 1
+    
+    def invalidate(self):
+        """إلغاء الكتالوج ليُعاد تحميله عند أول استخدام"""
+        with self._lock:
+            self._loaded_at = None
+    
+    def _put(self, product):
+        """إضافة منتج أو استبداله مع تحديث الفهارس الثانوية"""
+        self._drop(product['id'])
+        
+        self._by_id[product['id']] = product
+        if product['barcode']:
+            self._by_barcode[product['barcode']] = product
+        self._by_category.setdefault(product['category_id'], set()).add(product['id'])
+        self._by_trader.setdefault(product['external_trader_id'], set()).add(product['id'])
+        
+        words = set(search_words(product['name']))
+        if product['barcode']:
+            words.update(search_words(product['barcode']))
+        self._product_words[product['id']] = words
+        for word in words:
+            ids = self._by_word.get(word)
+            if ids is None:
+                ids = self._by_word[word] = set()
+                self._sorted_words = None
+            ids.add(product['id'])
+    
+    def _drop(self, product_id):
+        """حذف منتج من جميع الفهارس"""
+        product = self._by_id.pop(product_id, None)
+        if product is None:
+            return
+        
+        if product['barcode'] and self._by_barcode.get(product['barcode']) is product:
+            del self._by_barcode[product['barcode']]
+        self._by_category.get(product['category_id'], set()).discard(product_id)
+        self._by_trader.get(product['external_trader_id'], set()).discard(product_id)
+        
+        for word in self._product_words.pop(product_id, ()):
+            ids = self._by_word[word]
+            ids.discard(product_id)
+            if not ids:
+                del self._by_word[word]
+                self._sorted_words = None
+    
+    def refresh(self, *product_ids):
+        """إعادة قراءة منتجات محددة من قاعدة البيانات بعد تعديلها"""
+        if not product_ids or self._loaded_at is None:
+            return
+        
+        placeholders = ', '.join('?' * len(product_ids))
+        rows = db.fetch_all(
+            f"{self.SELECT_PRODUCTS} WHERE p.id IN ({placeholders})",
+            product_ids
+        )
+        
+        with self._lock:
+            found = set()
+            for row in rows:
+                self._put(dict(row))
+                found.add(row['id'])
+            for product_id in product_ids:
+                if product_id not in found:
+                    self._drop(product_id)
+            self._ordered_ids = None
+            self.version += 1
+    
+    def remove(self, product_id):
+        """حذف منتج من الكتالوج"""
+        with self._lock:
+            self._drop(product_id)
+            self._ordered_ids = None
+            self.version += 1
+    
+    def adjust_stock(self, changes):
+        """تعديل المخزون في الذاكرة دون استعلام (changes: {product_id: الفرق})"""
+        with self._lock:
+            for product_id, delta in changes.items():
+                product = self._by_id.get(product_id)
+                if product is not None:
+                    product['stock'] += delta
+            self.version += 1
+    
+    def get_version(self):
+        """رقم إصدار الكتالوج بعد إعادة تحميله إن انتهت فترة التحديث"""
+        with self._lock:
+            self._ensure_loaded()
+            return self.version
+    
+    def get(self, product_id):
+        """الحصول على منتج بالمعرف"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_id.get(product_id)
+    
+    def get_by_barcode(self, barcode):
+        """الحصول على منتج بالباركود"""
+        with self._lock:
+            self._ensure_loaded()
+            return self._by_barcode.get(barcode)
+    
+    def get_by_trader(self, trader_id):
+        """منتجات تاجر معين"""
+        with self._lock:
+            self._ensure_loaded()
+            return [self._by_id[pid] for pid in self._by_trader.get(trader_id, ())]
+    
+    def _get_ordered_ids(self):
+        """معرفات المنتجات مرتبة بالاسم"""
+        if self._ordered_ids is None:
+            self._search_cache.clear()
+            ordered = sorted(self._by_id.values(), key=lambda p: p['name'])
+            self._ordered_ids = [p['id'] for p in ordered]
+            self._positions = {pid: position for position, pid in enumerate(self._ordered_ids)}
+        
+        return self._ordered_ids
+    
+    def _order_by_name(self, ids):
+        """ترتيب مجموعة معرفات بالاسم (المعرفات غير الموجودة في الكتالوج تُتجاهل)"""
+        ordered = self._get_ordered_ids()
+        positions = self._positions
+        
+        # مجموعة كبيرة: تعليم مواضعها ثم اختيارها من الترتيب كله أسرع من ترتيبها
+        if len(ids) * 8 > len(ordered):
+            flags = bytearray(len(ordered))
+            for pid in ids:
+                position = positions.get(pid)
+                if position is not None:
+                    flags[position] = 1
+            return list(compress(ordered, flags))
+        return sorted((pid for pid in ids if pid in positions), key=positions.__getitem__)
+    
+    def _match_words(self, words):
+        """المعرفات التي تطابق كل كلمة منها بداية كلمة في المنتج، أو None للبحث في FTS5"""
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._by_word)
+        sorted_words = self._sorted_words
+        
+        ranges = []
+        for word in set(words):
+            start = bisect.bisect_left(sorted_words, word)
+            end = bisect.bisect_left(sorted_words, word + _LAST_CHAR, start)
+            if end - start > CATALOG_SEARCH_MAX_WORDS:
+                return None
+            ranges.append((start, end))
+        
+        # الكلمة الأضيق أولاً حتى تصغر المجموعة مبكراً
+        matched = None
+        for start, end in sorted(ranges, key=lambda bounds: bounds[1] - bounds[0]):
+            ids = set().union(*(self._by_word[word] for word in sorted_words[start:end]))
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                break
+        return matched
+    
+    @staticmethod
+    def _match_fts(query):
+        """المعرفات المطابقة لنص البحث من فهرس FTS5"""
+        match = build_fts_query(query)
+        if match is None:
+            return set()
+        return {
+            row['rowid'] for row in
+            db.fetch_all("SELECT rowid FROM products_fts WHERE products_fts MATCH ?", (match,))
+        }
+    
+    def match_ids(self, query, limit=None):
+        """معرفات المنتجات المطابقة لنص البحث مرتبة بالاسم
+        
+        كل كلمة تطابق بداية كلمة في الاسم أو الباركود بعد توحيد الحروف العربية.
+        """
+        words = search_words(query)
+        if not words:
+            return []
+        
+        with self._lock:
+            self._ensure_loaded()
+            matched = self._match_words(words)
+        
+        if matched is None:
+            matched = self._match_fts(query)
+        
+        with self._lock:
+            ids = self._order_by_name(matched)
+        return ids[:limit] if limit else ids
+    
+    def search(self, query="", category_id=None):
+        """البحث بالاسم أو الباركود مع التصفية بالقسم (النتائج مرتبة بالاسم)
+        
+        نتيجة البحث نفسه تُحفظ حتى أول تعديل على المنتجات، فتكرار البحث ببادئة
+        شائعة (حرف أول من اسم صنف) لا يعيد حسابها.
+        """
+        key = (tuple(sorted(set(search_words(query)))), category_id)
+        
+        with self._lock:
+            self._ensure_loaded()
+            self._get_ordered_ids()
+            cached = self._search_cache.get(key)
+            if cached is not None:
+                return list(cached)
+            version = self.version
+        
+        matched = self.match_ids(query) if key[0] else None
+        
+        with self._lock:
+            allowed = self._by_category.get(category_id, set()) if category_id else None
+            ids = self._get_ordered_ids() if matched is None else matched
+            
+            products = [
+                self._by_id[pid] for pid in ids
+                if pid in self._by_id and (allowed is None or pid in allowed)
+            ]
+            
+            # لا تُحفظ نتيجة حُسبت قبل تعديل حدث أثناء البحث في FTS5
+            if self.version == version and self._ordered_ids is not None:
+                if len(self._search_cache) >= CATALOG_SEARCH_CACHE_SIZE:
+                    self._search_cache.pop(next(iter(self._search_cache)))
+                self._search_cache[key] = products
+            return list(products)
+
+
+# نسخة واحدة مشتركة في جميع أنحاء التطبيق
+catalog = ProductCatalog()
@@ -2,41 +2,34 @@
 متحكم إدارة المنتجات
 """
 from database.connection import db
+from database.records import Product
+from controllers.product_catalog import catalog
 from utils.helpers import get_current_datetime
 
 
 class ProductController:
     """متحكم المنتجات"""
     
+    # عدد قيم IN في كل استعلام عند مراجعة باركودات الإضافة المجمعة
+    BULK_CHUNK_SIZE = 500
+    
     @staticmethod
     def get_all_products(search_query="", category_id=None):
-        """الحصول على جميع المنتجات مع إمكانية التصفية بالقسم"""
-        base_query = """SELECT p.*, c.name as category_name, 
-                       COALESCE(et.name, 'بدون تاجر') as trader_name
-                       FROM products p
-                       LEFT JOIN categories c ON p.category_id = c.id
-                       LEFT JOIN external_traders et ON p.external_trader_id = et.id"""
-        
-        conditions = []
-        params = []
-        
-        # إضافة شرط البحث النصي
-        if search_query:
-            conditions.append("(p.name LIKE ? OR p.barcode LIKE ?)")
-            params.extend([f"%{search_query}%", f"%{search_query}%"])
-        
-        # إضافة شرط التصفية بالقسم
-        if category_id:
-            conditions.append("p.category_id = ?")
-            params.append(category_id)
-        
-        # بناء الاستعلام النهائي
-        if conditions:
-            query = f"{base_query} WHERE {' AND '.join(conditions)} ORDER BY p.name"
-        else:
-            query = f"{base_query} ORDER BY p.name"
+        """الحصول على جميع المنتجات مع إمكانية التصفية بالقسم (من كتالوج الذاكرة)
         
-        return db.fetch_all(query, params)
+        نص البحث يُطابَق في فهرس كلمات الكتالوج (أو FTS5 للبادئات الواسعة) وتُرتب النتائج بالاسم.
+        """
+        return catalog.search(search_query, category_id)
+    
+    @staticmethod
+    def get_catalog_version():
+        """رقم إصدار كتالوج المنتجات (يتغير مع أي تعديل على المنتجات)"""
+        return catalog.get_version()
+    
+    @staticmethod
+    def search_product_ids(search_query, limit=None):
+        """معرفات المنتجات المطابقة لنص البحث (بادئة الكلمات، مع توحيد الحروف العربية)"""
+        return catalog.match_ids(search_query, limit)
     
     @staticmethod
     def get_product_by_id(product_id):
@@ -50,16 +43,14 @@ class ProductController:
                LEFT JOIN suppliers s ON p.supplier_id = s.id
                LEFT JOIN external_traders et ON p.external_trader_id = et.id
                WHERE p.id = ?""",
-            (product_id,)
+            (product_id,),
+            record=Product
         )
     
     @staticmethod
     def get_product_by_barcode(barcode):
         """الحصول على منتج بالباركود"""
-        return db.fetch_one(
-            "SELECT * FROM products WHERE barcode = ?",
-            (barcode,)
-        )
+        return catalog.get_by_barcode(barcode)
     
     @staticmethod
     def add_product(data):
@@ -74,21 +65,108 @@ class ProductController:
                 if existing:
                     return {'success': False, 'message': 'الباركود موجود بالفعل'}
             
-            db.execute(
-                """INSERT INTO products 
-                   (name, category_id, sell_price, cost_price, stock, barcode, 
-                    description, supplier_id, external_trader_id, min_stock)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (data['name'], data['category_id'], data['sell_price'], 
-                 data['cost_price'], data.get('stock', 0), data.get('barcode') or None,
-                 data.get('description', ''), data.get('supplier_id'), 
-                 data.get('external_trader_id'), data.get('min_stock', 5))
-            )
+            with db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """INSERT INTO products 
+                       (name, category_id, sell_price, cost_price, stock, barcode, 
+                        description, supplier_id, external_trader_id, min_stock)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (data['name'], data['category_id'], data['sell_price'], 
+                     data['cost_price'], data.get('stock', 0), data.get('barcode') or None,
+                     data.get('description', ''), data.get('supplier_id'), 
+                     data.get('external_trader_id'), data.get('min_stock', 5))
+                )
+                product_id = cursor.lastrowid
+            
+            catalog.refresh(product_id)
             
             return {'success': True, 'message': 'تم إضافة المنتج بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
     
+    @staticmethod
+    def add_products_bulk(products):
+        """إضافة مجموعة منتجات دفعة واحدة (استيراد كتالوج مورد)
+        
+        الباركود يُراجع مع الجدول (باستعلامات IN على دفعات) ومع باقي السطور في مرور واحد،
+        ثم تُدرج السطور الصالحة بـ executemany في معاملة واحدة. السطور المرفوضة لا تمنع
+        إضافة الباقي، وتُعاد في 'errors' مع رقم السطر (يبدأ من 1) وسبب الرفض.
+        """
+        try:
+            errors = []
+            valid = []
+            
+            with db.transaction(immediate=True) as conn:
+                # الباركودات الموجودة مسبقاً من بين باركودات الدفعة
+                barcodes = list({data['barcode'] for data in products if data.get('barcode')})
+                existing = set()
+                for start in range(0, len(barcodes), ProductController.BULK_CHUNK_SIZE):
+                    chunk = barcodes[start:start + ProductController.BULK_CHUNK_SIZE]
+                    placeholders = ', '.join('?' * len(chunk))
+                    existing.update(
+                        row['barcode'] for row in conn.execute(
+                            f"SELECT barcode FROM products WHERE barcode IN ({placeholders})",
+                            chunk
+                        )
+                    )
+                
+                seen = {}
+                for index, data in enumerate(products, 1):
+                    barcode = data.get('barcode') or None
+                    
+                    if not str(data.get('name') or '').strip():
+                        message = 'اسم المنتج مطلوب'
+                    elif barcode in existing:
+                        message = 'الباركود موجود بالفعل'
+                    elif barcode in seen:
+                        message = f'الباركود مكرر مع السطر {seen[barcode]}'
+                    else:
+                        message = None
+                    
+                    if message:
+                        errors.append({
+                            'row': index,
+                            'name': data.get('name'),
+                            'barcode': barcode,
+                            'message': message
+                        })
+                        continue
+                    
+                    if barcode:
+                        seen[barcode] = index
+                    valid.append(
+                        (data['name'], data['category_id'], data['sell_price'],
+                         data['cost_price'], data.get('stock', 0), barcode,
+                         data.get('description', ''), data.get('supplier_id'),
+                         data.get('external_trader_id'), data.get('min_stock', 5))
+                    )
+                
+                conn.executemany(
+                    """INSERT INTO products 
+                       (name, category_id, sell_price, cost_price, stock, barcode, 
+                        description, supplier_id, external_trader_id, min_stock)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    valid
+                )
+            
+            # المنتجات الجديدة كثيرة: إعادة تحميل الكتالوج عند أول استخدام
+            if valid:
+                catalog.invalidate()
+            
+            message = f'تم إضافة {len(valid)} منتج'
+            if errors:
+                message += f' - فشل {len(errors)} منتج'
+            
+            return {
+                'success': bool(valid) or not errors,
+                'message': message,
+                'added': len(valid),
+                'errors': errors
+            }
+        except Exception as e:
+            return {'success': False, 'message': f'خطأ: {str(e)}', 'added': 0, 'errors': []}
+    
     @staticmethod
     def update_product(product_id, **kwargs):
         """تحديث منتج"""
@@ -114,6 +192,8 @@ class ProductController:
                 values
             )
             
+            catalog.refresh(product_id)
+            
             return {'success': True, 'message': 'تم تحديث المنتج بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -123,33 +203,42 @@ class ProductController:
         """حذف منتج"""
         try:
             db.execute("DELETE FROM products WHERE id = ?", (product_id,))
+            catalog.remove(product_id)
             return {'success': True, 'message': 'تم حذف المنتج بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
     
     @staticmethod
     def update_stock(product_id, quantity, operation='add'):
-        """تحديث المخزون"""
+        """تحديث المخزون (add / subtract نسبياً، وغيرهما يضبط القيمة)
+        
+        التعديل جملة UPDATE واحدة في معاملة BEGIN IMMEDIATE فلا يضيع تعديل جهاز
+        آخر بين القراءة والكتابة، والكتالوج يُحدَّث بعد حفظها.
+        """
         try:
-            product = ProductController.get_product_by_id(product_id)
-            if not product:
-                return {'success': False, 'message': 'المنتج غير موجود'}
-            
-            current_stock = product['stock']
-            
-            if operation == 'add':
-                new_stock = current_stock + quantity
-            elif operation == 'subtract':
-                if current_stock < quantity:
+            with db.transaction(immediate=True) as conn:
+                if operation == 'add':
+                    cursor = conn.execute(
+                        "UPDATE products SET stock = stock + ? WHERE id = ?", (quantity, product_id)
+                    )
+                elif operation == 'subtract':
+                    cursor = conn.execute(
+                        "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                        (quantity, product_id, quantity)
+                    )
+                else:
+                    cursor = conn.execute(
+                        "UPDATE products SET stock = ? WHERE id = ?", (quantity, product_id)
+                    )
+                
+                row = conn.execute("SELECT stock FROM products WHERE id = ?", (product_id,)).fetchone()
+                if not row:
+                    return {'success': False, 'message': 'المنتج غير موجود'}
+                if not cursor.rowcount:
                     return {'success': False, 'message': 'المخزون غير كافي'}
-                new_stock = current_stock - quantity
-            else:
-                new_stock = quantity
+                new_stock = row['stock']
             
-            db.execute(
-                "UPDATE products SET stock = ? WHERE id = ?",
-                (new_stock, product_id)
-            )
+            catalog.refresh(product_id)
             
             return {'success': True, 'new_stock': new_stock}
         except Exception as e:
@@ -159,16 +248,20 @@ class ProductController:
     def get_low_stock_products():
         """الحصول على المنتجات منخفضة المخزون"""
         return db.fetch_all(
-            "SELECT * FROM products WHERE stock <= min_stock ORDER BY stock"
+            "SELECT * FROM products WHERE stock <= min_stock ORDER BY stock",
+            record=Product
         )
     
     @staticmethod
     def get_total_inventory_value():
-        """حساب إجمالي قيمة المخزون"""
+        """حساب إجمالي قيمة المخزون وعدد الأصناف"""
         result = db.fetch_one(
-            "SELECT SUM(stock * cost_price) as total_cost, SUM(stock * sell_price) as total_sell FROM products"
+            """SELECT COUNT(*) as items_count, SUM(stock * cost_price) as total_cost,
+                      SUM(stock * sell_price) as total_sell
+               FROM products"""
         )
         return {
+            'items_count': result['items_count'],
             'total_cost': result['total_cost'] or 0,
             'total_sell': result['total_sell'] or 0,
             'expected_profit': (result['total_sell'] or 0) - (result['total_cost'] or 0)
@@ -178,3 +271,15 @@ class ProductController:
     def get_all_categories():
         """الحصول على جميع الأقسام"""
         return db.fetch_all("SELECT * FROM categories ORDER BY name")
+    
+    @staticmethod
+    def get_form_options():
+        """القوائم المساعدة لنماذج المنتج: الأقسام والموردون والتجار"""
+        from controllers.purchase_controller import PurchaseController
+        from controllers.trader_controller import TraderController
+        
+        return {
+            'categories': ProductController.get_all_categories(),
+            'suppliers': PurchaseController.get_suppliers(),
+            'traders': TraderController.get_all_traders()
+        }
@@ -2,8 +2,11 @@
 متحكم المشتريات
 """
 from database.connection import db
-from utils.helpers import get_current_datetime
-from controllers.product_controller import ProductController
+from database.records import Purchase
+from database.rollup import add_to_rollup, get_rollup_totals
+from utils.helpers import get_current_datetime, date_range_filter
+from controllers.product_catalog import catalog
+from controllers.data_versions import data_versions
 
 
 class PurchaseController:
@@ -11,26 +14,40 @@ class PurchaseController:
     
     @staticmethod
     def add_purchase(product_id, quantity, cost_price, supplier_id=None, invoice_number="", notes=""):
-        """إضافة مشترى جديد"""
+        """إضافة مشترى جديد
+        
+        المخزون يُزاد نسبياً (stock = stock + ?) مع المشترى والملخص اليومي في معاملة
+        BEGIN IMMEDIATE واحدة، والكتالوج يُحدَّث بعد حفظها فقط.
+        """
         try:
             total_amount = quantity * cost_price
+            created_at = get_current_datetime()
             
-            # إضافة المشترى
-            db.execute(
-                """INSERT INTO purchases 
-                   (supplier_id, product_id, quantity, cost_price, total_amount, 
-                    invoice_number, notes, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (supplier_id, product_id, quantity, cost_price, total_amount,
-                 invoice_number, notes, get_current_datetime())
-            )
-            
-            # تحديث المخزون
-            result = ProductController.update_stock(product_id, quantity, 'add')
-            
-            if not result['success']:
-                return result
+            with db.transaction(immediate=True) as conn:
+                # تحديث المخزون
+                updated = conn.execute(
+                    "UPDATE products SET stock = stock + ? WHERE id = ?",
+                    (quantity, product_id)
+                ).rowcount
+                if not updated:
+                    conn.rollback()
+                    return {'success': False, 'message': 'المنتج غير موجود'}
+                
+                # إضافة المشترى
+                conn.execute(
+                    """INSERT INTO purchases 
+                       (supplier_id, product_id, quantity, cost_price, total_amount, 
+                        invoice_number, notes, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (supplier_id, product_id, quantity, cost_price, total_amount,
+                     invoice_number, notes, created_at)
+                )
+                
+                add_to_rollup(conn, created_at, purchases_count=1, purchases_total=total_amount)
             
+            # تحديث مخزون الكتالوج بعد حفظ المعاملة
+            catalog.adjust_stock({product_id: quantity})
+            data_versions.bump('purchases')
             return {'success': True, 'message': 'تم إضافة المشترى بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -39,15 +56,17 @@ class PurchaseController:
     def get_all_purchases(start_date=None, end_date=None, limit=100):
         """الحصول على جميع المشتريات"""
         if start_date and end_date:
+            date_filter, date_params = date_range_filter('p.created_at', start_date, end_date)
             return db.fetch_all(
-                """SELECT p.*, pr.name as product_name, s.name as supplier_name
+                f"""SELECT p.*, pr.name as product_name, s.name as supplier_name
                    FROM purchases p
                    LEFT JOIN products pr ON p.product_id = pr.id
                    LEFT JOIN suppliers s ON p.supplier_id = s.id
-                   WHERE DATE(p.created_at) BETWEEN ? AND ?
+                   WHERE {date_filter}
                    ORDER BY p.created_at DESC
                    LIMIT ?""",
-                (start_date, end_date, limit)
+                (*date_params, limit),
+                record=Purchase
             )
         else:
             return db.fetch_all(
@@ -57,45 +76,55 @@ class PurchaseController:
                    LEFT JOIN suppliers s ON p.supplier_id = s.id
                    ORDER BY p.created_at DESC
                    LIMIT ?""",
-                (limit,)
+                (limit,),
+                record=Purchase
             )
     
     @staticmethod
     def get_today_purchases():
-        """مشتريات اليوم"""
-        result = db.fetch_one(
-            """SELECT SUM(total_amount) as total, COUNT(*) as count
-               FROM purchases
-               WHERE DATE(created_at) = DATE('now')"""
-        )
+        """مشتريات اليوم (من الملخص اليومي)"""
+        totals = get_rollup_totals()
         return {
-            'total': result['total'] or 0,
-            'count': result['count'] or 0
+            'total': totals['purchases_total'],
+            'count': int(totals['purchases_count'])
         }
     
     @staticmethod
     def delete_purchase(purchase_id):
-        """حذف مشترى"""
+        """حذف مشترى (يُرفض إذا لم يعد المخزون يكفي لخصم كميته)"""
         try:
-            # الحصول على بيانات المشترى
-            purchase = db.fetch_one(
-                "SELECT * FROM purchases WHERE id = ?",
-                (purchase_id,)
-            )
-            
-            if not purchase:
-                return {'success': False, 'message': 'المشترى غير موجود'}
-            
-            # تقليل المخزون
-            ProductController.update_stock(
-                purchase['product_id'], 
-                purchase['quantity'], 
-                'subtract'
-            )
-            
-            # حذف المشترى
-            db.execute("DELETE FROM purchases WHERE id = ?", (purchase_id,))
+            with db.transaction(immediate=True) as conn:
+                # الحصول على بيانات المشترى
+                purchase = conn.execute(
+                    "SELECT * FROM purchases WHERE id = ?",
+                    (purchase_id,)
+                ).fetchone()
+                
+                if not purchase:
+                    return {'success': False, 'message': 'المشترى غير موجود'}
+                
+                # تقليل المخزون نسبياً بشرط كفايته
+                updated = conn.execute(
+                    "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                    (purchase['quantity'], purchase['product_id'], purchase['quantity'])
+                ).rowcount
+                if not updated:
+                    conn.rollback()
+                    exists = conn.execute(
+                        "SELECT 1 FROM products WHERE id = ?", (purchase['product_id'],)
+                    ).fetchone()
+                    message = 'المخزون غير كافي لحذف المشترى' if exists else 'المنتج غير موجود'
+                    return {'success': False, 'message': message}
+                
+                # حذف المشترى
+                conn.execute("DELETE FROM purchases WHERE id = ?", (purchase_id,))
+                add_to_rollup(
+                    conn, purchase['created_at'],
+                    purchases_count=-1, purchases_total=-purchase['total_amount']
+                )
             
+            catalog.adjust_stock({purchase['product_id']: -purchase['quantity']})
+            data_versions.bump('purchases')
             return {'success': True, 'message': 'تم حذف المشترى'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -114,46 +143,101 @@ class PurchaseController:
                    VALUES (?, ?, ?, ?, ?)""",
                 (name, phone, company, address, email)
             )
+            data_versions.bump('suppliers')
             return {'success': True, 'message': 'تم إضافة المورد بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
     
     @staticmethod
     def process_bulk_purchase(supplier_id, items, user_id=None):
-        """معالجة عملية شراء متعددة المنتجات"""
+        """معالجة عملية شراء متعددة المنتجات
+        
+        تُراجع كل السطور أولاً (وجود المنتج والكمية والسعر)، فإذا كان أي سطر غير صالح
+        لا يُسجَّل شيء. غير ذلك تُكتب السطور دفعة واحدة (executemany) ويُزاد المخزون
+        نسبياً والملخص اليومي في معاملة واحدة. النتيجة تشمل نتيجة كل سطر في 'lines'.
+        """
         try:
             if not items:
-                return {'success': False, 'message': 'لا توجد منتجات للشراء'}
+                return {'success': False, 'message': 'لا توجد منتجات للشراء', 'lines': []}
             
-            total_cost = 0
             invoice_number = f"BULK-{get_current_datetime().replace(':', '').replace(' ', '-')}"
+            created_at = get_current_datetime()
             
-            for item in items:
-                product_id = item['product_id']
-                quantity = item['quantity']
-                cost_price = item['cost_price']
-                total_amount = item['total']
+            with db.transaction(immediate=True) as conn:
+                # المنتجات الموجودة من السطور باستعلام واحد
+                product_ids = {item['product_id'] for item in items}
+                placeholders = ', '.join('?' * len(product_ids))
+                existing = {
+                    row['id'] for row in conn.execute(
+                        f"SELECT id FROM products WHERE id IN ({placeholders})",
+                        tuple(product_ids)
+                    )
+                }
                 
-                # إضافة المشترى
-                db.execute(
+                # مراجعة السطور
+                lines = []
+                for item in items:
+                    line = {
+                        'product_id': item['product_id'],
+                        'quantity': item['quantity'],
+                        'total': item['total'],
+                        'success': True,
+                        'message': 'تم'
+                    }
+                    if item['product_id'] not in existing:
+                        line.update(success=False, message='المنتج غير موجود')
+                    elif item['quantity'] <= 0:
+                        line.update(success=False, message='الكمية غير صحيحة')
+                    elif item['cost_price'] < 0:
+                        line.update(success=False, message='سعر الشراء غير صحيح')
+                    lines.append(line)
+                
+                failed = [index for index, line in enumerate(lines, 1) if not line['success']]
+                if failed:
+                    conn.rollback()
+                    details = '، '.join(f"سطر {index}: {lines[index - 1]['message']}" for index in failed[:5])
+                    return {
+                        'success': False,
+                        'message': f'لم يتم الشراء ({len(failed)} سطر غير صالح) - {details}',
+                        'lines': lines
+                    }
+                
+                # إضافة سطور الشراء دفعة واحدة
+                conn.executemany(
                     """INSERT INTO purchases 
                        (supplier_id, product_id, quantity, cost_price, total_amount, 
                         invoice_number, notes, created_at)
                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (supplier_id, product_id, quantity, cost_price, total_amount,
-                     invoice_number, "عملية شراء متعددة", get_current_datetime())
+                    [(supplier_id, item['product_id'], item['quantity'], item['cost_price'],
+                      item['total'], invoice_number, "عملية شراء متعددة", created_at)
+                     for item in items]
                 )
                 
-                # تحديث المخزون
-                result = ProductController.update_stock(product_id, quantity, 'add')
-                if not result['success']:
-                    return result
+                # زيادة المخزون نسبياً (المنتج المكرر في أكثر من سطر يُجمع)
+                added = {}
+                for item in items:
+                    added[item['product_id']] = added.get(item['product_id'], 0) + item['quantity']
+                conn.executemany(
+                    "UPDATE products SET stock = stock + ? WHERE id = ?",
+                    [(quantity, product_id) for product_id, quantity in added.items()]
+                )
                 
-                total_cost += total_amount
+                total_cost = sum(item['total'] for item in items)
+                add_to_rollup(
+                    conn, created_at,
+                    purchases_count=len(items), purchases_total=total_cost
+                )
+            
+            # تحديث مخزون الكتالوج بعد حفظ المعاملة
+            catalog.adjust_stock(added)
+            data_versions.bump('purchases')
             
             return {
                 'success': True, 
-                'message': f'تم شراء {len(items)} منتج بنجاح - الإجمالي: {total_cost:,.2f} جنيه'
+                'message': f'تم شراء {len(items)} منتج بنجاح - الإجمالي: {total_cost:,.2f} جنيه',
+                'invoice_number': invoice_number,
+                'total': total_cost,
+                'lines': lines
             }
         except Exception as e:
-            return {'success': False, 'message': f'خطأ: {str(e)}'}
+            return {'success': False, 'message': f'خطأ: {str(e)}', 'lines': []}
@@ -0,0 +1,140 @@
+"""
+محرك التقارير: جمع مؤشرات الفترة بأقل عدد من الاستعلامات
+"""
+from database.connection import db
+from controllers.product_controller import ProductController
+from utils.helpers import get_day_bounds
+
+
+class ReportEngine:
+    """محرك تقارير الفترات
+    
+    كل قسم يُحسب باستعلام واحد يمر على نطاق التاريخ مرة واحدة:
+    - sales: إحصائيات الفواتير من فهرس created_at
+    - profit: الأرباح لكل تاجر من عناصر الفواتير (ومجموعها هو الربح الكلي)
+    - cash: المصروفات والمشتريات في جملة واحدة
+    - inventory: قيمة المخزون وعدد الأصناف (بدون جلب المنتجات)
+    
+    iter_report يعيد الأقسام واحداً تلو الآخر حتى تعرضها الشاشة فور جاهزيتها.
+    """
+    
+    SECTIONS = ('sales', 'profit', 'cash', 'inventory')
+    
+    @staticmethod
+    def sales_section(start_date, end_date):
+        """إحصائيات المبيعات للفترة"""
+        result = db.fetch_one(
+            """SELECT
+                COUNT(*) as total_sales,
+                COALESCE(SUM(total_amount), 0) as total_revenue,
+                COALESCE(AVG(total_amount), 0) as avg_sale,
+                COALESCE(MAX(total_amount), 0) as max_sale,
+                COALESCE(MIN(total_amount), 0) as min_sale
+               FROM sales
+               WHERE created_at >= ? AND created_at < ?""",
+            get_day_bounds(start_date, end_date)
+        )
+        return dict(result)
+    
+    @staticmethod
+    def profit_section(start_date, end_date):
+        """الأرباح الكلية وأرباح التجار الخارجيين للفترة في مرور واحد على عناصر الفواتير"""
+        rows = db.fetch_all(
+            """SELECT p.external_trader_id as trader_id,
+                      et.shop_percentage, et.trader_percentage,
+                      COUNT(DISTINCT s.id) as sales_count,
+                      SUM((si.price_at_sale - si.cost_at_sale) * si.quantity) as total_profit
+               FROM sales s
+               JOIN sale_items si ON si.sale_id = s.id
+               LEFT JOIN products p ON p.id = si.product_id
+               LEFT JOIN external_traders et ON et.id = p.external_trader_id
+               WHERE s.created_at >= ? AND s.created_at < ?
+               GROUP BY p.external_trader_id""",
+            get_day_bounds(start_date, end_date)
+        )
+        
+        section = {
+            'profit': 0,
+            'traders_sales': 0,
+            'traders_profit': 0,
+            'shop_share': 0,
+            'trader_share': 0
+        }
+        
+        for row in rows:
+            profit = row['total_profit'] or 0
+            section['profit'] += profit
+            
+            # التجار الخارجيون فقط، وبأرباح موجبة (كما في تقرير التجار)
+            if row['shop_percentage'] is None or profit <= 0:
+                continue
+            section['traders_sales'] += row['sales_count']
+            section['traders_profit'] += profit
+            section['shop_share'] += profit * (row['shop_percentage'] / 100)
+            section['trader_share'] += profit * (row['trader_percentage'] / 100)
+        
+        return section
+    
+    @staticmethod
+    def cash_section(start_date, end_date):
+        """المصروفات والمشتريات للفترة في جملة واحدة"""
+        bounds = get_day_bounds(start_date, end_date)
+        result = db.fetch_one(
+            """SELECT e.*, pu.* FROM
+               (SELECT COUNT(*) as expenses_count,
+                       COALESCE(SUM(amount), 0) as expenses_total,
+                       COALESCE(AVG(amount), 0) as avg_expense,
+                       COALESCE(MAX(amount), 0) as max_expense
+                FROM expenses
+                WHERE created_at >= ? AND created_at < ?) e,
+               (SELECT COUNT(*) as purchases_count,
+                       COALESCE(SUM(total_amount), 0) as purchases_total,
+                       COALESCE(SUM(quantity), 0) as purchases_quantity,
+                       COALESCE(AVG(cost_price), 0) as avg_cost
+                FROM purchases
+                WHERE created_at >= ? AND created_at < ?) pu""",
+            bounds + bounds
+        )
+        return dict(result)
+    
+    @staticmethod
+    def inventory_section():
+        """ملخص المخزون"""
+        return ProductController.get_total_inventory_value()
+    
+    @staticmethod
+    def summary(sales, profit, cash):
+        """الملخص السريع من الأقسام: صافي الربح (الربح - المصروفات) وهامش الربح"""
+        revenue = sales['total_revenue']
+        net_profit = profit['profit'] - cash['expenses_total']
+        return {
+            'sales_count': sales['total_sales'],
+            'revenue': revenue,
+            'expenses': cash['expenses_total'],
+            'net_profit': net_profit,
+            'profit_margin': (net_profit / revenue * 100) if revenue > 0 else 0
+        }
+    
+    @staticmethod
+    def table_counts(tables=('users', 'products', 'customers', 'external_traders',
+                             'sales', 'categories', 'expenses')):
+        """عدد السجلات في جداول قاعدة البيانات في جملة واحدة"""
+        row = db.fetch_one(
+            "SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {table}) as {table}" for table in tables)
+        )
+        return dict(row)
+    
+    @staticmethod
+    def iter_report(start_date, end_date):
+        """حساب أقسام التقرير بالترتيب، ويعيد (اسم القسم، البيانات) لكل قسم"""
+        yield 'sales', ReportEngine.sales_section(start_date, end_date)
+        yield 'profit', ReportEngine.profit_section(start_date, end_date)
+        yield 'cash', ReportEngine.cash_section(start_date, end_date)
+        yield 'inventory', ReportEngine.inventory_section()
+    
+    @staticmethod
+    def build_report(start_date, end_date):
+        """جميع أقسام التقرير دفعة واحدة (مع الملخص في 'summary')"""
+        report = dict(ReportEngine.iter_report(start_date, end_date))
+        report['summary'] = ReportEngine.summary(report['sales'], report['profit'], report['cash'])
+        return report
@@ -1,9 +1,25 @@
 """
 متحكم إدارة المبيعات
 """
+import csv
 from database.connection import db
-from utils.helpers import generate_invoice_number, get_current_datetime, calculate_trader_share
-from controllers.product_controller import ProductController
+from database.records import Sale, SaleItem
+from database.sequences import invoice_numbers
+from database.rollup import add_to_rollup, get_rollup_totals
+from database.product_sales import add_product_sales, get_product_sales, get_sale_totals
+from controllers.product_catalog import catalog
+from controllers.data_versions import data_versions
+from utils.helpers import (
+    get_current_datetime, calculate_trader_share,
+    date_range_filter, get_period_bounds
+)
+
+
+# أعمدة ملف تصدير سطور المبيعات
+SALE_LINES_EXPORT_HEADERS = (
+    'رقم الفاتورة', 'التاريخ', 'المنتج', 'الباركود', 'الكمية', 'سعر البيع',
+    'سعر التكلفة', 'الإجمالي', 'طريقة الدفع', 'العميل', 'المستخدم'
+)
 
 
 class SalesController:
@@ -11,7 +27,11 @@ class SalesController:
     
     @staticmethod
     def create_sale(user_id, items, customer_id=None, discount=0, payment_method='نقدي', notes=""):
-        """إنشاء عملية بيع جديدة"""
+        """إنشاء عملية بيع جديدة
+        
+        تتم العملية كاملة في معاملة واحدة (BEGIN IMMEDIATE): جلب منتجات السلة باستعلام واحد،
+        وإدراج عناصر الفاتورة دفعة واحدة، وخصم المخزون بشرط كفايته، وتحديث الملخص اليومي
+        """
         try:
             # حساب الإجمالي
             total_amount = 0
@@ -23,76 +43,175 @@ class SalesController:
             if total_amount <= 0:
                 return {'success': False, 'message': 'المبلغ الإجمالي غير صحيح'}
             
-            # توليد رقم فاتورة
-            invoice_number = generate_invoice_number()
+            # الكمية المطلوبة لكل منتج (قد يتكرر المنتج في أكثر من سطر)
+            required = {}
+            for item in items:
+                required[item['product_id']] = required.get(item['product_id'], 0) + item['quantity']
+            
+            # حجز رقم فاتورة (قبل المعاملة حتى لا يتراجع حجز الأرقام مع فشل البيع)
+            invoice_number = invoice_numbers.next_number()
+            created_at = get_current_datetime()
             
             # إنشاء الفاتورة
-            with db.get_connection() as conn:
+            with db.transaction(immediate=True) as conn:
                 cursor = conn.cursor()
                 
+                # جلب جميع منتجات السلة باستعلام واحد
+                placeholders = ', '.join('?' * len(required))
+                cursor.execute(
+                    f"SELECT id, name, stock, cost_price FROM products WHERE id IN ({placeholders})",
+                    tuple(required)
+                )
+                products = {row['id']: row for row in cursor.fetchall()}
+                
+                for product_id, quantity in required.items():
+                    product = products.get(product_id)
+                    
+                    if not product:
+                        conn.rollback()
+                        return {'success': False, 'message': f'المنتج {product_id} غير موجود'}
+                    
+                    if product['stock'] < quantity:
+                        conn.rollback()
+                        return {'success': False, 'message': f'مخزون {product["name"]} غير كافي'}
+                
                 # إدراج الفاتورة
                 cursor.execute(
                     """INSERT INTO sales (invoice_number, user_id, customer_id, total_amount, 
                        discount, payment_method, notes, created_at)
                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
                     (invoice_number, user_id, customer_id, total_amount, discount, 
-                     payment_method, notes, get_current_datetime())
+                     payment_method, notes, created_at)
                 )
                 
                 sale_id = cursor.lastrowid
                 
-                # إدراج عناصر الفاتورة وتحديث المخزون
-                for item in items:
-                    product = ProductController.get_product_by_id(item['product_id'])
-                    
-                    if not product:
-                        conn.rollback()
-                        return {'success': False, 'message': f'المنتج {item["product_id"]} غير موجود'}
-                    
-                    if product['stock'] < item['quantity']:
-                        conn.rollback()
-                        return {'success': False, 'message': f'مخزون {product["name"]} غير كافي'}
-                    
-                    item_total = item['price'] * item['quantity'] - item.get('discount', 0)
-                    
-                    cursor.execute(
-                        """INSERT INTO sale_items (sale_id, product_id, quantity, price_at_sale, 
-                           cost_at_sale, discount, total_price)
-                           VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                        (sale_id, item['product_id'], item['quantity'], item['price'],
-                         product['cost_price'], item.get('discount', 0), item_total)
-                    )
-                    
-                    # تحديث المخزون
-                    new_stock = product['stock'] - item['quantity']
-                    cursor.execute(
-                        "UPDATE products SET stock = ? WHERE id = ?",
-                        (new_stock, item['product_id'])
-                    )
+                # إدراج عناصر الفاتورة دفعة واحدة
+                sale_items = [
+                    (sale_id, item['product_id'], item['quantity'], item['price'],
+                     products[item['product_id']]['cost_price'], item.get('discount', 0),
+                     item['price'] * item['quantity'] - item.get('discount', 0))
+                    for item in items
+                ]
+                cursor.executemany(
+                    """INSERT INTO sale_items (sale_id, product_id, quantity, price_at_sale, 
+                       cost_at_sale, discount, total_price)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    sale_items
+                )
+                
+                # خصم المخزون نسبياً مع التحقق من كفايته في نفس الجملة
+                cursor.executemany(
+                    "UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ?",
+                    [(quantity, product_id, quantity) for product_id, quantity in required.items()]
+                )
                 
-                conn.commit()
+                if cursor.rowcount != len(required):
+                    conn.rollback()
+                    return {'success': False, 'message': 'المخزون غير كافي'}
                 
-                return {
-                    'success': True,
-                    'message': 'تمت عملية البيع بنجاح',
-                    'sale_id': sale_id,
-                    'invoice_number': invoice_number,
-                    'total': total_amount
-                }
+                # تحديث الملخص اليومي في نفس المعاملة
+                add_to_rollup(
+                    conn, created_at, user_id, payment_method,
+                    sales_count=1,
+                    sales_total=total_amount,
+                    discount_total=discount,
+                    items_revenue=sum(row[6] for row in sale_items),
+                    items_cost=sum(row[2] * row[4] for row in sale_items)
+                )
+                
+                # مبيعات المنتجات اليومية: (المنتج، الكمية، الإيراد، التكلفة، الربح) لكل سطر
+                add_product_sales(conn, created_at, [
+                    (row[1], row[2], row[6], row[2] * row[4], (row[3] - row[4]) * row[2])
+                    for row in sale_items
+                ])
+            
+            # تحديث مخزون الكتالوج بعد حفظ المعاملة
+            catalog.adjust_stock({product_id: -quantity for product_id, quantity in required.items()})
+            data_versions.bump('sales')
+            
+            return {
+                'success': True,
+                'message': 'تمت عملية البيع بنجاح',
+                'sale_id': sale_id,
+                'invoice_number': invoice_number,
+                'total': total_amount
+            }
         
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
     
+    @staticmethod
+    def create_custom_sale(user_id, amount, notes=""):
+        """تسجيل عملية بيع منفردة بمبلغ فقط (بدون منتجات)"""
+        from database.sequences import custom_invoice_numbers
+        
+        try:
+            invoice_number = custom_invoice_numbers.next_number()
+            created_at = get_current_datetime()
+            
+            with db.transaction(immediate=True) as conn:
+                conn.execute(
+                    """INSERT INTO sales 
+                       (invoice_number, user_id, total_amount, discount, payment_method, notes, created_at)
+                       VALUES (?, ?, ?, 0, 'نقدي', ?, ?)""",
+                    (invoice_number, user_id, amount, notes, created_at)
+                )
+                add_to_rollup(
+                    conn, created_at, user_id, 'نقدي',
+                    sales_count=1,
+                    sales_total=amount
+                )
+            
+            return {'success': True, 'invoice_number': invoice_number}
+        except Exception as e:
+            return {'success': False, 'message': f'خطأ: {str(e)}'}
+    
+    @staticmethod
+    def create_quick_sale(user_id, reason, amount):
+        """بيع منفرد من شاشة البيع: التحقق من السبب والمبلغ ثم تسجيله كبيع بمبلغ فقط"""
+        reason = (reason or "").strip()
+        if not reason:
+            return {'success': False, 'message': 'يرجى إدخال السبب/الوصف'}
+        
+        try:
+            amount = float(amount or 0)
+        except (TypeError, ValueError):
+            return {'success': False, 'message': 'يرجى إدخال مبلغ صحيح'}
+        
+        if amount <= 0:
+            return {'success': False, 'message': 'المبلغ يجب أن يكون أكبر من صفر'}
+        
+        result = SalesController.create_custom_sale(user_id, amount, f"بيع منفرد: {reason}")
+        if result['success']:
+            result.update(reason=reason, amount=amount)
+        return result
+    
+    @staticmethod
+    def get_recent_sales(period='week'):
+        """فواتير الفترة (today / week / month) الأحدث أولاً، لاختيار فاتورة المرتجع"""
+        return db.fetch_all(
+            """SELECT s.id, s.invoice_number, s.total_amount, s.created_at,
+                      c.name as customer_name
+               FROM sales s
+               LEFT JOIN customers c ON s.customer_id = c.id
+               WHERE s.created_at >= ? AND s.created_at < ?
+               ORDER BY s.created_at DESC""",
+            get_period_bounds(period),
+            record=Sale
+        )
+    
     @staticmethod
     def get_sale_by_id(sale_id):
-        """الحصول على فاتورة"""
+        """الحصول على فاتورة: {'sale': Sale, 'items': [SaleItem]}"""
         sale = db.fetch_one(
             """SELECT s.*, u.full_name as user_name, c.name as customer_name
                FROM sales s
                LEFT JOIN users u ON s.user_id = u.id
                LEFT JOIN customers c ON s.customer_id = c.id
                WHERE s.id = ?""",
-            (sale_id,)
+            (sale_id,),
+            record=Sale
         )
         
         if sale:
@@ -101,10 +220,11 @@ class SalesController:
                    FROM sale_items si
                    JOIN products p ON si.product_id = p.id
                    WHERE si.sale_id = ?""",
-                (sale_id,)
+                (sale_id,),
+                record=SaleItem
             )
             
-            return {'sale': dict(sale), 'items': [dict(item) for item in items]}
+            return {'sale': sale, 'items': items}
         
         return None
     
@@ -112,15 +232,17 @@ class SalesController:
     def get_all_sales(start_date=None, end_date=None, limit=100):
         """الحصول على جميع المبيعات"""
         if start_date and end_date:
+            date_filter, date_params = date_range_filter('s.created_at', start_date, end_date)
             return db.fetch_all(
-                """SELECT s.*, u.full_name as user_name, c.name as customer_name
+                f"""SELECT s.*, u.full_name as user_name, c.name as customer_name
                    FROM sales s
                    LEFT JOIN users u ON s.user_id = u.id
                    LEFT JOIN customers c ON s.customer_id = c.id
-                   WHERE DATE(s.created_at) BETWEEN ? AND ?
+                   WHERE {date_filter}
                    ORDER BY s.created_at DESC
                    LIMIT ?""",
-                (start_date, end_date, limit)
+                (*date_params, limit),
+                record=Sale
             )
         else:
             return db.fetch_all(
@@ -130,73 +252,48 @@ class SalesController:
                    LEFT JOIN customers c ON s.customer_id = c.id
                    ORDER BY s.created_at DESC
                    LIMIT ?""",
-                (limit,)
+                (limit,),
+                record=Sale
             )
     
     @staticmethod
     def get_today_sales():
         """مبيعات اليوم"""
+        date_filter, date_params = date_range_filter('s.created_at')
         return db.fetch_all(
-            """SELECT s.*, u.full_name as user_name
+            f"""SELECT s.*, u.full_name as user_name
                FROM sales s
                LEFT JOIN users u ON s.user_id = u.id
-               WHERE DATE(s.created_at) = DATE('now')
-               ORDER BY s.created_at DESC"""
+               WHERE {date_filter}
+               ORDER BY s.created_at DESC""",
+            date_params,
+            record=Sale
         )
     
     @staticmethod
     def get_sales_summary(start_date=None, end_date=None):
-        """ملخص المبيعات"""
-        if start_date and end_date:
-            result = db.fetch_one(
-                """SELECT 
-                   COUNT(*) as total_sales,
-                   SUM(total_amount) as total_revenue,
-                   SUM(discount) as total_discount,
-                   AVG(total_amount) as avg_sale
-                   FROM sales
-                   WHERE DATE(created_at) BETWEEN ? AND ?""",
-                (start_date, end_date)
-            )
-        else:
-            result = db.fetch_one(
-                """SELECT 
-                   COUNT(*) as total_sales,
-                   SUM(total_amount) as total_revenue,
-                   SUM(discount) as total_discount,
-                   AVG(total_amount) as avg_sale
-                   FROM sales
-                   WHERE DATE(created_at) = DATE('now')"""
-            )
+        """ملخص المبيعات (بدون تواريخ: مبيعات اليوم) من الملخص اليومي"""
+        totals = get_rollup_totals(start_date, end_date)
+        total_sales = int(totals['sales_count'])
+        
+        if not total_sales:
+            return {'total_sales': 0, 'total_revenue': None, 'total_discount': None, 'avg_sale': None}
         
-        return dict(result) if result else {}
+        return {
+            'total_sales': total_sales,
+            'total_revenue': totals['sales_total'],
+            'total_discount': totals['discount_total'],
+            'avg_sale': totals['sales_total'] / total_sales
+        }
     
     @staticmethod
     def calculate_profit(start_date=None, end_date=None):
-        """حساب الأرباح"""
-        if start_date and end_date:
-            result = db.fetch_one(
-                """SELECT 
-                   SUM(si.total_price) as total_revenue,
-                   SUM(si.cost_at_sale * si.quantity) as total_cost
-                   FROM sale_items si
-                   JOIN sales s ON si.sale_id = s.id
-                   WHERE DATE(s.created_at) BETWEEN ? AND ?""",
-                (start_date, end_date)
-            )
-        else:
-            result = db.fetch_one(
-                """SELECT 
-                   SUM(si.total_price) as total_revenue,
-                   SUM(si.cost_at_sale * si.quantity) as total_cost
-                   FROM sale_items si
-                   JOIN sales s ON si.sale_id = s.id
-                   WHERE DATE(s.created_at) = DATE('now')"""
-            )
+        """حساب الأرباح (بدون تواريخ: أرباح اليوم) من الملخص اليومي"""
+        totals = get_rollup_totals(start_date, end_date)
         
-        if result and result['total_revenue']:
-            total_revenue = result['total_revenue'] or 0
-            total_cost = result['total_cost'] or 0
+        if totals['items_revenue']:
+            total_revenue = totals['items_revenue']
+            total_cost = totals['items_cost']
             profit = total_revenue - total_cost
             profit_margin = (profit / total_revenue * 100) if total_revenue > 0 else 0
             
@@ -209,94 +306,207 @@ class SalesController:
         
         return {'total_revenue': 0, 'total_cost': 0, 'profit': 0, 'profit_margin': 0}
     
+    @staticmethod
+    def get_daily_kpis(start_date=None, end_date=None):
+        """مؤشرات لوحة التحكم (بدون تواريخ: اليوم) بقراءة واحدة من الملخص اليومي"""
+        totals = get_rollup_totals(start_date, end_date)
+        
+        profit = totals['items_revenue'] - totals['items_cost']
+        profit_margin = (profit / totals['items_revenue'] * 100) if totals['items_revenue'] > 0 else 0
+        
+        return {
+            'sales_count': int(totals['sales_count']),
+            'revenue': totals['sales_total'],
+            'profit': profit,
+            'profit_margin': profit_margin,
+            'expenses': totals['expenses_total'],
+            'net_profit': profit - totals['expenses_total'],
+            'returns_amount': totals['returns_amount'],
+            'purchases': totals['purchases_total']
+        }
+    
+    @staticmethod
+    def get_product_sales(start_date=None, end_date=None):
+        """مبيعات كل منتج وهامش ربحه في نطاق أيام (بدون تواريخ: كل الفترة)"""
+        return get_product_sales(start_date, end_date)
+    
     @staticmethod
     def return_sale_item(sale_id, product_id, quantity, user_id=None, reason=""):
         """استرجاع منتج من بيع"""
         try:
-            # استخدام transaction للتأكد من تطبيق كل العمليات
-            with db.get_connection() as conn:
+            # استخدام transaction للتأكد من تطبيق كل العمليات (مع الملخص اليومي)
+            with db.transaction(immediate=True) as conn:
                 cursor = conn.cursor()
                 
                 # التحقق من وجود العنصر في البيع
-                cursor.execute(
+                sale_item = SaleItem.select(
+                    conn,
                     "SELECT * FROM sale_items WHERE sale_id = ? AND product_id = ?",
                     (sale_id, product_id)
-                )
-                sale_item = cursor.fetchone()
+                ).fetchone()
                 
                 if not sale_item:
                     return False
                 
-                # تحويل Row إلى dict للوصول السهل
-                sale_item = dict(sale_item)
-                
-                if quantity > sale_item['quantity']:
+                if quantity > sale_item.quantity:
                     return False
                 
+                cursor.execute(
+                    "SELECT user_id, payment_method, total_amount, created_at FROM sales WHERE id = ?",
+                    (sale_id,)
+                )
+                sale = cursor.fetchone()
+                
+                # إجمالي الإيراد والتكلفة لعناصر الفاتورة قبل المرتجع (لتعديل الملخص اليومي)
+                items_query = """SELECT COALESCE(SUM(total_price), 0) as total,
+                                  COALESCE(SUM(cost_at_sale * quantity), 0) as cost
+                                  FROM sale_items WHERE sale_id = ?"""
+                items_before = cursor.execute(items_query, (sale_id,)).fetchone()
+                product_before = get_sale_totals(conn, sale_id).get(product_id)
+                
                 # حساب مبلغ المرتجع
-                return_amount = quantity * sale_item['price_at_sale']
+                return_amount = quantity * sale_item.price_at_sale
+                returned_at = get_current_datetime()
                 
                 # تسجيل المرتجع في جدول المرتجعات
                 cursor.execute(
                     """INSERT INTO returns (sale_id, product_id, quantity, return_amount, user_id, reason, created_at)
-                       VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)""",
-                    (sale_id, product_id, quantity, return_amount, user_id or 1, reason)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (sale_id, product_id, quantity, return_amount, user_id or 1, reason, returned_at)
                 )
                 
                 # تحديث أو حذف العنصر من البيع
-                if quantity == sale_item['quantity']:
+                if quantity == sale_item.quantity:
                     # حذف العنصر كاملاً
                     cursor.execute("DELETE FROM sale_items WHERE sale_id = ? AND product_id = ?", 
                               (sale_id, product_id))
                 else:
                     # تقليل الكمية
-                    new_quantity = sale_item['quantity'] - quantity
-                    new_total = new_quantity * sale_item['price_at_sale']
+                    new_quantity = sale_item.quantity - quantity
+                    new_total = new_quantity * sale_item.price_at_sale
                     cursor.execute(
                         "UPDATE sale_items SET quantity = ?, total_price = ? WHERE sale_id = ? AND product_id = ?",
                         (new_quantity, new_total, sale_id, product_id)
                     )
                 
                 # تحديث إجمالي البيع
-                cursor.execute(
-                    "SELECT SUM(total_price) as total FROM sale_items WHERE sale_id = ?",
-                    (sale_id,)
-                )
-                remaining_items = cursor.fetchone()
+                remaining_items = cursor.execute(items_query, (sale_id,)).fetchone()
                 
-                new_sale_total = remaining_items['total'] if remaining_items['total'] else 0
+                new_sale_total = remaining_items['total']
                 cursor.execute("UPDATE sales SET total_amount = ? WHERE id = ?", 
                           (new_sale_total, sale_id))
                 
                 # إعادة المنتج للمخزون
-                cursor.execute("SELECT stock FROM products WHERE id = ?", (product_id,))
-                product = cursor.fetchone()
-                if product:
-                    current_stock = product['stock']
-                    new_stock = current_stock + quantity
-                    cursor.execute("UPDATE products SET stock = ? WHERE id = ?", (new_stock, product_id))
-                else:
+                cursor.execute(
+                    "UPDATE products SET stock = stock + ? WHERE id = ?",
+                    (quantity, product_id)
+                )
+                if cursor.rowcount == 0:
+                    conn.rollback()
                     return False
                 
-                # تطبيق كل التغييرات
-                conn.commit()
-                return True
+                # الملخص اليومي: تعديل أرقام يوم البيع الأصلي، وتسجيل المرتجع في يومه
+                add_to_rollup(
+                    conn, sale['created_at'], sale['user_id'], sale['payment_method'],
+                    sales_total=new_sale_total - sale['total_amount'],
+                    items_revenue=remaining_items['total'] - items_before['total'],
+                    items_cost=remaining_items['cost'] - items_before['cost']
+                )
+                add_to_rollup(
+                    conn, returned_at, user_id or 1,
+                    returns_count=1,
+                    returns_quantity=quantity,
+                    returns_amount=return_amount
+                )
+                
+                # مبيعات المنتجات اليومية: فرق أرقام المنتج في يوم البيع الأصلي
+                product_after = get_sale_totals(conn, sale_id).get(product_id, (0, 0, 0, 0))
+                add_product_sales(conn, sale['created_at'], [
+                    (product_id, *(after - before for after, before in zip(product_after, product_before)))
+                ])
+            
+            catalog.adjust_stock({product_id: quantity})
+            data_versions.bump('sales', 'returns')
+            return True
             
         except Exception as e:
             print(f"خطأ في المرتجعات: {str(e)}")
             return False
     
+    @staticmethod
+    def return_sale_items(items, user_id=None, reason=""):
+        """استرجاع عدة عناصر (من نافذة المرتجعات)، ونتيجة كل عنصر في 'results'"""
+        results = [
+            {
+                'sale_id': item['sale_id'],
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'success': SalesController.return_sale_item(
+                    item['sale_id'], item['product_id'], item['quantity'], user_id, reason
+                )
+            }
+            for item in items
+        ]
+        returned = sum(result['success'] for result in results)
+        
+        if returned == 0:
+            message = 'فشل استرجاع المنتجات'
+        else:
+            message = f'تم استرجاع {returned} منتج بنجاح'
+            if returned < len(results):
+                message += f' - فشل {len(results) - returned}'
+        
+        return {
+            'success': returned > 0,
+            'message': message,
+            'returned': returned,
+            'results': results
+        }
+    
+    @staticmethod
+    def export_sale_lines(filename, start_date=None, end_date=None):
+        """تصدير سطور مبيعات الفترة إلى CSV بذاكرة ثابتة
+        
+        مولّد: يقرأ السطور دفعةً دفعة (db.fetch_batches) ويكتب كل دفعة ثم يعيد عدد
+        السطور المكتوبة حتى الآن، ليُعرض التقدم عبر BackgroundStream. الترميز utf-8-sig
+        حتى يفتح Excel النصوص العربية بشكل صحيح.
+        """
+        date_filter, params = date_range_filter('s.created_at', start_date, end_date)
+        batches = db.fetch_batches(
+            f"""SELECT s.invoice_number, s.created_at, p.name, p.barcode,
+                       si.quantity, si.price_at_sale, si.cost_at_sale, si.total_price,
+                       s.payment_method, c.name, u.full_name
+                FROM sales s
+                JOIN sale_items si ON si.sale_id = s.id
+                LEFT JOIN products p ON si.product_id = p.id
+                LEFT JOIN customers c ON s.customer_id = c.id
+                LEFT JOIN users u ON s.user_id = u.id
+                WHERE {date_filter}
+                ORDER BY s.created_at""",
+            params
+        )
+        
+        written = 0
+        with open(filename, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(SALE_LINES_EXPORT_HEADERS)
+            try:
+                for rows in batches:
+                    writer.writerows(tuple(row) for row in rows)
+                    written += len(rows)
+                    yield written
+            finally:
+                batches.close()
+    
     @staticmethod
     def get_returns_summary(period='today'):
         """الحصول على ملخص المرتجعات"""
         try:
             date_filter = ""
-            if period == 'today':
-                date_filter = "AND DATE(r.created_at) = DATE('now')"
-            elif period == 'week':
-                date_filter = "AND DATE(r.created_at) >= DATE('now', '-7 days')"
-            elif period == 'month':
-                date_filter = "AND DATE(r.created_at) >= DATE('now', '-30 days')"
+            date_params = ()
+            if period in ('today', 'week', 'month'):
+                date_filter = "AND r.created_at >= ? AND r.created_at < ?"
+                date_params = get_period_bounds(period)
             
             result = db.fetch_one(f"""
                 SELECT 
@@ -305,7 +515,7 @@ class SalesController:
                     SUM(r.return_amount) as total_amount
                 FROM returns r
                 WHERE 1=1 {date_filter}
-            """)
+            """, date_params)
             
             return {
                 'total_returns': result['total_returns'] or 0,
@@ -2,7 +2,29 @@
 متحكم إدارة التجار الخارجيين
 """
 from database.connection import db
-from utils.helpers import calculate_trader_share
+from controllers.product_catalog import catalog
+from controllers.data_versions import data_versions
+from utils.helpers import calculate_trader_share, date_range_filter, get_current_date
+
+
+# أرباح التجار لفترة في تجميع واحد (GROUP BY) بدلاً من استعلام لكل تاجر
+_SETTLEMENT_QUERY = """SELECT et.id as trader_id, et.name as trader_name,
+       et.shop_percentage, et.trader_percentage,
+       COALESCE(agg.total_sales, 0) as total_sales,
+       COALESCE(agg.total_profit, 0) as total_profit
+    FROM external_traders et
+    LEFT JOIN (
+        SELECT p.external_trader_id as trader_id,
+               COUNT(*) as total_sales,
+               SUM((si.price_at_sale - si.cost_at_sale) * si.quantity) as total_profit
+        FROM sale_items si
+        JOIN products p ON si.product_id = p.id
+        JOIN sales s ON si.sale_id = s.id
+        WHERE p.external_trader_id IS NOT NULL AND {date_filter}
+        GROUP BY p.external_trader_id
+    ) agg ON agg.trader_id = et.id
+    WHERE {trader_filter}
+    ORDER BY et.name"""
 
 
 class TraderController:
@@ -42,6 +64,7 @@ class TraderController:
                 (name, phone, address, email, shop_percentage, trader_percentage, notes)
             )
             
+            data_versions.bump('external_traders')
             return {'success': True, 'message': 'تم إضافة التاجر بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -74,6 +97,10 @@ class TraderController:
                 values
             )
             
+            # اسم التاجر معروض في الكتالوج
+            catalog.invalidate()
+            
+            data_versions.bump('external_traders')
             return {'success': True, 'message': 'تم تحديث التاجر بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
@@ -83,79 +110,112 @@ class TraderController:
         """حذف تاجر"""
         try:
             db.execute("DELETE FROM external_traders WHERE id = ?", (trader_id,))
+            catalog.invalidate()
+            data_versions.bump('external_traders')
             return {'success': True, 'message': 'تم حذف التاجر بنجاح'}
         except Exception as e:
             return {'success': False, 'message': f'خطأ: {str(e)}'}
     
     @staticmethod
     def get_trader_products(trader_id):
-        """الحصول على منتجات التاجر"""
-        return db.fetch_all(
-            """SELECT p.*, c.name as category_name
-               FROM products p
-               LEFT JOIN categories c ON p.category_id = c.id
-               WHERE p.external_trader_id = ?
-               ORDER BY p.name""",
-            (trader_id,)
-        )
+        """الحصول على منتجات التاجر مرتبة بالاسم (من كتالوج المنتجات)"""
+        return sorted(catalog.get_by_trader(trader_id), key=lambda product: product['name'])
     
     @staticmethod
-    def calculate_trader_profits(trader_id, start_date=None, end_date=None):
-        """حساب أرباح التاجر"""
-        trader = TraderController.get_trader_by_id(trader_id)
-        if not trader:
-            return None
+    def compute_settlements(start_date=None, end_date=None, trader_id=None):
+        """حساب تسويات التجار (المبيعات، الأرباح، الحصص) في استعلام واحد
         
-        # الحصول على مبيعات منتجات التاجر
+        بدون فترة (start_date و end_date معاً) تُحسب كل المبيعات.
+        """
         if start_date and end_date:
-            sales = db.fetch_all(
-                """SELECT si.*, p.name as product_name
-                   FROM sale_items si
-                   JOIN products p ON si.product_id = p.id
-                   JOIN sales s ON si.sale_id = s.id
-                   WHERE p.external_trader_id = ?
-                   AND DATE(s.created_at) BETWEEN ? AND ?""",
-                (trader_id, start_date, end_date)
-            )
+            date_filter, params = date_range_filter('s.created_at', start_date, end_date)
         else:
-            sales = db.fetch_all(
-                """SELECT si.*, p.name as product_name
-                   FROM sale_items si
-                   JOIN products p ON si.product_id = p.id
-                   JOIN sales s ON si.sale_id = s.id
-                   WHERE p.external_trader_id = ?""",
-                (trader_id,)
-            )
+            date_filter, params = "1 = 1", ()
         
-        total_profit = 0
-        for sale in sales:
-            item_profit = (sale['price_at_sale'] - sale['cost_at_sale']) * sale['quantity']
-            total_profit += item_profit
+        if trader_id is not None:
+            trader_filter = "et.id = ?"
+            params = (*params, trader_id)
+        else:
+            trader_filter = "1 = 1"
+        
+        rows = db.fetch_all(
+            _SETTLEMENT_QUERY.format(date_filter=date_filter, trader_filter=trader_filter),
+            params
+        )
         
-        # حساب الحصص
-        shares = calculate_trader_share(total_profit, trader['shop_percentage'])
+        report = []
+        for row in rows:
+            shares = calculate_trader_share(row['total_profit'], row['shop_percentage'])
+            report.append({
+                'trader_id': row['trader_id'],
+                'trader_name': row['trader_name'],
+                'total_sales': row['total_sales'],
+                'total_profit': row['total_profit'],
+                'shop_share': shares['shop_share'],
+                'trader_share': shares['trader_share'],
+                'shop_percentage': row['shop_percentage'],
+                'trader_percentage': row['trader_percentage']
+            })
         
-        return {
-            'trader_name': trader['name'],
-            'total_sales': len(sales),
-            'total_profit': total_profit,
-            'shop_share': shares['shop_share'],
-            'trader_share': shares['trader_share'],
-            'shop_percentage': trader['shop_percentage'],
-            'trader_percentage': trader['trader_percentage']
-        }
+        return report
+    
+    @staticmethod
+    def calculate_trader_profits(trader_id, start_date=None, end_date=None):
+        """حساب أرباح التاجر"""
+        report = TraderController.compute_settlements(start_date, end_date, trader_id)
+        return report[0] if report else None
     
     @staticmethod
     def get_all_traders_report(start_date=None, end_date=None):
-        """تقرير جميع التجار"""
-        traders = TraderController.get_all_traders()
-        report = []
+        """تقرير جميع التجار (الفترات المغلقة تُقرأ من لقطة التسوية)"""
+        if start_date and end_date:
+            snapshot = TraderController.get_settlement_snapshot(start_date, end_date)
+            if snapshot:
+                return snapshot
         
-        for trader in traders:
-            profits = TraderController.calculate_trader_profits(
-                trader['id'], start_date, end_date
-            )
-            if profits:
-                report.append(profits)
+        return TraderController.compute_settlements(start_date, end_date)
+    
+    @staticmethod
+    def get_settlement_snapshot(start_date, end_date):
+        """لقطة تسوية فترة مغلقة (قائمة فارغة إذا لم تُغلق الفترة)"""
+        rows = db.fetch_all(
+            """SELECT trader_id, trader_name, total_sales, total_profit,
+                      shop_share, trader_share, shop_percentage, trader_percentage
+               FROM trader_settlements
+               WHERE period_start = ? AND period_end = ?
+               ORDER BY trader_name""",
+            (start_date, end_date)
+        )
+        return [dict(row) for row in rows]
+    
+    @staticmethod
+    def close_settlement_period(start_date, end_date):
+        """إغلاق فترة تسوية وحفظ أرقامها حتى لا يُعاد حسابها
         
-        return report
+        تُغلق الفترة بعد انتهائها فقط، وإعادة الإغلاق تستبدل اللقطة السابقة.
+        """
+        try:
+            if end_date >= get_current_date():
+                return {'success': False, 'message': 'لا يمكن إغلاق فترة لم تنتهِ بعد'}
+            
+            report = TraderController.compute_settlements(start_date, end_date)
+            
+            with db.transaction() as conn:
+                conn.execute(
+                    "DELETE FROM trader_settlements WHERE period_start = ? AND period_end = ?",
+                    (start_date, end_date)
+                )
+                conn.executemany(
+                    """INSERT INTO trader_settlements
+                       (period_start, period_end, trader_id, trader_name, total_sales,
+                        total_profit, shop_share, trader_share, shop_percentage, trader_percentage)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    [(start_date, end_date, row['trader_id'], row['trader_name'],
+                      row['total_sales'], row['total_profit'], row['shop_share'],
+                      row['trader_share'], row['shop_percentage'], row['trader_percentage'])
+                     for row in report]
+                )
+            
+            return {'success': True, 'message': f'تم إغلاق الفترة ({len(report)} تاجر)'}
+        except Exception as e:
+            return {'success': False, 'message': f'خطأ: {str(e)}'}
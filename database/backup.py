@@ -0,0 +1,266 @@
+"""
+النسخ الاحتياطي لقاعدة البيانات أثناء العمل (sqlite3 backup API) واستعادتها
+"""
+import argparse
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from database.connection import db
+from config import (
+    BACKUP_DIR, BACKUP_KEEP, BACKUP_COMPRESS, BACKUP_PAGES_PER_STEP,
+    BACKUP_STEP_PAUSE, BACKUP_NIGHTLY_TIME
+)
+
+
+# الأجزاء من المليون تمنع تطابق اسمي نسختين في الثانية نفسها (الترتيب الزمني بالاسم باقٍ)
+BACKUP_TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S_%f"
+
+# جداول يجب أن توجد في أي نسخة قبل استعادتها
+REQUIRED_TABLES = ('users', 'products', 'sales', 'sale_items')
+
+
+def get_backup_dir(db_path=None):
+    """مجلد النسخ الاحتياطية (بجوار ملف قاعدة البيانات)"""
+    db_path = os.path.abspath(db_path or db.db_name)
+    return os.path.join(os.path.dirname(db_path), BACKUP_DIR)
+
+
+def _backup_prefix(db_path):
+    return os.path.splitext(os.path.basename(db_path))[0] + "_backup_"
+
+
+def copy_database(source_path, target_path, pages=BACKUP_PAGES_PER_STEP, pause=BACKUP_STEP_PAUSE, progress=None):
+    """نسخ قاعدة بيانات بواسطة backup API على دفعات من الصفحات
+    
+    اتصال المصدر يبقى داخل معاملة قراءة طوال النسخ، فتُنسخ لقطة ثابتة
+    ولا تعيد كتابات الكاشير (WAL) بدء النسخ من جديد، ولا تنتظرها.
+    """
+    source = sqlite3.connect(source_path, timeout=db.profile['busy_timeout'] / 1000)
+    target = sqlite3.connect(target_path)
+    try:
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        
+        def on_step(status, remaining, total):
+            if progress is not None:
+                progress(total - remaining, total)
+            if pause:
+                time.sleep(pause)
+        
+        source.backup(target, pages=pages, progress=on_step)
+        source.rollback()
+    finally:
+        target.close()
+        source.close()
+
+
+def check_database(path):
+    """فحص سلامة ملف قاعدة بيانات: يعيد (سليم؟, رسالة)"""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        return False, str(e)
+    
+    try:
+        result = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        if result != 'ok':
+            return False, result
+        
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        missing = [table for table in REQUIRED_TABLES if table not in tables]
+        if missing:
+            return False, f"جداول مفقودة: {', '.join(missing)}"
+        
+        return True, 'ok'
+    except sqlite3.Error as e:
+        return False, str(e)
+    finally:
+        conn.close()
+
+
+def _compress(path):
+    """ضغط ملف بـ gzip وحذف الأصل"""
+    with open(path, 'rb') as source, gzip.open(path + '.gz', 'wb', compresslevel=6) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+    os.remove(path)
+    return path + '.gz'
+
+
+def _decompress(path, target_path):
+    with gzip.open(path, 'rb') as source, open(target_path, 'wb') as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def list_backups(db_path=None):
+    """النسخ الاحتياطية الموجودة، الأحدث أولاً"""
+    db_path = db_path or db.db_name
+    pattern = os.path.join(get_backup_dir(db_path), _backup_prefix(db_path) + "*")
+    paths = [path for path in glob.glob(pattern) if path.endswith(('.db', '.db.gz'))]
+    return sorted(paths, reverse=True)
+
+
+def rotate_backups(keep=BACKUP_KEEP, db_path=None):
+    """حذف النسخ الأقدم والإبقاء على آخر keep نسخة، ويعيد الملفات المحذوفة"""
+    removed = list_backups(db_path)[keep:]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def create_backup(compress=BACKUP_COMPRESS, keep=BACKUP_KEEP, progress=None, db_path=None):
+    """إنشاء نسخة احتياطية مفحوصة من قاعدة البيانات الحالية ويعيد مسارها
+    
+    النسخة تُكتب في ملف مؤقت وتُفحص (integrity_check) قبل ضغطها وإعطائها
+    اسمها النهائي، فلا تظهر نسخة ناقصة في القائمة أبداً. لا تُكتب نسخة فوق
+    نسخة موجودة بالاسم نفسه (FileExistsError).
+    """
+    db_path = db_path or db.db_name
+    backup_dir = get_backup_dir(db_path)
+    os.makedirs(backup_dir, exist_ok=True)
+    
+    stamp = datetime.now().strftime(BACKUP_TIMESTAMP_FORMAT)
+    path = os.path.join(backup_dir, f"{_backup_prefix(db_path)}{stamp}.db")
+    temp_path = path + ".tmp"
+    
+    try:
+        copy_database(db_path, temp_path, progress=progress)
+        
+        ok, message = check_database(temp_path)
+        if not ok:
+            raise sqlite3.DatabaseError(f"النسخة الاحتياطية غير سليمة: {message}")
+        
+        if compress:
+            temp_path = _compress(temp_path)
+            path += ".gz"
+        
+        # ربط الاسم النهائي بدل os.replace: يفشل إذا وُجد الملف ولا يستبدله
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            raise FileExistsError(f"توجد نسخة احتياطية بالاسم نفسه: {path}") from None
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    if keep:
+        rotate_backups(keep, db_path)
+    
+    return path
+
+
+def restore_backup(backup_path, progress=None):
+    """استعادة نسخة احتياطية إلى قاعدة البيانات الحالية بعد فحصها
+    
+    تُفك النسخة المضغوطة إلى ملف مؤقت، وتُرفض إذا فشل فحص السلامة.
+    قبل الاستبدال تُحفظ نسخة من الحالة الحالية (وتعاد في النتيجة)، ثم تُكتب
+    النسخة فوق قاعدة البيانات المفتوحة بواسطة backup API نفسه.
+    """
+    temp_path = None
+    source_path = backup_path
+    
+    try:
+        if backup_path.endswith('.gz'):
+            temp_path = os.path.join(get_backup_dir(), os.path.basename(backup_path)[:-3] + ".restore")
+            _decompress(backup_path, temp_path)
+            source_path = temp_path
+        
+        ok, message = check_database(source_path)
+        if not ok:
+            raise sqlite3.DatabaseError(f"النسخة الاحتياطية غير سليمة: {message}")
+        
+        # نسخة من الحالة الحالية قبل الاستبدال
+        safety_path = create_backup(keep=0)
+        
+        db.close_all()
+        copy_database(source_path, db.db_name, progress=progress)
+        db.close_all()
+        
+        return safety_path
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def seconds_until(clock_time, now=None):
+    """عدد الثواني حتى الموعد اليومي القادم بصيغة HH:MM"""
+    now = now or datetime.now()
+    hour, minute = (int(part) for part in clock_time.split(':'))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class NightlyBackup:
+    """نسخ احتياطي ليلي في خيط خلفي
+    
+    يعمل يومياً في BACKUP_NIGHTLY_TIME، وعند بدء التشغيل إذا كانت آخر نسخة
+    أقدم من يوم (جهاز الكاشير غالباً مغلق ليلاً).
+    """
+    
+    def __init__(self, clock_time=BACKUP_NIGHTLY_TIME):
+        self.clock_time = clock_time
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        if not self.clock_time or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+    
+    def _is_due(self):
+        backups = list_backups()
+        if not backups:
+            return True
+        return time.time() - os.path.getmtime(backups[0]) > 24 * 60 * 60
+    
+    def _run(self):
+        if self._is_due():
+            self._backup()
+        
+        while not self._stop.wait(seconds_until(self.clock_time)):
+            self._backup()
+    
+    def _backup(self):
+        try:
+            self.last_result = create_backup()
+            print(f"💾 تم إنشاء نسخة احتياطية: {self.last_result}")
+        except Exception as e:
+            self.last_result = e
+            print(f"❌ فشل النسخ الاحتياطي: {e}")
+
+
+nightly_backup = NightlyBackup()
+
+
+def main():
+    """أمر النسخ الاحتياطي: python -m database.backup [--list | --restore PATH]"""
+    parser = argparse.ArgumentParser(description="النسخ الاحتياطي لقاعدة البيانات")
+    parser.add_argument('--list', action='store_true', help="عرض النسخ الموجودة")
+    parser.add_argument('--restore', metavar='PATH', help="استعادة نسخة احتياطية")
+    parser.add_argument('--no-compress', action='store_true', help="بدون ضغط")
+    args = parser.parse_args()
+    
+    if args.list:
+        for path in list_backups():
+            print(f"{path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    elif args.restore:
+        safety_path = restore_backup(args.restore)
+        print(f"✅ تمت الاستعادة (الحالة السابقة محفوظة في {safety_path})")
+    else:
+        path = create_backup(compress=not args.no_compress)
+        print(f"✅ تم إنشاء نسخة احتياطية: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,417 @@
 """
 إدارة الاتصال بقاعدة البيانات
 """
+import json
+import os
+import queue
+import re
 import sqlite3
+import sys
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from config import DB_NAME
+from datetime import datetime
+from config import (
+    DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_HEALTH_CHECK_INTERVAL, DB_FETCH_BATCH_SIZE,
+    DB_STORAGE_PROFILE, DB_STORAGE_PROFILES,
+    QUERY_STATS_ENABLED, QUERY_SLOW_MS, QUERY_SLOW_LOG, QUERY_STATS_WINDOW
+)
+
+
+# حدود فئات المدرج التكراري لزمن الاستعلامات (مللي ثانية)، والفئة الأخيرة لما بعدها
+QUERY_HISTOGRAM_BOUNDS = (1, 5, 20, 100, 500)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query):
+    """توحيد صيغة الاستعلام لتجميع الإحصائيات: القيم الثابتة تصبح ? وقوائم IN تصبح (...)"""
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _IN_LIST.sub("IN (...)", query)
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+class QueryStats:
+    """إحصائيات الاستعلامات (اختيارية، معطلة افتراضياً)
+
+    لكل استعلام بعد توحيد صيغته: عدد مرات التنفيذ والزمن الكلي والأقصى وعدد الصفوف،
+    ومدرج تكراري للزمن، وآخر QUERY_STATS_WINDOW زمناً لحساب النسب المئوية.
+    ولكل شاشة (screen تضبطها النافذة الرئيسية) عدد الاستعلامات حسب الدالة المستدعية.
+    الاستعلامات الأبطأ من slow_ms تُكتب في slow_log مع خطة تنفيذها (EXPLAIN QUERY PLAN).
+    """
+
+    def __init__(self):
+        self.enabled = QUERY_STATS_ENABLED
+        self.slow_ms = QUERY_SLOW_MS
+        self.slow_log = QUERY_SLOW_LOG
+        self.screen = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """تصفير الإحصائيات"""
+        with self._lock:
+            self.queries = {}
+            self.screens = {}
+            self.started_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def _find_caller(self):
+        """أول دالة من ملفات المشروع خارج هذا الملف في سلسلة الاستدعاء (وحدة.دالة)"""
+        frame = sys._getframe(2)
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename != __file__ and filename.startswith(_PROJECT_ROOT):
+                module = os.path.splitext(os.path.relpath(filename, _PROJECT_ROOT))[0]
+                return f"{module.replace(os.sep, '.')}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        return '-'
+
+    def record(self, conn, query, params, seconds, rows):
+        """تسجيل تنفيذ استعلام"""
+        if not self.enabled:
+            return
+
+        sql = normalize_sql(query)
+        caller = self._find_caller()
+        screen = self.screen or '-'
+        ms = seconds * 1000
+
+        with self._lock:
+            entry = self.queries.get(sql)
+            if entry is None:
+                entry = self.queries[sql] = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'histogram': [0] * (len(QUERY_HISTOGRAM_BOUNDS) + 1),
+                    'recent': deque(maxlen=QUERY_STATS_WINDOW),
+                    'callers': {}
+                }
+            entry['count'] += 1
+            entry['total_ms'] += ms
+            entry['max_ms'] = max(entry['max_ms'], ms)
+            entry['rows'] += rows
+            entry['histogram'][sum(ms >= bound for bound in QUERY_HISTOGRAM_BOUNDS)] += 1
+            entry['recent'].append(ms)
+            entry['callers'][caller] = entry['callers'].get(caller, 0) + 1
+
+            counts = self.screens.setdefault(screen, {})
+            counts[caller] = counts.get(caller, 0) + 1
+
+        if ms >= self.slow_ms:
+            self._log_slow(conn, query, params, ms, rows, caller, screen)
+
+    def _log_slow(self, conn, query, params, ms, rows, caller, screen):
+        """كتابة استعلام بطيء في السجل مع خطة تنفيذه"""
+        plan = []
+        if params is not None and query.lstrip().upper().startswith(('SELECT', 'WITH')):
+            try:
+                # مؤشر عادي غير مراقَب حتى لا تُسجَّل خطة التنفيذ نفسها
+                cursor = sqlite3.Cursor(conn)
+                plan = [row[-1] for row in cursor.execute("EXPLAIN QUERY PLAN " + query, params)]
+            except sqlite3.Error:
+                pass
+
+        lines = [
+            f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | {ms:.1f}ms | {rows} صف | {screen} | {caller}",
+            _WHITESPACE.sub(" ", query).strip()
+        ]
+        lines += [f"    {detail}" for detail in plan]
+
+        with self._lock:
+            with open(self.slow_log, 'a', encoding='utf-8') as log:
+                log.write("\n".join(lines) + "\n\n")
+
+    def snapshot(self):
+        """نسخة من الإحصائيات مرتبة حسب الزمن الكلي"""
+        with self._lock:
+            queries = []
+            for sql, entry in self.queries.items():
+                recent = sorted(entry['recent'])
+                queries.append({
+                    'sql': sql,
+                    'count': entry['count'],
+                    'total_ms': round(entry['total_ms'], 2),
+                    'avg_ms': round(entry['total_ms'] / entry['count'], 3),
+                    'p50_ms': round(recent[len(recent) // 2], 3),
+                    'p95_ms': round(recent[int(len(recent) * 0.95)], 3),
+                    'max_ms': round(entry['max_ms'], 2),
+                    'rows': entry['rows'],
+                    'histogram': dict(zip(
+                        [f"<{bound}ms" for bound in QUERY_HISTOGRAM_BOUNDS] + [f">={QUERY_HISTOGRAM_BOUNDS[-1]}ms"],
+                        entry['histogram']
+                    )),
+                    'callers': dict(entry['callers'])
+                })
+
+            screens = {
+                screen: {
+                    'total': sum(counts.values()),
+                    'callers': dict(sorted(counts.items(), key=lambda item: -item[1]))
+                }
+                for screen, counts in self.screens.items()
+            }
+
+            return {
+                'started_at': self.started_at,
+                'queries': sorted(queries, key=lambda query: -query['total_ms']),
+                'screens': screens
+            }
+
+    def dump(self, path):
+        """حفظ الإحصائيات في ملف JSON"""
+        with open(path, 'w', encoding='utf-8') as output:
+            json.dump(self.snapshot(), output, ensure_ascii=False, indent=2)
+        return path
+
+
+query_stats = QueryStats()
+
+
+class _InstrumentedCursor(sqlite3.Cursor):
+    """مؤشر يقيس زمن كل استعلام (التنفيذ وجلب الصفوف) وعدد صفوفه
+
+    الاستعلام يُسجَّل عند انتهاء جلب صفوفه، أو فوراً إذا لم يكن يعيد صفوفاً.
+    """
+
+    _pending = None
+
+    def execute(self, query, params=()):
+        self._finish()
+        started = time.perf_counter()
+        super().execute(query, params)
+        self._pending = [query, params, time.perf_counter() - started, 0]
+        if self.description is None:
+            self._pending[3] = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, query, params_list):
+        self._finish()
+        started = time.perf_counter()
+        super().executemany(query, params_list)
+        query_stats.record(self.connection, query, None, time.perf_counter() - started, max(self.rowcount, 0))
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 1 if row is not None else 0, done=True)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), done=len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), done=True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, done=True)
+            raise
+        self._fetched(started, 1)
+        return row
+
+    def _fetched(self, started, rows, done=False):
+        if self._pending is not None:
+            self._pending[2] += time.perf_counter() - started
+            self._pending[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            query_stats.record(self.connection, *pending)
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class _InstrumentedConnection(sqlite3.Connection):
+    """اتصال تمر جميع استعلاماته بمؤشر مراقَب (عند تفعيل query_stats)"""
+
+    def cursor(self, factory=_InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, query, params=()):
+        return self.cursor().execute(query, params)
+
+    def executemany(self, query, params_list):
+        return self.cursor().executemany(query, params_list)
 
 
 class DatabaseConnection:
-    """مدير الاتصال بقاعدة البيانات"""
-    
+    """مدير الاتصال بقاعدة البيانات (مجمّع اتصالات دائمة)"""
+
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
         self.db_name = DB_NAME
-    
+        self.pool_size = DB_POOL_SIZE
+        self.profile_name = DB_STORAGE_PROFILE
+        self.profile = DB_STORAGE_PROFILES[DB_STORAGE_PROFILE]
+        self._last_checkpoint = time.monotonic()
+
+        # مراقبة الاستعلامات (تُطبَّق على الاتصالات التي تُفتح بعد تفعيلها)
+        self.stats = query_stats
+
+        # الاتصالات الخاملة مع وقت آخر استخدام لكل منها
+        self._pool = queue.LifoQueue(maxsize=DB_POOL_SIZE)
+        self._created = 0
+        self._lock = threading.Lock()
+
+        # الاتصال المحجوز للخيط الحالي (لإعادة استخدامه في الاستدعاءات المتداخلة)
+        self._local = threading.local()
+
+    def _create_connection(self):
+        """فتح اتصال جديد"""
+        conn = sqlite3.connect(
+            self.db_name,
+            check_same_thread=False,
+            timeout=self.profile['busy_timeout'] / 1000,
+            factory=_InstrumentedConnection if self.stats.enabled else sqlite3.Connection
+        )
+        conn.row_factory = sqlite3.Row
+        self._apply_storage_profile(conn)
+        return conn
+
+    def _apply_storage_profile(self, conn):
+        """تطبيق إعدادات PRAGMA الخاصة بملف التخزين الحالي"""
+        profile = self.profile
+        conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+        conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+        conn.execute(f"PRAGMA wal_autocheckpoint = {int(profile['wal_autocheckpoint'])}")
+        conn.execute(f"PRAGMA journal_size_limit = {int(profile['journal_size_limit'])}")
+
+    def _is_healthy(self, conn):
+        """فحص صلاحية اتصال خامل"""
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _acquire(self):
+        """حجز اتصال من المجمّع"""
+        try:
+            conn, last_used = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.pool_size
+                if can_create:
+                    self._created += 1
+
+            if can_create:
+                try:
+                    return self._create_connection()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+
+            try:
+                conn, last_used = self._pool.get(timeout=DB_POOL_TIMEOUT)
+            except queue.Empty:
+                raise sqlite3.OperationalError("انتهت مهلة انتظار اتصال متاح بقاعدة البيانات")
+
+        # فحص الاتصالات التي بقيت خاملة لفترة طويلة
+        if time.monotonic() - last_used > DB_HEALTH_CHECK_INTERVAL and not self._is_healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = self._create_connection()
+
+        return conn
+
+    def _release(self, conn):
+        """إعادة اتصال إلى المجمّع"""
+        if conn.in_transaction:
+            conn.rollback()
+
+        # اتصال فُتح قبل تفعيل المراقبة أو إيقافها: يُغلق ليُفتح غيره بالنوع الصحيح
+        if isinstance(conn, _InstrumentedConnection) != self.stats.enabled:
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            return
+
+        # دمج ملف WAL دورياً حتى لا يكبر بلا حدود
+        now = time.monotonic()
+        if now - self._last_checkpoint > self.profile['checkpoint_interval']:
+            self._last_checkpoint = now
+            self._checkpoint(conn, 'PASSIVE')
+
+        self._pool.put_nowait((conn, now))
+
+    def _checkpoint(self, conn, mode):
+        """تنفيذ checkpoint لملف WAL على اتصال معين"""
+        try:
+            return conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        except sqlite3.Error:
+            return None
+
+    def checkpoint(self, mode='TRUNCATE'):
+        """دمج ملف WAL في قاعدة البيانات
+
+        mode: PASSIVE لا ينتظر القرّاء، و TRUNCATE يعيد حجم ملف WAL إلى الصفر.
+        """
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f"نوع checkpoint غير معروف: {mode}")
+        with self.get_connection() as conn:
+            result = self._checkpoint(conn, mode)
+        self._last_checkpoint = time.monotonic()
+        return result
+
     @contextmanager
     def get_connection(self):
-        """الحصول على اتصال بقاعدة البيانات"""
-        conn = sqlite3.connect(self.db_name)
-        conn.row_factory = sqlite3.Row
+        """الحصول على اتصال بقاعدة البيانات
+
+        الاستدعاءات المتداخلة في نفس الخيط تعيد استخدام الاتصال نفسه،
+        ويتم الحفظ أو التراجع عند خروج النطاق الخارجي فقط.
+        """
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            yield held
+            return
+
+        conn = self._acquire()
+        self._local.conn = conn
         try:
             yield conn
             conn.commit()
@@ -31,36 +419,118 @@ class DatabaseConnection:
             conn.rollback()
             raise e
         finally:
-            conn.close()
-    
+            self._local.conn = None
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        """نطاق معاملة صريح
+
+        immediate=True يحجز قفل الكتابة من البداية (BEGIN IMMEDIATE)
+        لتجنب تعارض القراءة ثم الكتابة بين عمليتين متزامنتين.
+        """
+        with self.get_connection() as conn:
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            yield conn
+
+    def close_all(self):
+        """إغلاق جميع الاتصالات الخاملة في المجمّع"""
+        first = True
+        while True:
+            try:
+                conn, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if first:
+                    self._checkpoint(conn, 'TRUNCATE')
+                    first = False
+                conn.close()
+            except sqlite3.Error:
+                pass
+            with self._lock:
+                self._created -= 1
+
+    def configure(self, db_name=None, profile=None):
+        """تغيير ملف قاعدة البيانات و/أو ملف التخزين وإعادة تهيئة المجمّع"""
+        if profile is not None and profile not in DB_STORAGE_PROFILES:
+            raise ValueError(f"ملف تخزين غير معروف: {profile}")
+
+        self.close_all()
+        if db_name is not None:
+            self.db_name = db_name
+        if profile is not None:
+            self.profile_name = profile
+            self.profile = DB_STORAGE_PROFILES[profile]
+
+    def set_instrumentation(self, enabled, slow_ms=None):
+        """تفعيل مراقبة الاستعلامات أو إيقافها (يُعاد فتح الاتصالات الخاملة)"""
+        self.stats.enabled = enabled
+        if slow_ms is not None:
+            self.stats.slow_ms = slow_ms
+        self.close_all()
+
     def execute(self, query, params=()):
         """تنفيذ استعلام"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchall()
-    
+
     def execute_many(self, query, params_list):
         """تنفيذ استعلامات متعددة"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.executemany(query, params_list)
             return cursor.rowcount
-    
-    def fetch_one(self, query, params=()):
-        """جلب صف واحد"""
+
+    def fetch_one(self, query, params=(), record=None):
+        """جلب صف واحد (record: صنف سجل من database.records بدلاً من sqlite3.Row)"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = record.cursor(conn) if record else conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchone()
-    
-    def fetch_all(self, query, params=()):
-        """جلب جميع الصفوف"""
+
+    def fetch_all(self, query, params=(), record=None):
+        """جلب جميع الصفوف (record: صنف سجل من database.records بدلاً من sqlite3.Row)"""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
+            cursor = record.cursor(conn) if record else conn.cursor()
             cursor.execute(query, params)
             return cursor.fetchall()
 
+    def fetch_batches(self, query, params=(), batch_size=DB_FETCH_BATCH_SIZE, record=None):
+        """جلب نتيجة استعلام كبير على دفعات (مولّد يعيد قوائم من batch_size صفاً)
+
+        يُحجز اتصال من المجمّع للمولّد وحده طوال القراءة (لا يُشارك مع باقي استدعاءات
+        الخيط ولا يؤخر حفظها)، فتُقرأ لقطة ثابتة من البيانات بذاكرة ثابتة، ولا تُقرأ
+        الدفعة التالية قبل أن يطلبها المستهلك. الاتصال يعود للمجمّع عند انتهاء الصفوف
+        أو عند إغلاق المولّد (close أو الخروج من الحلقة).
+        """
+        conn = self._acquire()
+        try:
+            cursor = record.cursor(conn) if record else conn.cursor()
+            cursor.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield rows
+            finally:
+                cursor.close()
+        finally:
+            self._release(conn)
+
+    def iter_query(self, query, params=(), batch_size=DB_FETCH_BATCH_SIZE, record=None):
+        """جلب صفوف استعلام كبير واحداً تلو الآخر (يقرأ على دفعات بواسطة fetch_batches)"""
+        batches = self.fetch_batches(query, params, batch_size, record)
+        try:
+            for rows in batches:
+                yield from rows
+        finally:
+            batches.close()
+
 
 # إنشاء مثيل واحد للاستخدام في جميع أنحاء التطبيق
 db = DatabaseConnection()
@@ -4,8 +4,95 @@
 import hashlib
 from database.connection import db
 from database.models import DatabaseModels
+from database.rollup import CREATE_DAILY_ROLLUP, REBUILD_DAILY_ROLLUP
+from database.product_sales import CREATE_PRODUCT_DAILY_SALES, REBUILD_PRODUCT_DAILY_SALES
 from config import DEFAULT_ADMIN, DEFAULT_CATEGORIES
-from utils.helpers import hash_password
+from utils.helpers import hash_password, ARABIC_NORMALIZATION
+
+
+def normalized_sql(expression):
+    """تعبير SQL يطبّق توحيد الحروف العربية (REPLACE متداخلة) على عمود أو قيمة"""
+    for source, target in ARABIC_NORMALIZATION.items():
+        expression = f"REPLACE({expression}, '{source}', '{target}')"
+    return expression
+
+
+# تحديثات المخطط المرقّمة: (رقم الإصدار، الوصف، جمل SQL أو (جملة، معاملات))
+# تُطبَّق بالترتيب مرة واحدة فقط ويُسجَّل رقمها في جدول schema_version
+SCHEMA_MIGRATIONS = [
+    (1, "فهارس التقارير والربط والبحث", [
+        # تصفية المبيعات بالتاريخ مع تغطية أعمدة ملخص المبيعات
+        "CREATE INDEX IF NOT EXISTS idx_sales_created_at ON sales (created_at, total_amount, discount)",
+        # ربط عناصر الفاتورة بالفاتورة مع تغطية أعمدة حساب الأرباح
+        """CREATE INDEX IF NOT EXISTS idx_sale_items_sale
+           ON sale_items (sale_id, product_id, quantity, price_at_sale, cost_at_sale, total_price)""",
+        "CREATE INDEX IF NOT EXISTS idx_sale_items_product ON sale_items (product_id, sale_id)",
+        # تصفية المنتجات بالقسم والتاجر والترتيب بالاسم
+        # (الباركود مفهرس مسبقاً بقيد UNIQUE)
+        "CREATE INDEX IF NOT EXISTS idx_products_category ON products (category_id, name)",
+        "CREATE INDEX IF NOT EXISTS idx_products_trader ON products (external_trader_id)",
+        "CREATE INDEX IF NOT EXISTS idx_products_name ON products (name)",
+        # تقارير المصروفات والمشتريات والمرتجعات بالتاريخ
+        "CREATE INDEX IF NOT EXISTS idx_expenses_created_at ON expenses (created_at, amount)",
+        "CREATE INDEX IF NOT EXISTS idx_purchases_created_at ON purchases (created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_purchases_product ON purchases (product_id)",
+        """CREATE INDEX IF NOT EXISTS idx_returns_created_at
+           ON returns (created_at, quantity, return_amount)""",
+        "CREATE INDEX IF NOT EXISTS idx_returns_sale ON returns (sale_id, product_id)",
+        "ANALYZE",
+    ]),
+    (2, "فهرس البحث النصي للمنتجات (FTS5)", [
+        # الاسم مخزّن بعد توحيد الحروف العربية، و rowid هو معرف المنتج
+        """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts
+           USING fts5(name, barcode, tokenize = 'unicode61 remove_diacritics 2')""",
+        f"""CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+                INSERT INTO products_fts (rowid, name, barcode)
+                VALUES (new.id, {normalized_sql('new.name')}, new.barcode);
+            END""",
+        """CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+               DELETE FROM products_fts WHERE rowid = old.id;
+           END""",
+        # تعديل المخزون والأسعار لا يمس الفهرس
+        f"""CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, barcode ON products BEGIN
+                DELETE FROM products_fts WHERE rowid = old.id;
+                INSERT INTO products_fts (rowid, name, barcode)
+                VALUES (new.id, {normalized_sql('new.name')}, new.barcode);
+            END""",
+        "DELETE FROM products_fts",
+        f"""INSERT INTO products_fts (rowid, name, barcode)
+            SELECT id, {normalized_sql('name')}, barcode FROM products""",
+    ]),
+    (3, "الملخص اليومي لمؤشرات لوحة التحكم", [
+        CREATE_DAILY_ROLLUP,
+        # ملء الملخص من البيانات الموجودة
+        (REBUILD_DAILY_ROLLUP, ('',) * 5),
+    ]),
+    (4, "لقطات تسويات التجار للفترات المغلقة", [
+        # صف لكل تاجر في كل فترة مغلقة، والاسم والنسب محفوظة كما كانت عند الإغلاق
+        """CREATE TABLE IF NOT EXISTS trader_settlements (
+            period_start TEXT NOT NULL,
+            period_end TEXT NOT NULL,
+            trader_id INTEGER NOT NULL,
+            trader_name TEXT NOT NULL,
+            total_sales INTEGER NOT NULL DEFAULT 0,
+            total_profit REAL NOT NULL DEFAULT 0,
+            shop_share REAL NOT NULL DEFAULT 0,
+            trader_share REAL NOT NULL DEFAULT 0,
+            shop_percentage REAL NOT NULL,
+            trader_percentage REAL NOT NULL,
+            closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (period_start, period_end, trader_id)
+        ) WITHOUT ROWID""",
+    ]),
+    (5, "مبيعات المنتجات اليومية لتقارير مبيعات المنتجات", [
+        CREATE_PRODUCT_DAILY_SALES,
+        # ملء الجدول من عناصر الفواتير الموجودة
+        (REBUILD_PRODUCT_DAILY_SALES, ('',)),
+    ]),
+]
+
+# آخر إصدار للمخطط، ويُحفظ في PRAGMA user_version بعد اكتمال التهيئة
+LATEST_SCHEMA_VERSION = SCHEMA_MIGRATIONS[-1][0]
 
 
 class DatabaseMigrations:
@@ -13,8 +100,16 @@ class DatabaseMigrations:
     
     @staticmethod
     def initialize():
-        """تهيئة قاعدة البيانات"""
+        """تهيئة قاعدة البيانات
+        
+        المسار السريع: قراءة PRAGMA user_version فقط، فإذا كان المخطط محدّثاً لا يُنفَّذ شيء.
+        غير ذلك (قاعدة جديدة أو تحديثات معلّقة) تُنشأ الجداول وتُطبَّق التحديثات
+        وتُضاف البيانات الافتراضية، ثم يُسجَّل الإصدار في user_version.
+        """
         try:
+            if DatabaseMigrations.get_user_version() >= LATEST_SCHEMA_VERSION:
+                return True
+            
             print("🔧 جاري تهيئة قاعدة البيانات...")
             
             # إنشاء الجداول
@@ -23,12 +118,33 @@ class DatabaseMigrations:
             # التأكد من وجود جدول المرتجعات (للقواعد القديمة)
             DatabaseMigrations.ensure_returns_table()
             
+            # تطبيق تحديثات المخطط المرقّمة (الفهارس...)
+            DatabaseMigrations.apply_schema_migrations()
+            
+            # إضافة البيانات الافتراضية (للقاعدة الجديدة)
+            if not DatabaseMigrations.seed_default_data():
+                return False
+            
+            DatabaseMigrations.set_user_version(LATEST_SCHEMA_VERSION)
+            
             print("✅ تمت تهيئة قاعدة البيانات بنجاح")
             return True
         except Exception as e:
             print(f"❌ خطأ في تهيئة قاعدة البيانات: {e}")
             return False
     
+    @staticmethod
+    def get_user_version():
+        """إصدار المخطط المسجّل في رأس ملف قاعدة البيانات (0 للقاعدة الجديدة)"""
+        with db.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    @staticmethod
+    def set_user_version(version):
+        """تسجيل إصدار المخطط بعد اكتمال التهيئة"""
+        with db.get_connection() as conn:
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+    
     @staticmethod
     def ensure_returns_table():
         """التأكد من وجود جدول المرتجعات"""
@@ -60,6 +176,45 @@ class DatabaseMigrations:
         except Exception as e:
             print(f"❌ خطأ في إنشاء جدول المرتجعات: {e}")
     
+    @staticmethod
+    def get_schema_version():
+        """الحصول على آخر إصدار مطبّق من المخطط"""
+        db.execute(
+            """CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )"""
+        )
+        result = db.fetch_one("SELECT MAX(version) as version FROM schema_version")
+        return result['version'] or 0
+    
+    @staticmethod
+    def apply_schema_migrations():
+        """تطبيق تحديثات المخطط التي لم تُطبَّق بعد"""
+        current_version = DatabaseMigrations.get_schema_version()
+        
+        for version, description, statements in SCHEMA_MIGRATIONS:
+            if version <= current_version:
+                continue
+            
+            print(f"🔧 تطبيق تحديث المخطط {version}: {description}")
+            with db.transaction(immediate=True) as conn:
+                cursor = conn.cursor()
+                for statement in statements:
+                    if isinstance(statement, tuple):
+                        cursor.execute(*statement)
+                    else:
+                        cursor.execute(statement)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                    (version, description)
+                )
+            
+            current_version = version
+        
+        return current_version
+    
     @staticmethod
     def seed_default_data():
         """إضافة البيانات الافتراضية"""
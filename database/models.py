@@ -164,6 +164,12 @@ class DatabaseModels:
                 FOREIGN KEY (sale_id) REFERENCES sales (id),
                 FOREIGN KEY (product_id) REFERENCES products (id),
                 FOREIGN KEY (user_id) REFERENCES users (id)
+            )""",
+            
+            # جدول تسلسل أرقام الفواتير (تحجز منه الأجهزة كتلاً من الأرقام)
+            """CREATE TABLE IF NOT EXISTS invoice_sequences (
+                name TEXT PRIMARY KEY,
+                next_value INTEGER NOT NULL
             )"""
         ]
         
@@ -0,0 +1,121 @@
+"""
+جدول مبيعات المنتجات اليومية (product_daily_sales) لتقارير مبيعات المنتجات
+"""
+import argparse
+from database.connection import db
+from database.records import Product
+from utils.helpers import date_range_filter
+
+
+CREATE_PRODUCT_DAILY_SALES = """CREATE TABLE IF NOT EXISTS product_daily_sales (
+    day TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    cost REAL NOT NULL DEFAULT 0,
+    profit REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, product_id)
+) WITHOUT ROWID"""
+
+_UPSERT_PRODUCT_SALES = """INSERT INTO product_daily_sales (day, product_id, quantity, revenue, cost, profit)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, product_id) DO UPDATE SET
+    quantity = quantity + excluded.quantity,
+    revenue = revenue + excluded.revenue,
+    cost = cost + excluded.cost,
+    profit = profit + excluded.profit"""
+
+# إعادة حساب الجدول من عناصر الفواتير ابتداءً من يوم معين ('' = كل الفترة)
+REBUILD_PRODUCT_DAILY_SALES = """INSERT INTO product_daily_sales (day, product_id, quantity, revenue, cost, profit)
+    SELECT substr(s.created_at, 1, 10), si.product_id,
+           SUM(si.quantity), SUM(si.total_price), SUM(si.quantity * si.cost_at_sale),
+           SUM((si.price_at_sale - si.cost_at_sale) * si.quantity)
+    FROM sale_items si
+    JOIN sales s ON si.sale_id = s.id
+    WHERE s.created_at >= ?
+    GROUP BY 1, 2"""
+
+# مجاميع عناصر فاتورة لكل منتج بنفس صيغ أعمدة الجدول
+SALE_ITEMS_TOTALS = """SELECT si.product_id,
+       SUM(si.quantity) as quantity, SUM(si.total_price) as revenue,
+       SUM(si.quantity * si.cost_at_sale) as cost,
+       SUM((si.price_at_sale - si.cost_at_sale) * si.quantity) as profit
+    FROM sale_items si
+    WHERE si.sale_id = ?
+    GROUP BY si.product_id"""
+
+
+def add_product_sales(conn, created_at, rows):
+    """إضافة فروقات مبيعات المنتجات ليوم العملية داخل معاملتها
+    
+    rows: قائمة (product_id, quantity, revenue, cost, profit)، والقيم السالبة للمرتجعات.
+    """
+    day = created_at[:10]
+    conn.executemany(_UPSERT_PRODUCT_SALES, [(day, *row) for row in rows])
+
+
+def get_sale_totals(conn, sale_id):
+    """مجاميع عناصر فاتورة لكل منتج: {product_id: (quantity, revenue, cost, profit)}"""
+    return {
+        row['product_id']: (row['quantity'], row['revenue'], row['cost'], row['profit'])
+        for row in conn.execute(SALE_ITEMS_TOTALS, (sale_id,))
+    }
+
+
+def rebuild_product_daily_sales(start_date=None):
+    """إعادة بناء الجدول من عناصر الفواتير (كاملاً أو ابتداءً من start_date)"""
+    start = start_date or ''
+    with db.transaction(immediate=True) as conn:
+        conn.execute("DELETE FROM product_daily_sales WHERE day >= ?", (start,))
+        conn.execute(REBUILD_PRODUCT_DAILY_SALES, (start,))
+        count = conn.execute(
+            "SELECT COUNT(*) as count FROM product_daily_sales WHERE day >= ?", (start,)
+        ).fetchone()['count']
+    return count
+
+
+def get_product_sales(start_date=None, end_date=None):
+    """مبيعات كل منتج في نطاق أيام (بدون تواريخ: كل الفترة) مع هامش الربح %"""
+    if start_date:
+        date_filter, params = date_range_filter('pds.day', start_date, end_date)
+    else:
+        date_filter, params = "1 = 1", ()
+    
+    return db.fetch_all(
+        f"""SELECT
+                p.id,
+                p.name as product_name,
+                c.name as category_name,
+                agg.total_quantity, agg.total_revenue, agg.total_cost, agg.total_profit,
+                CASE WHEN agg.total_revenue > 0
+                     THEN agg.total_profit * 100.0 / agg.total_revenue ELSE 0 END as profit_margin
+            FROM (
+                SELECT pds.product_id,
+                       SUM(pds.quantity) as total_quantity,
+                       SUM(pds.revenue) as total_revenue,
+                       SUM(pds.cost) as total_cost,
+                       SUM(pds.profit) as total_profit
+                FROM product_daily_sales pds
+                WHERE {date_filter}
+                GROUP BY pds.product_id
+                HAVING total_quantity > 0
+            ) agg
+            JOIN products p ON p.id = agg.product_id
+            LEFT JOIN categories c ON p.category_id = c.id""",
+        params,
+        record=Product
+    )
+
+
+def main():
+    """أمر إعادة بناء مبيعات المنتجات اليومية: python -m database.product_sales [--from YYYY-MM-DD]"""
+    parser = argparse.ArgumentParser(description="إعادة بناء جدول مبيعات المنتجات اليومية")
+    parser.add_argument('--from', dest='start_date', help="إعادة البناء ابتداءً من هذا اليوم")
+    args = parser.parse_args()
+    
+    count = rebuild_product_daily_sales(args.start_date)
+    print(f"✅ تمت إعادة بناء مبيعات المنتجات اليومية ({count} صف)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+سجلات مدمجة لصفوف الاستعلامات (بديل sqlite3.Row والقواميس في المسارات الساخنة)
+
+السجل صف (tuple) يُنشأ مباشرة من مصنع الصفوف (row_factory) بلا قاموس لكل صف:
+الوصول بالخاصية (sale.total_amount) أو بالاسم (sale['total_amount']) أو بالرقم
+كما في sqlite3.Row، و to_dict() للواجهة عند الحاجة لقاموس قابل للتعديل.
+"""
+from operator import itemgetter
+
+
+class Record(tuple):
+    """سجل صف استعلام
+    
+    لكل مجموعة أعمدة (شكل) صنف فرعي واحد يُنشأ عند أول استعلام ويُحفظ،
+    يحمل أسماء الأعمدة وخصائص الوصول إليها، فلا يُخزَّن في السجل إلا القيم.
+    """
+    
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+    
+    # أشكال الصنف: {أسماء الأعمدة: الصنف الفرعي}
+    _shapes = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # لكل صنف سجل أشكاله، والأشكال نفسها تشارك صنفها الأصلي
+        if '_shapes' not in cls.__dict__:
+            cls._shapes = {}
+    
+    @classmethod
+    def for_columns(cls, columns):
+        """الصنف الفرعي لمجموعة أعمدة (يُنشأ مرة واحدة لكل شكل)"""
+        columns = tuple(columns)
+        shapes = cls._shapes
+        shape = shapes.get(columns)
+        if shape is None:
+            namespace = {
+                '__slots__': (),
+                '_fields': columns,
+                '_index': {name: i for i, name in enumerate(columns)},
+                '_shapes': shapes,
+            }
+            for i, name in enumerate(columns):
+                # لا تُخفى دوال السجل ولا دوال tuple بأسماء الأعمدة (مثل count)
+                if name.isidentifier() and not name.startswith('_') and not hasattr(cls, name):
+                    namespace[name] = property(itemgetter(i))
+            shape = shapes.setdefault(columns, type(cls.__name__, (cls,), namespace))
+        return shape
+    
+    @classmethod
+    def cursor(cls, conn):
+        """مؤشر على الاتصال يعيد صفوفه سجلات من هذا الصنف
+        
+        مصنع الصفوف يُثبَّت على المؤشر نفسه ويحفظ شكل الصنف ما دام وصف
+        الأعمدة لم يتغير، فلا يُبحث عن الشكل لكل صف.
+        """
+        cursor = conn.cursor()
+        last = (None, None)
+        
+        def factory(cursor, row):
+            nonlocal last
+            description = cursor.description
+            if last[0] is not description:
+                last = (description, cls.for_columns(column[0] for column in description))
+            return last[1](row)
+        
+        cursor.row_factory = factory
+        return cursor
+    
+    @classmethod
+    def select(cls, conn, query, params=()):
+        """تنفيذ استعلام على الاتصال وإعادة المؤشر (fetchone/fetchall تعيد سجلات)"""
+        return cls.cursor(conn).execute(query, params)
+    
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+    
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+    
+    def keys(self):
+        """أسماء الأعمدة (كما في sqlite3.Row، وتسمح بـ dict(record))"""
+        return list(self._fields)
+    
+    def to_dict(self):
+        """قاموس جديد بقيم السجل (للواجهة أو للتعديل)"""
+        return dict(zip(self._fields, self))
+    
+    def __repr__(self):
+        values = ', '.join(f"{name}={value!r}" for name, value in zip(self._fields, self))
+        return f"{type(self).__name__}({values})"
+
+
+class Product(Record):
+    """منتج (products) مع أعمدة الاستعلام الإضافية مثل category_name"""
+    __slots__ = ()
+
+
+class Sale(Record):
+    """فاتورة بيع (sales) مع user_name و customer_name"""
+    __slots__ = ()
+
+
+class SaleItem(Record):
+    """عنصر فاتورة (sale_items) مع product_name"""
+    __slots__ = ()
+
+
+class Purchase(Record):
+    """عملية شراء (purchases) مع product_name و supplier_name"""
+    __slots__ = ()
+
+
+class Expense(Record):
+    """مصروف (expenses) مع user_name"""
+    __slots__ = ()
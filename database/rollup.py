@@ -0,0 +1,132 @@
+"""
+جدول الملخص اليومي (daily_rollup) لمؤشرات لوحة التحكم
+"""
+import argparse
+from database.connection import db
+from utils.helpers import date_range_filter
+
+
+# أعمدة القيم في الملخص اليومي
+ROLLUP_COLUMNS = (
+    'sales_count', 'sales_total', 'discount_total',
+    'items_revenue', 'items_cost',
+    'returns_count', 'returns_quantity', 'returns_amount',
+    'expenses_count', 'expenses_total',
+    'purchases_count', 'purchases_total',
+)
+
+CREATE_DAILY_ROLLUP = f"""CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT NOT NULL,
+    user_id INTEGER NOT NULL DEFAULT 0,
+    payment_method TEXT NOT NULL DEFAULT '',
+    {', '.join(f'{column} REAL NOT NULL DEFAULT 0' for column in ROLLUP_COLUMNS)},
+    PRIMARY KEY (day, user_id, payment_method)
+) WITHOUT ROWID"""
+
+_UPSERT_ROLLUP = f"""INSERT INTO daily_rollup (day, user_id, payment_method, {', '.join(ROLLUP_COLUMNS)})
+    VALUES (?, ?, ?, {', '.join('?' * len(ROLLUP_COLUMNS))})
+    ON CONFLICT (day, user_id, payment_method) DO UPDATE SET
+    {', '.join(f'{column} = {column} + excluded.{column}' for column in ROLLUP_COLUMNS)}"""
+
+
+def _rollup_select(select, source, where, group_by):
+    """جزء من استعلام إعادة البناء يملأ أعمدة معينة ويترك الباقي صفراً"""
+    values = ', '.join(f"{select.get(column, '0')} AS {column}" for column in ROLLUP_COLUMNS)
+    return f"""SELECT substr({group_by[0]}, 1, 10) AS day, {group_by[1]} AS user_id,
+               {group_by[2]} AS payment_method, {values}
+               FROM {source} WHERE {where} GROUP BY 1, 2, 3"""
+
+
+# إعادة حساب الملخص من الجداول الأصلية ابتداءً من يوم معين ('' = كل الفترة)
+REBUILD_DAILY_ROLLUP = f"""INSERT INTO daily_rollup (day, user_id, payment_method, {', '.join(ROLLUP_COLUMNS)})
+    SELECT day, user_id, payment_method, {', '.join(f'SUM({column})' for column in ROLLUP_COLUMNS)}
+    FROM ({' UNION ALL '.join([
+        _rollup_select(
+            {'sales_count': 'COUNT(*)', 'sales_total': 'SUM(total_amount)',
+             'discount_total': 'SUM(discount)'},
+            "sales", "created_at >= ?",
+            ("created_at", "COALESCE(user_id, 0)", "COALESCE(payment_method, '')")
+        ),
+        _rollup_select(
+            {'items_revenue': 'SUM(si.total_price)',
+             'items_cost': 'SUM(si.cost_at_sale * si.quantity)'},
+            "sale_items si JOIN sales s ON si.sale_id = s.id", "s.created_at >= ?",
+            ("s.created_at", "COALESCE(s.user_id, 0)", "COALESCE(s.payment_method, '')")
+        ),
+        _rollup_select(
+            {'returns_count': 'COUNT(*)', 'returns_quantity': 'SUM(quantity)',
+             'returns_amount': 'SUM(return_amount)'},
+            "returns", "created_at >= ?",
+            ("created_at", "COALESCE(user_id, 0)", "''")
+        ),
+        _rollup_select(
+            {'expenses_count': 'COUNT(*)', 'expenses_total': 'SUM(amount)'},
+            "expenses", "created_at >= ?",
+            ("created_at", "COALESCE(user_id, 0)", "''")
+        ),
+        _rollup_select(
+            {'purchases_count': 'COUNT(*)', 'purchases_total': 'SUM(total_amount)'},
+            "purchases", "created_at >= ?",
+            ("created_at", "0", "''")
+        ),
+    ])})
+    GROUP BY day, user_id, payment_method"""
+
+
+def add_to_rollup(conn, created_at, user_id=0, payment_method='', **values):
+    """إضافة فروقات إلى صف الملخص اليومي داخل معاملة العملية نفسها
+    
+    created_at: وقت العملية ('YYYY-MM-DD HH:MM:SS')، ويُستخدم تاريخه كيوم الملخص.
+    values: فروقات الأعمدة (مثل sales_count=1, sales_total=150)، والقيم السالبة للإلغاء.
+    """
+    unknown = set(values) - set(ROLLUP_COLUMNS)
+    if unknown:
+        raise ValueError(f"أعمدة غير معروفة في الملخص اليومي: {', '.join(sorted(unknown))}")
+    
+    conn.execute(
+        _UPSERT_ROLLUP,
+        (created_at[:10], user_id or 0, payment_method or '',
+         *(values.get(column, 0) for column in ROLLUP_COLUMNS))
+    )
+
+
+def rebuild_daily_rollup(start_date=None):
+    """إعادة بناء الملخص اليومي من الجداول الأصلية (كاملاً أو ابتداءً من start_date)"""
+    start = start_date or ''
+    with db.transaction(immediate=True) as conn:
+        conn.execute("DELETE FROM daily_rollup WHERE day >= ?", (start,))
+        conn.execute(REBUILD_DAILY_ROLLUP, (start,) * 5)
+        count = conn.execute(
+            "SELECT COUNT(*) as count FROM daily_rollup WHERE day >= ?", (start,)
+        ).fetchone()['count']
+    return count
+
+
+def get_rollup_totals(start_date=None, end_date=None, user_id=None):
+    """مجاميع الملخص لنطاق أيام (بدون تواريخ: اليوم الحالي)، اختيارياً لمستخدم واحد"""
+    date_filter, params = date_range_filter('day', start_date, end_date)
+    if user_id is not None:
+        date_filter += " AND user_id = ?"
+        params = (*params, user_id)
+    
+    result = db.fetch_one(
+        f"""SELECT {', '.join(f'COALESCE(SUM({column}), 0) as {column}' for column in ROLLUP_COLUMNS)}
+           FROM daily_rollup
+           WHERE {date_filter}""",
+        params
+    )
+    return dict(result)
+
+
+def main():
+    """أمر إعادة بناء الملخص اليومي: python -m database.rollup [--from YYYY-MM-DD]"""
+    parser = argparse.ArgumentParser(description="إعادة بناء جدول الملخص اليومي")
+    parser.add_argument('--from', dest='start_date', help="إعادة البناء ابتداءً من هذا اليوم")
+    args = parser.parse_args()
+    
+    count = rebuild_daily_rollup(args.start_date)
+    print(f"✅ تمت إعادة بناء الملخص اليومي ({count} صف)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+توزيع أرقام الفواتير من جدول تسلسل في قاعدة البيانات
+"""
+import threading
+from database.connection import db
+from config import TILL_ID, INVOICE_BLOCK_SIZE
+
+
+class InvoiceNumberAllocator:
+    """موزّع أرقام الفواتير
+    
+    كل جهاز (till) يحجز كتلة من الأرقام دفعة واحدة من جدول invoice_sequences،
+    ثم يوزعها من الذاكرة دون الرجوع لقاعدة البيانات. الكتل لا تتداخل بين الأجهزة
+    فلا يتكرر رقم فاتورة حتى مع عدة أجهزة أو عدة عمليات بيع في نفس الثانية.
+    """
+    
+    def __init__(self, prefix='INV', till_id=TILL_ID, block_size=INVOICE_BLOCK_SIZE):
+        self.prefix = prefix
+        self.till_id = till_id
+        self.block_size = block_size
+        
+        self._lock = threading.Lock()
+        self._next_value = 0
+        self._block_end = 0
+    
+    def _reserve_block(self):
+        """حجز كتلة جديدة من الأرقام في معاملة مستقلة"""
+        with db.transaction(immediate=True) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO invoice_sequences (name, next_value) VALUES (?, 1)",
+                (self.prefix,)
+            )
+            start = conn.execute(
+                "SELECT next_value FROM invoice_sequences WHERE name = ?",
+                (self.prefix,)
+            ).fetchone()['next_value']
+            conn.execute(
+                "UPDATE invoice_sequences SET next_value = ? WHERE name = ?",
+                (start + self.block_size, self.prefix)
+            )
+        
+        self._next_value = start
+        self._block_end = start + self.block_size
+    
+    def next_number(self):
+        """الحصول على رقم الفاتورة التالي
+        
+        يجب استدعاؤها قبل بدء معاملة البيع: حجز الكتلة يُحفظ مستقلاً حتى لا
+        يُلغى مع تراجع عملية بيع فاشلة فيُعاد توزيع نفس الأرقام.
+        """
+        with self._lock:
+            if self._next_value >= self._block_end:
+                self._reserve_block()
+            
+            value = self._next_value
+            self._next_value += 1
+        
+        return f"{self.prefix}-{self.till_id:02d}-{value:07d}"
+
+
+# موزّعات مشتركة للاستخدام في جميع أنحاء التطبيق
+invoice_numbers = InvoiceNumberAllocator('INV')
+custom_invoice_numbers = InvoiceNumberAllocator('CUSTOM')
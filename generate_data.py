@@ -0,0 +1,391 @@
+"""
+أداة توليد بيانات تجريبية بحجم الإنتاج (لقياس أداء المتحكمات والتقارير)
+نفس البذرة ونفس الإعدادات تعطي نفس قاعدة البيانات دائماً
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from database.connection import db
+from database.migrations import DatabaseMigrations
+from import_data import drop_secondary_indexes, rebuild_derived_tables, get_table_column_mapping
+from config import TILL_ID
+
+# أحجام جاهزة: عدد المنتجات، سطور الفواتير، التجار، العملاء، الموردين، السنوات، المصروفات اليومية
+SCALES = {
+    'small': {'products': 2000, 'sale_lines': 50000, 'traders': 20, 'customers': 500,
+              'suppliers': 10, 'years': 1, 'expenses_per_day': 2},
+    'medium': {'products': 20000, 'sale_lines': 500000, 'traders': 100, 'customers': 2000,
+               'suppliers': 30, 'years': 3, 'expenses_per_day': 3},
+    'production': {'products': 50000, 'sale_lines': 2000000, 'traders': 500, 'customers': 5000,
+                   'suppliers': 50, 'years': 5, 'expenses_per_day': 3},
+}
+
+# آخر يوم في البيانات المولدة (ثابت حتى تتطابق القواعد بين التشغيلات)
+DEFAULT_END_DATE = "2025-12-31"
+
+GENERATOR_BATCH_SIZE = 10000
+
+PART_NAMES = ['فلتر زيت', 'فلتر هواء', 'فلتر بنزين', 'فلتر مكيف', 'تيل فرامل', 'طنبورة',
+              'بوجيه', 'كويل', 'سير مجموعة', 'سير كاتينة', 'طرمبة مياه', 'طرمبة بنزين',
+              'رادياتير', 'مروحة رادياتير', 'مساعد أمامي', 'مساعد خلفي', 'مقص', 'بلية عجل',
+              'كبالن', 'دبرياج', 'اسطوانة فرامل', 'حساس أكسجين', 'حساس حرارة', 'دينامو',
+              'مارش', 'كشاف أمامي', 'فانوس خلفي', 'مراية جانبية', 'مساحات', 'جوان وش سلندر',
+              'زيت محرك', 'زيت فتيس', 'سائل فرامل', 'مياه رادياتير', 'بطارية', 'إطار']
+BRANDS = ['تويوتا', 'هيونداي', 'كيا', 'نيسان', 'شيفروليه', 'ميتسوبيشي', 'فيات', 'رينو',
+          'بيجو', 'سكودا', 'أوبل', 'مازدا', 'سوزوكي', 'بي إم', 'مرسيدس', 'لادا']
+MAKERS = ['أصلي', 'تايواني', 'ياباني', 'كوري', 'صيني', 'ألماني', 'تركي']
+EXPENSE_CATEGORIES = [('عام', 30), ('إيجار', 3), ('كهرباء', 5), ('رواتب', 8), ('نقل', 20),
+                      ('صيانة', 10), ('ضيافة', 24)]
+PAYMENT_METHODS = [('نقدي', 85), ('بطاقة', 10), ('آجل', 5)]
+# عدد المنتجات في الفاتورة، والكمية في السطر
+ITEMS_PER_SALE = [(1, 45), (2, 25), (3, 15), (4, 8), (5, 4), (8, 3)]
+ITEM_QUANTITIES = [(1, 70), (2, 18), (3, 6), (4, 4), (10, 2)]
+
+
+def cumulative(weights):
+    """أوزان تراكمية (لـ random.choices و bisect)"""
+    total = 0
+    result = []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+class WeightedChoice:
+    """اختيار عشوائي موزون سريع لقائمة ثابتة"""
+    
+    def __init__(self, rng, pairs):
+        self.rng = rng
+        self.values = [value for value, _ in pairs]
+        self.cum_weights = cumulative([weight for _, weight in pairs])
+        self.total = self.cum_weights[-1]
+    
+    def __call__(self):
+        return self.values[bisect.bisect(self.cum_weights, self.rng.random() * self.total)]
+
+
+class DataGenerator:
+    """مولّد بيانات تجريبية حتمي
+    
+    المنتجات تُباع بتوزيع Zipf (قلة من الأصناف تصنع معظم المبيعات)، والتجار
+    يملكون أعداداً متفاوتة من المنتجات، وعدد الفواتير اليومي ينمو عبر السنوات
+    ويتغير حسب يوم الأسبوع. كل جدول يُدرج على دفعات في معاملة واحدة.
+    """
+    
+    def __init__(self, db_path, products, sale_lines, traders, customers, suppliers,
+                 years, expenses_per_day, seed=42, end_date=DEFAULT_END_DATE, batch_size=GENERATOR_BATCH_SIZE):
+        self.db_path = db_path
+        self.counts = {
+            'products': products, 'sale_lines': sale_lines, 'traders': traders,
+            'customers': customers, 'suppliers': suppliers
+        }
+        self.expenses_per_day = expenses_per_day
+        self.end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        self.start_date = self.end_date - timedelta(days=int(365.25 * years) - 1)
+        self.days = (self.end_date - self.start_date).days + 1
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.stats = {}
+    
+    def insert(self, cursor, table, columns, rows):
+        """إدراج صفوف مولّد على دفعات"""
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        batch = []
+        count = 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                cursor.executemany(query, batch)
+                count += len(batch)
+                batch.clear()
+        cursor.executemany(query, batch)
+        count += len(batch)
+        
+        self.stats[table] = self.stats.get(table, 0) + count
+        print(f"   ✓ {table}: {count} سجل")
+    
+    def random_time(self, day):
+        """وقت عشوائي خلال ساعات العمل (9 صباحاً - 10 مساءً) بصيغة created_at"""
+        seconds = self.rng.randrange(9 * 3600, 22 * 3600)
+        return (day + timedelta(seconds=seconds)).strftime('%Y-%m-%d %H:%M:%S')
+    
+    def day_weights(self):
+        """وزن كل يوم: نمو خطي عبر الفترة، الجمعة أهدأ، والسبت والخميس أنشط"""
+        weekday_factor = {4: 0.5, 5: 1.3, 3: 1.2}
+        return [
+            (1 + 0.6 * index / self.days) * weekday_factor.get((self.start_date + timedelta(days=index)).weekday(), 1)
+            for index in range(self.days)
+        ]
+    
+    def generate_people(self, cursor):
+        """التجار والموردون والعملاء"""
+        rng = self.rng
+        
+        self.insert(cursor, 'external_traders', ('name', 'phone', 'shop_percentage', 'trader_percentage', 'created_at'), (
+            (f"تاجر {index}", f"010{rng.randrange(10 ** 8):08d}", shop, 100 - shop,
+             self.random_time(self.start_date))
+            for index in range(1, self.counts['traders'] + 1)
+            for shop in [rng.choice((10, 15, 20, 25, 30))]
+        ))
+        
+        self.insert(cursor, 'suppliers', ('name', 'phone', 'company'), (
+            (f"مورد {index}", f"011{rng.randrange(10 ** 8):08d}", f"شركة {rng.choice(MAKERS)} {index}")
+            for index in range(1, self.counts['suppliers'] + 1)
+        ))
+        
+        self.insert(cursor, 'customers', ('name', 'phone', 'created_at'), (
+            (f"عميل {index}", f"012{rng.randrange(10 ** 8):08d}",
+             self.random_time(self.start_date + timedelta(days=rng.randrange(self.days))))
+            for index in range(1, self.counts['customers'] + 1)
+        ))
+    
+    def generate_products(self, cursor):
+        """المنتجات: ربعها لتجار خارجيين (التاجر الأول يملك أكثر من الأخير)"""
+        rng = self.rng
+        category_ids = [row[0] for row in cursor.execute("SELECT id FROM categories")]
+        trader_ids = [row[0] for row in cursor.execute("SELECT id FROM external_traders")]
+        supplier_ids = [row[0] for row in cursor.execute("SELECT id FROM suppliers")]
+        pick_trader = WeightedChoice(rng, [(trader_id, 1 / rank) for rank, trader_id in enumerate(trader_ids, 1)]) \
+            if trader_ids else None
+        first_barcode = 6220000000000 + (cursor.execute("SELECT COALESCE(MAX(id), 0) FROM products").fetchone()[0])
+        
+        def rows():
+            for index in range(self.counts['products']):
+                cost = round(min(rng.lognormvariate(4.5, 1.2), 20000), 2)
+                yield (
+                    f"{rng.choice(PART_NAMES)} {rng.choice(BRANDS)} {rng.choice(MAKERS)} {rng.randrange(100, 10000)}",
+                    rng.choice(category_ids),
+                    round(cost * rng.uniform(1.15, 1.6), 2),
+                    cost,
+                    rng.randrange(0, 200),
+                    5,
+                    str(first_barcode + index),
+                    rng.choice(supplier_ids) if supplier_ids else None,
+                    pick_trader() if trader_ids and rng.random() < 0.25 else None,
+                    self.random_time(self.start_date)
+                )
+        
+        self.insert(cursor, 'products', ('name', 'category_id', 'sell_price', 'cost_price', 'stock', 'min_stock',
+                                         'barcode', 'supplier_id', 'external_trader_id', 'created_at'), rows())
+    
+    def generate_sales(self, cursor):
+        """الفواتير وعناصرها والمرتجعات بترتيب زمني"""
+        rng = self.rng
+        products = cursor.execute("SELECT id, sell_price, cost_price FROM products").fetchall()
+        shuffled = products[:]
+        rng.shuffle(shuffled)
+        pick_product = WeightedChoice(rng, [(product, 1 / rank ** 1.1) for rank, product in enumerate(shuffled, 1)])
+        pick_items = WeightedChoice(rng, ITEMS_PER_SALE)
+        pick_quantity = WeightedChoice(rng, ITEM_QUANTITIES)
+        pick_payment = WeightedChoice(rng, PAYMENT_METHODS)
+        user_ids = [row[0] for row in cursor.execute("SELECT id FROM users")]
+        customers_count = self.counts['customers']
+        
+        # عدد الفواتير لكل يوم حسب وزنه
+        avg_items = sum(value * weight for value, weight in ITEMS_PER_SALE) / sum(weight for _, weight in ITEMS_PER_SALE)
+        weights = self.day_weights()
+        per_weight = self.counts['sale_lines'] / avg_items / sum(weights)
+        
+        next_sale_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM sales").fetchone()[0] + 1
+        sales, items, returns = [], [], []
+        
+        def flush():
+            cursor.executemany(
+                """INSERT INTO sales (id, invoice_number, user_id, customer_id, total_amount, discount,
+                                      payment_method, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", sales)
+            cursor.executemany(
+                """INSERT INTO sale_items (sale_id, product_id, quantity, price_at_sale, cost_at_sale,
+                                           discount, total_price) VALUES (?, ?, ?, ?, ?, 0, ?)""", items)
+            cursor.executemany(
+                """INSERT INTO returns (sale_id, product_id, quantity, return_amount, user_id, reason, created_at)
+                   VALUES (?, ?, ?, ?, ?, 'مرتجع', ?)""", returns)
+            for table, rows in (('sales', sales), ('sale_items', items), ('returns', returns)):
+                self.stats[table] = self.stats.get(table, 0) + len(rows)
+                rows.clear()
+        
+        for index, weight in enumerate(weights):
+            day = self.start_date + timedelta(days=index)
+            expected = weight * per_weight
+            count = int(expected) + (rng.random() < expected - int(expected))
+            
+            for created_at in sorted(self.random_time(day) for _ in range(count)):
+                sale_id = next_sale_id
+                next_sale_id += 1
+                user_id = rng.choice(user_ids)
+                total = 0
+                
+                for _ in range(pick_items()):
+                    product_id, price, cost = pick_product()
+                    quantity = pick_quantity()
+                    items.append((sale_id, product_id, quantity, price, cost, price * quantity))
+                    total += price * quantity
+                    
+                    if rng.random() < 0.005:
+                        returned_at = (datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S')
+                                       + timedelta(days=rng.randrange(1, 15))).strftime('%Y-%m-%d %H:%M:%S')
+                        returns.append((sale_id, product_id, 1, price, user_id, returned_at))
+                
+                discount = round(total * 0.05, 2) if rng.random() < 0.05 else 0
+                sales.append((
+                    sale_id, f"INV-{TILL_ID:02d}-{sale_id:07d}", user_id,
+                    rng.randrange(1, customers_count + 1) if customers_count and rng.random() < 0.3 else None,
+                    round(total - discount, 2), discount, pick_payment(), created_at
+                ))
+            
+            if len(items) >= self.batch_size:
+                flush()
+        
+        flush()
+        
+        # الأرقام الجديدة تبدأ بعد آخر فاتورة مولدة
+        cursor.execute(
+            "INSERT OR REPLACE INTO invoice_sequences (name, next_value) VALUES ('INV', ?)",
+            (next_sale_id,)
+        )
+        print(f"   ✓ sales: {self.stats['sales']} | sale_items: {self.stats['sale_items']} | returns: {self.stats['returns']}")
+    
+    def generate_expenses_and_purchases(self, cursor):
+        """المصروفات اليومية والمشتريات (بمعدل مشترى لكل 20 سطر بيع)"""
+        rng = self.rng
+        user_ids = [row[0] for row in cursor.execute("SELECT id FROM users")]
+        supplier_ids = [row[0] for row in cursor.execute("SELECT id FROM suppliers")] or [None]
+        product_ids = [row[0] for row in cursor.execute("SELECT id FROM products")]
+        pick_category = WeightedChoice(rng, EXPENSE_CATEGORIES)
+        
+        def expenses():
+            for index in range(self.days):
+                day = self.start_date + timedelta(days=index)
+                for _ in range(rng.randrange(0, 2 * self.expenses_per_day + 1)):
+                    category = pick_category()
+                    amount = round(rng.lognormvariate(5, 1), 2)
+                    yield (rng.choice(user_ids), amount, f"مصروف {category}", category, self.random_time(day))
+        
+        self.insert(cursor, 'expenses', ('user_id', 'amount', 'description', 'category', 'created_at'), expenses())
+        
+        def purchases():
+            for index in range(self.counts['sale_lines'] // 20):
+                quantity = rng.randrange(1, 50)
+                cost = round(rng.lognormvariate(4.5, 1.2), 2)
+                day = self.start_date + timedelta(days=rng.randrange(self.days))
+                yield (rng.choice(supplier_ids), rng.choice(product_ids), quantity, cost,
+                       round(quantity * cost, 2), f"PUR-{index // 10 + 1:06d}", self.random_time(day))
+        
+        self.insert(cursor, 'purchases', ('supplier_id', 'product_id', 'quantity', 'cost_price',
+                                          'total_amount', 'invoice_number', 'created_at'), purchases())
+    
+    def generate(self):
+        """توليد قاعدة البيانات كاملة"""
+        started = time.perf_counter()
+        
+        # إنشاء المخطط والبيانات الافتراضية بنفس مسار تشغيل البرنامج
+        db.configure(db_name=self.db_path)
+        DatabaseMigrations.initialize()
+        db.close_all()
+        
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            deferred = drop_secondary_indexes(
+                cursor, ['external_traders', 'suppliers', 'customers', 'products',
+                         'sales', 'sale_items', 'returns', 'expenses', 'purchases']
+            )
+            
+            print("\n📥 توليد البيانات...")
+            self.generate_people(cursor)
+            self.generate_products(cursor)
+            self.generate_sales(cursor)
+            self.generate_expenses_and_purchases(cursor)
+            
+            print("🔧 إنشاء الفهارس...")
+            for sql in deferred:
+                cursor.execute(sql)
+            rebuild_derived_tables(cursor)
+            
+            cursor.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        elapsed = time.perf_counter() - started
+        size_mb = os.path.getsize(self.db_path) / 1024 / 1024
+        print(f"\n✅ تم توليد {self.db_path} ({size_mb:.1f} MB) في {elapsed:.1f} ثانية")
+        return self.stats
+
+
+def sql_literal(value):
+    """قيمة بصيغة ملف SQL: NULL أو رقم أو نص بين علامتي اقتباس ('' داخله = ')"""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def write_sql_dump(db_path, sql_path):
+    """كتابة قاعدة بيانات كملف SQL بصيغة النسخة القديمة (لقياس import_data)
+    
+    جملة INSERT لكل صف بأعمدة get_table_column_mapping بالترتيب، كما يصدّرها
+    DB Browser for SQLite، ويعيد عدد الصفوف المكتوبة.
+    """
+    conn = sqlite3.connect(db_path)
+    total = 0
+    try:
+        with open(sql_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(f"-- {os.path.basename(db_path)}: dump of generated data, don't edit\n")
+            f.write("BEGIN TRANSACTION;\n")
+            for table, columns in get_table_column_mapping().items():
+                f.write(f"-- {table}\n")
+                for row in conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY id"):
+                    f.write(f'INSERT INTO "{table}" VALUES ({",".join(map(sql_literal, row))});\n')
+                    total += 1
+            f.write("COMMIT;\n")
+    finally:
+        conn.close()
+    return total
+
+
+def main():
+    """أمر التوليد: python generate_data.py OUTPUT.db [--scale production] [--products N ...] [--dump FILE.sql]"""
+    parser = argparse.ArgumentParser(description="توليد قاعدة بيانات تجريبية بحجم الإنتاج")
+    parser.add_argument('db_path', help="مسار قاعدة البيانات الناتجة (يجب ألا تكون موجودة)")
+    parser.add_argument('--scale', choices=SCALES, default='small', help="حجم جاهز (small افتراضياً)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', default=DEFAULT_END_DATE, help="آخر يوم في البيانات YYYY-MM-DD")
+    for option in SCALES['small']:
+        parser.add_argument(f"--{option.replace('_', '-')}", dest=option, type=int, help="يتجاوز قيمة الحجم الجاهز")
+    parser.add_argument('--dump', metavar='FILE', help="كتابة البيانات المولدة أيضاً كملف SQL بصيغة النسخة القديمة")
+    args = parser.parse_args()
+    
+    if os.path.exists(args.db_path):
+        parser.error(f"الملف موجود بالفعل: {args.db_path}")
+    
+    options = dict(SCALES[args.scale])
+    for option in options:
+        if getattr(args, option) is not None:
+            options[option] = getattr(args, option)
+    
+    print("="*60)
+    print("       أداة توليد البيانات التجريبية - نظام نقاط البيع")
+    print("="*60)
+    print("   " + " | ".join(f"{key}={value}" for key, value in options.items()) + f" | seed={args.seed}")
+    
+    DataGenerator(args.db_path, seed=args.seed, end_date=args.end_date, **options).generate()
+    
+    if args.dump:
+        rows = write_sql_dump(args.db_path, args.dump)
+        size_mb = os.path.getsize(args.dump) / 1024 / 1024
+        print(f"📄 تم كتابة {args.dump}: {rows} سجل ({size_mb:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
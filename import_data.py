@@ -6,66 +6,126 @@
 import sqlite3
 import os
 import re
-from datetime import datetime
+from database.backup import create_backup
+from database.rollup import REBUILD_DAILY_ROLLUP
+from database.product_sales import REBUILD_PRODUCT_DAILY_SALES
+from database.migrations import normalized_sql
 
-def parse_sql_file(sql_file_path):
-    """قراءة وتحليل ملف SQL"""
-    with open(sql_file_path, 'r', encoding='utf-8') as f:
-        sql_content = f.read()
+# عدد السجلات في كل دفعة executemany
+IMPORT_BATCH_SIZE = 5000
+
+# بداية جملة INSERT: اسم الجدول ثم القيم (مع أو بدون قائمة أعمدة)
+INSERT_PATTERN = re.compile(r'INSERT INTO\s+"?(\w+)"?.*?VALUES\s*', re.DOTALL | re.IGNORECASE)
+
+# صف داخل قائمة القيم (...)، ثم قيم الصف: نص بين علامات اقتباس ('' داخله = ') أو قيمة مجردة
+ROW_PATTERN = re.compile(r"\(((?:[^'()]+|'(?:[^']+|'')*')*)\)")
+VALUE_PATTERN = re.compile(r"(')((?:[^']+|'')*)'|([^,\s]+)")
+
+# ما يغيّر الحالة خارج النصوص: بداية نص أو بداية تعليق حتى نهاية السطر
+SQL_TOKEN_PATTERN = re.compile(r"'|--")
+
+def strip_sql_comment(line, in_string):
+    """حذف تعليق -- من سطر SQL مع تتبع النصوص: (السطر بدون التعليق، هل ينتهي داخل نص)
     
-    # استخراج جمل INSERT
-    insert_pattern = r'INSERT INTO "(\w+)".*?VALUES\s+(.*?);'
-    matches = re.findall(insert_pattern, sql_content, re.DOTALL | re.MULTILINE)
+    علامة الاقتباس داخل النص تغلقه، و'' المحمية تغلقه ثم تفتحه فلا تغير الحالة.
+    -- داخل نص ليست تعليقاً، وعلامات الاقتباس داخل التعليق لا تُحسب.
+    """
+    pos = 0
+    while True:
+        if in_string:
+            quote = line.find("'", pos)
+            if quote < 0:
+                return line, True
+            in_string = False
+            pos = quote + 1
+        else:
+            match = SQL_TOKEN_PATTERN.search(line, pos)
+            if match is None:
+                return line, False
+            if match.group() == '--':
+                return line[:match.start()] + '\n', False
+            in_string = True
+            pos = match.end()
+
+def iter_sql_statements(sql_file_path):
+    """قراءة جمل ملف SQL واحدة تلو الأخرى دون تحميل الملف كاملاً
     
-    data_dict = {}
-    for table_name, values_str in matches:
-        if table_name not in data_dict:
-            data_dict[table_name] = []
-        
-        # تحليل القيم - تعامل مع القيم المتعددة
-        rows = []
-        current_row = []
+    تعيد (الجملة، عدد البايتات المقروءة حتى نهايتها). الجملة تنتهي بسطر آخره ;
+    خارج النصوص، والتعليقات (-- حتى نهاية السطر) تُحذف قبل ذلك (strip_sql_comment).
+    """
+    with open(sql_file_path, 'rb') as f:
+        lines = []
         in_string = False
-        paren_depth = 0
-        current_value = ''
+        bytes_read = 0
         
-        for char in values_str:
-            if char == "'" and (not current_value or current_value[-1] != '\\'):
-                in_string = not in_string
-                current_value += char
-            elif char == '(' and not in_string:
-                paren_depth += 1
-                if paren_depth == 1:
-                    current_value = ''
-            elif char == ')' and not in_string:
-                paren_depth -= 1
-                if paren_depth == 0:
-                    if current_value:
-                        current_row.append(current_value.strip())
-                    rows.append(current_row)
-                    current_row = []
-                    current_value = ''
-            elif char == ',' and not in_string:
-                if paren_depth > 0:
-                    current_row.append(current_value.strip())
-                    current_value = ''
-            else:
-                current_value += char
+        for raw_line in f:
+            bytes_read += len(raw_line)
+            line, ends_in_string = strip_sql_comment(raw_line.decode('utf-8'), in_string)
+            
+            # أسطر التعليقات والأسطر الفارغة بين الجمل لا تدخل في أي جملة
+            if in_string or line.strip():
+                lines.append(line)
+            in_string = ends_in_string
+            
+            if not in_string and line.rstrip().endswith(';'):
+                yield ''.join(lines), bytes_read
+                lines = []
         
-        data_dict[table_name].extend(rows)
-    
+        if lines and ''.join(lines).strip():
+            yield ''.join(lines), bytes_read
+
+def parse_values(values_str):
+    """تحليل قائمة القيم (...),(...) إلى صفوف من القيم المنظفة"""
+    return [
+        [
+            text.replace("''", "'") if quote else (None if bare.upper() == 'NULL' else bare)
+            for quote, text, bare in VALUE_PATTERN.findall(row_text)
+        ]
+        for row_text in ROW_PATTERN.findall(values_str)
+    ]
+
+def iter_sql_rows(sql_file_path):
+    """صفوف جمل INSERT في ملف SQL بالترتيب: (الجدول، القيم، البايتات المقروءة)"""
+    for statement, bytes_read in iter_sql_statements(sql_file_path):
+        match = INSERT_PATTERN.search(statement)
+        if not match:
+            continue
+        
+        values_str = statement[match.end():].rstrip().rstrip(';')
+        for row in parse_values(values_str):
+            yield match.group(1), row, bytes_read
+
+def parse_sql_file(sql_file_path):
+    """قراءة وتحليل ملف SQL كاملاً: {الجدول: [الصفوف]}"""
+    data_dict = {}
+    for table_name, row, _ in iter_sql_rows(sql_file_path):
+        data_dict.setdefault(table_name, []).append(row)
     return data_dict
 
-def clean_value(value):
-    """تنظيف القيمة من علامات الاقتباس والمسافات"""
-    value = value.strip()
-    if value == 'NULL':
-        return None
-    if value.startswith("'") and value.endswith("'"):
-        value = value[1:-1]
-        # استبدال العلامات المحمية
-        value = value.replace("''", "'")
-    return value
+# تحويل القيم حسب نوع العمود
+INTEGER_COLUMNS = {'id', 'user_id', 'category_id', 'product_id', 'sale_id', 'supplier_id',
+                   'quantity', 'stock', 'active', 'is_active'}
+REAL_COLUMNS = {'sell_price', 'cost_price', 'total_amount', 'price_at_sale', 'cost_at_sale',
+                'total_price', 'amount', 'shop_percentage', 'trader_percentage'}
+
+def build_row_converter(columns):
+    """دالة تحويل صف من نصوص ملف SQL إلى قيم الأعمدة"""
+    converters = []
+    for column in columns:
+        if column in INTEGER_COLUMNS:
+            converters.append(lambda val: int(val) if val else 0)
+        elif column in REAL_COLUMNS:
+            converters.append(lambda val: float(val) if val else 0.0)
+        else:
+            converters.append(None)
+    
+    def convert(row):
+        return [
+            val if val is None or converter is None else converter(val)
+            for converter, val in zip(converters, row)
+        ]
+    
+    return convert
 
 def get_table_column_mapping():
     """مطابقة أعمدة ملف SQL القديم مع الجداول الجديدة"""
@@ -82,8 +142,60 @@ def get_table_column_mapping():
         'purchases': ['id', 'supplier_id', 'product_id', 'quantity', 'cost_price', 'total_amount', 'created_at']  # القديم: purchase_date → الجديد: created_at
     }
 
-def import_data_to_database(sql_file_path, db_path):
-    """استيراد البيانات من ملف SQL إلى قاعدة البيانات"""
+def drop_secondary_indexes(cursor, tables):
+    """حذف الفهارس والمشغلات على الجداول المستوردة وإعادة جمل إنشائها (لتأجيلها لما بعد التحميل)"""
+    placeholders = ','.join('?' * len(tables))
+    objects = cursor.execute(
+        f"""SELECT type, name, sql FROM sqlite_master
+            WHERE type IN ('index', 'trigger') AND sql IS NOT NULL
+            AND tbl_name IN ({placeholders})""",
+        tuple(tables)
+    ).fetchall()
+    
+    for object_type, name, _ in objects:
+        cursor.execute(f'DROP {object_type.upper()} "{name}"')
+    
+    return [sql for _, _, sql in objects]
+
+def rebuild_derived_tables(cursor):
+    """إعادة بناء الجداول المشتقة (الملخص اليومي، مبيعات المنتجات، فهرس البحث) من البيانات المستوردة"""
+    existing = {
+        row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    }
+    
+    if 'daily_rollup' in existing:
+        cursor.execute("DELETE FROM daily_rollup")
+        cursor.execute(REBUILD_DAILY_ROLLUP, ('',) * 5)
+        print("   ✓ تمت إعادة بناء الملخص اليومي")
+    
+    if 'product_daily_sales' in existing:
+        cursor.execute("DELETE FROM product_daily_sales")
+        cursor.execute(REBUILD_PRODUCT_DAILY_SALES, ('',))
+        print("   ✓ تمت إعادة بناء مبيعات المنتجات اليومية")
+    
+    # مشغلات فهرس البحث كانت معطلة أثناء التحميل
+    if 'products_fts' in existing:
+        cursor.execute("DELETE FROM products_fts")
+        cursor.execute(
+            f"""INSERT INTO products_fts (rowid, name, barcode)
+                SELECT id, {normalized_sql('name')}, barcode FROM products"""
+        )
+        print("   ✓ تمت إعادة بناء فهرس البحث")
+
+def print_progress(table, imported_count, bytes_read, total_bytes):
+    """عرض تقدم الاستيراد (دالة التقدم الافتراضية)"""
+    percent = bytes_read * 100 / total_bytes if total_bytes else 100
+    print(f"   ⏳ {percent:5.1f}% - جدول {table}: {imported_count} سجل", end='\r')
+
+def import_data_to_database(sql_file_path, db_path, progress=print_progress, batch_size=IMPORT_BATCH_SIZE):
+    """استيراد البيانات من ملف SQL إلى قاعدة البيانات
+    
+    يُقرأ الملف جملةً جملة وتُدرج الصفوف على دفعات (executemany) في معاملة واحدة،
+    ويُحذف محتوى كل جدول عند أول صف له. الفهارس والمشغلات تُحذف قبل التحميل وتُنشأ
+    بعده، ثم تُعاد بناء الجداول المشتقة. أي خطأ عام يلغي الاستيراد كاملاً.
+    
+    progress(table, imported_count, bytes_read, total_bytes): تُستدعى بعد كل دفعة.
+    """
     
     print("🔄 بدء عملية استيراد البيانات...")
     
@@ -92,108 +204,104 @@ def import_data_to_database(sql_file_path, db_path):
         print(f"❌ خطأ: ملف SQL غير موجود: {sql_file_path}")
         return False
     
-    # قراءة البيانات من ملف SQL
-    print("📖 قراءة البيانات من ملف SQL...")
-    data_dict = parse_sql_file(sql_file_path)
+    total_bytes = os.path.getsize(sql_file_path)
     
-    # الاتصال بقاعدة البيانات
+    # الاتصال بقاعدة البيانات (المعاملة تُدار يدوياً)
     print(f"🔌 الاتصال بقاعدة البيانات: {db_path}")
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cursor = conn.cursor()
     
     try:
-        # ترتيب الجداول حسب التبعيات (Foreign Keys)
-        table_order = [
-            'categories',
-            'users',
-            'customers',
-            'external_traders',
-            'suppliers',
-            'products',
-            'sales',
-            'sale_items',
-            'expenses',
-            'purchases'
-        ]
-        
-        # حذف البيانات القديمة (بترتيب عكسي لتجنب مشاكل Foreign Keys)
-        print("\n🗑️ حذف البيانات القديمة...")
-        for table in reversed(table_order):
-            if table in data_dict:
-                cursor.execute(f"DELETE FROM {table}")
-                print(f"   ✓ تم حذف بيانات جدول {table}")
+        # مطابقة الأعمدة
+        column_mapping = get_table_column_mapping()
         
-        # إعادة تعيين auto_increment
-        for table in table_order:
-            if table in data_dict:
-                cursor.execute(f"DELETE FROM sqlite_sequence WHERE name='{table}'")
+        cursor.execute("BEGIN IMMEDIATE")
         
-        conn.commit()
+        # تأجيل الفهارس والمشغلات حتى نهاية التحميل
+        deferred = drop_secondary_indexes(cursor, list(column_mapping))
         
-        # استيراد البيانات الجديدة
-        print("\n📥 استيراد البيانات الجديدة...")
+        print("\n📥 استيراد البيانات من ملف SQL...")
         stats = {}
+        skipped_tables = set()
+        batch = []
+        batch_table = None
+        insert_query = None
+        convert = None
+        bytes_read = 0
         
-        # مطابقة الأعمدة
-        column_mapping = get_table_column_mapping()
-        
-        for table in table_order:
-            if table not in data_dict:
-                continue
+        def flush():
+            """إدراج الدفعة الحالية (وعند الخطأ: سجلاً سجلاً لتحديد السجلات المرفوضة)"""
+            if not batch:
+                return
+            try:
+                cursor.execute("SAVEPOINT import_batch")
+                cursor.executemany(insert_query, batch)
+                cursor.execute("RELEASE import_batch")
+                stats[batch_table] += len(batch)
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK TO import_batch")
+                cursor.execute("RELEASE import_batch")
+                for final_row in batch:
+                    try:
+                        cursor.execute(insert_query, final_row)
+                        stats[batch_table] += 1
+                    except sqlite3.Error as e:
+                        print(f"   ⚠️ خطأ في إدراج سجل في {batch_table}: {e}")
+                        print(f"      البيانات: {final_row}")
+            batch.clear()
             
-            rows = data_dict[table]
-            if not rows:
-                continue
-            
-            # استخدام أعمدة ملف SQL القديم
-            if table not in column_mapping:
-                print(f"   ⚠️ تخطي جدول {table}: غير موجود في المطابقة")
-                continue
-                
-            columns = column_mapping[table]
-            
-            # إعداد استعلام INSERT
-            placeholders = ','.join(['?' for _ in columns])
-            insert_query = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
-            
-            # إدراج البيانات
-            imported_count = 0
-            for row in rows:
-                # تنظيف القيم
-                clean_row = [clean_value(val) for val in row]
+            if progress is not None:
+                progress(batch_table, stats[batch_table], bytes_read, total_bytes)
+        
+        for table, row, bytes_read in iter_sql_rows(sql_file_path):
+            if table != batch_table:
+                flush()
                 
-                # التأكد من تطابق عدد الأعمدة
-                if len(clean_row) != len(columns):
-                    print(f"   ⚠️ تخطي سجل في {table}: عدد الأعمدة غير متطابق (متوقع {len(columns)}، موجود {len(clean_row)})")
+                # استخدام أعمدة ملف SQL القديم
+                if table not in column_mapping:
+                    if table not in skipped_tables:
+                        print(f"   ⚠️ تخطي جدول {table}: غير موجود في المطابقة")
+                        skipped_tables.add(table)
+                    batch_table = table
+                    insert_query = None
                     continue
                 
-                # تحويل القيم حسب نوع العمود
-                final_row = []
-                for i, val in enumerate(clean_row):
-                    if val is None:
-                        final_row.append(None)
-                    elif columns[i] in ['id', 'user_id', 'category_id', 'product_id', 
-                                        'sale_id', 'supplier_id', 'quantity', 'stock', 
-                                        'active', 'is_active']:
-                        final_row.append(int(val) if val else 0)
-                    elif columns[i] in ['sell_price', 'cost_price', 'total_amount', 
-                                        'price_at_sale', 'cost_at_sale', 'total_price',
-                                        'amount', 'shop_percentage', 'trader_percentage']:
-                        final_row.append(float(val) if val else 0.0)
-                    else:
-                        final_row.append(val)
+                columns = column_mapping[table]
+                batch_table = table
+                placeholders = ','.join(['?' for _ in columns])
+                insert_query = f"INSERT INTO {table} ({','.join(columns)}) VALUES ({placeholders})"
+                convert = build_row_converter(columns)
                 
-                try:
-                    cursor.execute(insert_query, final_row)
-                    imported_count += 1
-                except sqlite3.Error as e:
-                    print(f"   ⚠️ خطأ في إدراج سجل في {table}: {e}")
-                    print(f"      الأعمدة: {columns}")
-                    print(f"      البيانات: {final_row}")
+                # حذف البيانات القديمة عند أول ظهور للجدول وإعادة تعيين auto_increment
+                if table not in stats:
+                    cursor.execute(f"DELETE FROM {table}")
+                    cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+                    stats[table] = 0
+            
+            if insert_query is None:
+                continue
+            
+            # التأكد من تطابق عدد الأعمدة
+            if len(row) != len(columns):
+                print(f"   ⚠️ تخطي سجل في {table}: عدد الأعمدة غير متطابق (متوقع {len(columns)}، موجود {len(row)})")
+                continue
             
-            conn.commit()
-            stats[table] = imported_count
-            print(f"   ✓ جدول {table}: تم استيراد {imported_count} سجل")
+            batch.append(convert(row))
+            if len(batch) >= batch_size:
+                flush()
+        
+        flush()
+        print()
+        
+        # إنشاء الفهارس والمشغلات المؤجلة
+        print("🔧 إنشاء الفهارس...")
+        for sql in deferred:
+            cursor.execute(sql)
+        
+        # إعادة بناء الجداول المشتقة من البيانات المستوردة
+        rebuild_derived_tables(cursor)
+        
+        cursor.execute("COMMIT")
         
         # عرض الإحصائيات النهائية
         print("\n" + "="*50)
@@ -212,18 +320,17 @@ def import_data_to_database(sql_file_path, db_path):
         
     except Exception as e:
         print(f"\n❌ خطأ أثناء استيراد البيانات: {e}")
-        conn.rollback()
+        if conn.in_transaction:
+            conn.rollback()
         return False
         
     finally:
         conn.close()
 
 def backup_database(db_path):
-    """إنشاء نسخة احتياطية من قاعدة البيانات"""
+    """إنشاء نسخة احتياطية من قاعدة البيانات (بواسطة backup API وليس نسخ الملف)"""
     if os.path.exists(db_path):
-        backup_path = db_path.replace('.db', f'_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.db')
-        import shutil
-        shutil.copy2(db_path, backup_path)
+        backup_path = create_backup(keep=0, db_path=db_path)
         print(f"💾 تم إنشاء نسخة احتياطية: {backup_path}")
         return backup_path
     return None
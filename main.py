@@ -3,37 +3,53 @@
 """
 import sys
 import os
+import time
+
+# بداية قياس زمن التشغيل (قبل استيراد وحدات التطبيق)
+STARTUP_STARTED = time.perf_counter()
 
 # إضافة مسار المشروع
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+from database.connection import db
 from database.migrations import DatabaseMigrations
+from database.backup import nightly_backup
 from ui.main_window import MainWindow
+from utils.helpers import PhaseTimer
 
 
 def main():
     """الدالة الرئيسية"""
-    print("🚀 بدء تشغيل نظام نقاط البيع...")
+    timer = PhaseTimer(STARTUP_STARTED)
+    timer.mark("الاستيراد")
     
-    # تهيئة قاعدة البيانات
-    print("📦 تهيئة قاعدة البيانات...")
-    migrations = DatabaseMigrations()
+    print("🚀 بدء تشغيل نظام نقاط البيع...")
     
-    if not migrations.initialize():
+    # تهيئة قاعدة البيانات (فورية إذا كان المخطط محدّثاً)
+    if not DatabaseMigrations.initialize():
         print("❌ فشل في تهيئة قاعدة البيانات")
         return
     
-    print("✅ تم تهيئة قاعدة البيانات بنجاح")
+    timer.mark("قاعدة البيانات")
     
-    # إضافة البيانات الافتراضية
-    print("📝 إضافة البيانات الافتراضية...")
-    if migrations.seed_default_data():
-        print("✅ تم إضافة البيانات الافتراضية")
+    # النسخة الاحتياطية الليلية في خيط خلفي
+    nightly_backup.start()
     
     # تشغيل التطبيق
     print("🎨 بدء واجهة المستخدم...")
     app = MainWindow()
+    
+    # نافذة الدخول تظهر عند أول دورة للحلقة الرئيسية
+    def on_login_window_shown():
+        timer.mark("نافذة الدخول")
+        timer.report("زمن بدء التشغيل")
+    
+    app.after_idle(on_login_window_shown)
     app.mainloop()
+    nightly_backup.stop()
+    
+    # إغلاق اتصالات قاعدة البيانات المفتوحة
+    db.close_all()
 
 
 if __name__ == "__main__":
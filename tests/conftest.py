@@ -0,0 +1,51 @@
+"""
+إعدادات الاختبارات المشتركة: قواعد بيانات مؤقتة (لا تُمس pos_system.db)
+"""
+import contextlib
+import io
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.connection import db
+from database.migrations import DatabaseMigrations
+from generate_data import DataGenerator
+
+
+@contextlib.contextmanager
+def using_database(path):
+    """تبديل قاعدة البيانات المستخدمة أثناء الاختبار ثم إعادة السابقة"""
+    previous = db.db_name
+    db.configure(db_name=path)
+    try:
+        yield path
+    finally:
+        db.configure(db_name=previous)
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    """قاعدة بيانات جديدة بعد تطبيق جميع التحديثات والبيانات الافتراضية"""
+    with using_database(str(tmp_path / "pos_test.db")) as path:
+        assert DatabaseMigrations.initialize()
+        yield path
+
+
+@pytest.fixture(scope="session")
+def generated_db_path(tmp_path_factory):
+    """قاعدة بيانات مولّدة صغيرة (سنة من المبيعات) تُنشأ مرة واحدة لكل التشغيل"""
+    path = str(tmp_path_factory.mktemp("generated") / "pos_generated.db")
+    with using_database(path), contextlib.redirect_stdout(io.StringIO()):
+        DataGenerator(
+            path, products=300, sale_lines=5000, traders=5, customers=50,
+            suppliers=3, years=1, expenses_per_day=1
+        ).generate()
+    return path
+
+
+@pytest.fixture
+def generated_db(generated_db_path):
+    with using_database(generated_db_path) as path:
+        yield path
@@ -0,0 +1,35 @@
+"""
+أسماء النسخ الاحتياطية: فريدة داخل الثانية نفسها ولا تُكتب نسخة فوق أخرى
+"""
+import os
+import pytest
+import database.backup as backup
+from database.backup import create_backup, list_backups
+
+
+def test_backups_in_the_same_second_get_distinct_names(migrated_db):
+    paths = [create_backup(compress=False, keep=0) for _ in range(3)]
+    
+    assert len(set(paths)) == 3
+    assert list_backups() == sorted(paths, reverse=True)
+
+
+def test_create_backup_refuses_to_overwrite(migrated_db, monkeypatch):
+    monkeypatch.setattr(backup, 'BACKUP_TIMESTAMP_FORMAT', "fixed")
+    path = create_backup(compress=False, keep=0)
+    with open(path, 'rb') as f:
+        original = f.read()
+    
+    with pytest.raises(FileExistsError):
+        create_backup(compress=False, keep=0)
+    
+    with open(path, 'rb') as f:
+        assert f.read() == original
+    assert not os.path.exists(path + ".tmp")
+    assert list_backups() == [path]
+
+
+def test_rotation_keeps_newest(migrated_db):
+    paths = [create_backup(compress=True, keep=2) for _ in range(4)]
+    
+    assert list_backups() == paths[:-3:-1]
@@ -0,0 +1,39 @@
+"""
+أختام إصدار الجداول: الشاشة تعيد التحميل فقط إذا تغيّرت جداولها
+"""
+import controllers.data_versions as data_versions_module
+from controllers.data_versions import DataVersions
+
+
+def test_stamp_changes_only_for_bumped_tables():
+    versions = DataVersions()
+    customers = versions.stamp('customers')
+    expenses = versions.stamp('expenses')
+    
+    versions.bump('customers')
+    
+    assert versions.stamp('customers') != customers
+    assert versions.stamp('expenses') == expenses
+
+
+def test_invalidate_all_changes_every_stamp():
+    versions = DataVersions()
+    before = versions.stamp('customers', 'users')
+    
+    versions.invalidate_all()
+    
+    assert versions.stamp('customers', 'users') != before
+
+
+def test_stamp_expires_after_refresh_interval(monkeypatch):
+    versions = DataVersions()
+    clock = [1000.0]
+    monkeypatch.setattr(data_versions_module.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(data_versions_module, 'VIEW_REFRESH_INTERVAL', 60)
+    
+    before = versions.stamp('sales')
+    clock[0] += 1
+    assert versions.stamp('sales') == before
+    
+    clock[0] += 60
+    assert versions.stamp('sales') != before
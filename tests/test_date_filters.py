@@ -0,0 +1,73 @@
+"""
+شروط التاريخ نصف المفتوحة تعيد نفس صفوف صيغة DATE(created_at) BETWEEN القديمة
+"""
+import sqlite3
+import pytest
+from utils.helpers import get_day_bounds, date_range_filter
+
+TIMESTAMPS = [
+    '2024-12-31 23:59:59',
+    '2025-01-01 00:00:00',
+    '2025-01-01',
+    '2025-01-01 12:30:00',
+    '2025-01-01 23:59:59',
+    '2025-01-01 23:59:59.999',
+    '2025-01-02 00:00:00',
+    '2025-01-02',
+    '2025-01-15 08:00:00',
+    '2025-01-31 23:59:59',
+    '2025-02-01 00:00:00',
+    '2025-02-28 23:59:59',
+    '2025-03-01',
+]
+
+RANGES = [
+    ('2025-01-01', '2025-01-01'),
+    ('2025-01-02', '2025-01-02'),
+    ('2024-12-31', '2025-01-01'),
+    ('2025-01-01', '2025-01-31'),
+    ('2025-02-28', '2025-02-28'),
+    ('2025-02-01', '2025-03-01'),
+    ('2024-01-01', '2025-12-31'),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, created_at TIMESTAMP)")
+    conn.execute("CREATE INDEX idx_sales_created_at ON sales (created_at)")
+    conn.executemany("INSERT INTO sales (created_at) VALUES (?)", [(value,) for value in TIMESTAMPS])
+    yield conn
+    conn.close()
+
+
+def select_ids(conn, where, params):
+    return [row[0] for row in conn.execute(f"SELECT id FROM sales WHERE {where} ORDER BY id", params)]
+
+
+@pytest.mark.parametrize('start_date, end_date', RANGES)
+def test_half_open_bounds_match_date_between(conn, start_date, end_date):
+    old = select_ids(conn, "DATE(created_at) BETWEEN ? AND ?", (start_date, end_date))
+    new = select_ids(conn, *date_range_filter('created_at', start_date, end_date))
+    assert new == old
+    assert old, "النطاق يجب أن يحتوي صفوفاً حتى تكون المقارنة مفيدة"
+
+
+def test_single_day_without_end_date(conn):
+    old = select_ids(conn, "DATE(created_at) = ?", ('2025-01-01',))
+    new = select_ids(conn, *date_range_filter('created_at', '2025-01-01'))
+    assert new == old
+    assert len(new) == 5
+
+
+def test_day_bounds_cross_month_and_year():
+    assert get_day_bounds('2025-01-31') == ('2025-01-31', '2025-02-01')
+    assert get_day_bounds('2024-02-28', '2024-02-29') == ('2024-02-28', '2024-03-01')
+    assert get_day_bounds('2024-12-01', '2024-12-31') == ('2024-12-01', '2025-01-01')
+
+
+def test_filter_uses_index(conn):
+    where, params = date_range_filter('created_at', '2025-01-01', '2025-01-31')
+    plan = [row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN SELECT id FROM sales WHERE {where}", params)]
+    assert any('idx_sales_created_at' in detail for detail in plan)
@@ -0,0 +1,83 @@
+"""
+استيراد ملف SQL القديم: تقسيم الجمل (نصوص وتعليقات) والدفعات والجداول المشتقة
+"""
+import pytest
+from database.connection import db
+from database.rollup import get_rollup_totals
+from import_data import import_data_to_database, iter_sql_rows, strip_sql_comment
+
+LEGACY_DUMP = """-- pos_system dump, don't edit by hand
+BEGIN TRANSACTION;
+INSERT INTO "categories" VALUES (1,'فلاتر');
+INSERT INTO "products" VALUES (1,'فلتر زيت; أصلي',1,120.0,80.0,10);
+INSERT INTO "products" VALUES (2,'تيل فرامل
+سطر ثانٍ',1,300.0,200.0,5); -- it's the multi-line one
+INSERT INTO "products" VALUES (3,'O''Reilly -- not a comment',1,50.0,30.0,2);
+-- bad rows below: wrong column count, then a duplicate id
+INSERT INTO "products" VALUES (4,'ناقص',1);
+INSERT INTO "products" VALUES (1,'مكرر',1,1.0,1.0,1);
+INSERT INTO "products" VALUES (5,'بعد المكرر',1,10.0,5.0,1);
+INSERT INTO "sales" VALUES (1,'INV-1',1,420.0,'2025-01-05 23:59:59');
+INSERT INTO "sale_items" VALUES (1,1,1,1,120.0,80.0,120.0),(2,1,2,1,300.0,200.0,300.0);
+INSERT INTO "expenses" VALUES (1,1,75.5,'إيجار; يناير','2025-01-05 10:00:00');
+COMMIT;
+"""
+
+
+@pytest.fixture
+def legacy_dump(tmp_path):
+    path = tmp_path / "legacy.sql"
+    path.write_text(LEGACY_DUMP, encoding='utf-8')
+    return str(path)
+
+
+def test_strip_sql_comment_tracks_strings():
+    assert strip_sql_comment("x -- don't\n", False) == ("x \n", False)
+    assert strip_sql_comment("'a -- b' -- c\n", False) == ("'a -- b' \n", False)
+    assert strip_sql_comment("'it''s\n", False) == ("'it''s\n", True)
+    assert strip_sql_comment("end' -- it's\n", True) == ("end' \n", False)
+
+
+def test_rows_keep_strings_and_tables(legacy_dump):
+    rows = [(table, row) for table, row, _ in iter_sql_rows(legacy_dump)]
+    
+    assert [table for table, _ in rows] == [
+        'categories', 'products', 'products', 'products', 'products', 'products', 'products',
+        'sales', 'sale_items', 'sale_items', 'expenses'
+    ]
+    assert rows[1][1][1] == 'فلتر زيت; أصلي'
+    assert rows[2][1][1] == 'تيل فرامل\nسطر ثانٍ'
+    assert rows[3][1][1] == "O'Reilly -- not a comment"
+    assert rows[-1][1] == ['1', '1', '75.5', 'إيجار; يناير', '2025-01-05 10:00:00']
+
+
+def test_apostrophe_in_comment_does_not_merge_statements(tmp_path):
+    path = tmp_path / "comments.sql"
+    path.write_text(
+        "-- don't\nINSERT INTO \"categories\" VALUES (1,'a');\n"
+        "INSERT INTO \"expenses\" VALUES (1,1,5.0,'b','2025-01-01');\n",
+        encoding='utf-8'
+    )
+    
+    assert [table for table, _, _ in iter_sql_rows(str(path))] == ['categories', 'expenses']
+
+
+def test_import_falls_back_to_rows_and_rebuilds_derived_tables(migrated_db, legacy_dump):
+    assert import_data_to_database(legacy_dump, migrated_db, progress=None, batch_size=100)
+    
+    # السجل الناقص متخطى، والمكرر وحده مرفوض بعد فشل الدفعة
+    products = db.fetch_all("SELECT id, name FROM products ORDER BY id")
+    assert [(row['id'], row['name']) for row in products] == [
+        (1, 'فلتر زيت; أصلي'), (2, 'تيل فرامل\nسطر ثانٍ'), (3, "O'Reilly -- not a comment"), (5, 'بعد المكرر')
+    ]
+    assert db.fetch_one("SELECT description FROM expenses")['description'] == 'إيجار; يناير'
+    
+    # فهرس البحث والملخص اليومي من البيانات المستوردة
+    fts_ids = db.fetch_all("SELECT rowid FROM products_fts WHERE products_fts MATCH 'فلتر'")
+    assert [row['rowid'] for row in fts_ids] == [1]
+    totals = get_rollup_totals('2025-01-05', '2025-01-05')
+    assert totals['sales_count'] == 1
+    assert totals['sales_total'] == 420.0
+    assert totals['items_revenue'] == 420.0
+    assert totals['items_cost'] == 280.0
+    assert totals['expenses_total'] == 75.5
@@ -0,0 +1,78 @@
+"""
+توزيع أرقام الفواتير تحت التزامن: لا تكرار ولا تداخل بين كتل الأجهزة
+"""
+import threading
+from collections import defaultdict
+from database.connection import db
+from database.sequences import InvoiceNumberAllocator
+
+TILLS = 4
+THREADS_PER_TILL = 5
+NUMBERS_PER_THREAD = 500
+BLOCK_SIZE = 50
+
+
+def test_concurrent_allocations_are_unique(migrated_db):
+    allocators = [
+        InvoiceNumberAllocator('STRESS', till_id=till, block_size=BLOCK_SIZE)
+        for till in range(1, TILLS + 1)
+    ]
+    numbers = defaultdict(list)
+    errors = []
+    start = threading.Barrier(TILLS * THREADS_PER_TILL)
+    
+    def worker(allocator):
+        try:
+            start.wait()
+            allocated = [allocator.next_number() for _ in range(NUMBERS_PER_THREAD)]
+            numbers[allocator.till_id].extend(allocated)
+        except Exception as e:
+            errors.append(e)
+    
+    threads = [
+        threading.Thread(target=worker, args=(allocator,))
+        for allocator in allocators
+        for _ in range(THREADS_PER_TILL)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert not errors
+    total = TILLS * THREADS_PER_TILL * NUMBERS_PER_THREAD
+    all_numbers = [number for till_numbers in numbers.values() for number in till_numbers]
+    assert len(all_numbers) == total == 10000
+    assert len(set(all_numbers)) == total
+    
+    # القيم (بدون رقم الجهاز) فريدة أيضاً: كل كتلة محجوزة لجهاز واحد فقط
+    values = {}
+    for till, till_numbers in numbers.items():
+        for number in till_numbers:
+            prefix, till_part, value = number.split('-')
+            assert prefix == 'STRESS' and int(till_part) == till
+            assert int(value) not in values
+            values[int(value)] = till
+    
+    block_owners = defaultdict(set)
+    for value, till in values.items():
+        block_owners[(value - 1) // BLOCK_SIZE].add(till)
+    assert all(len(owners) == 1 for owners in block_owners.values())
+    
+    # التسلسل المحفوظ بعد آخر كتلة محجوزة
+    next_value = db.fetch_one(
+        "SELECT next_value FROM invoice_sequences WHERE name = 'STRESS'"
+    )['next_value']
+    assert next_value > max(values)
+    assert (next_value - 1) % BLOCK_SIZE == 0
+
+
+def test_new_allocator_continues_after_reserved_blocks(migrated_db):
+    first = InvoiceNumberAllocator('RESTART', till_id=1, block_size=10)
+    assert [first.next_number() for _ in range(3)] == [
+        'RESTART-01-0000001', 'RESTART-01-0000002', 'RESTART-01-0000003'
+    ]
+    
+    # بعد إعادة التشغيل لا يُعاد توزيع بقية الكتلة السابقة
+    second = InvoiceNumberAllocator('RESTART', till_id=1, block_size=10)
+    assert second.next_number() == 'RESTART-01-0000011'
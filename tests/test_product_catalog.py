@@ -0,0 +1,56 @@
+"""
+البحث في الكتالوج: فهرس الكلمات في الذاكرة يطابق FTS5 ويتبع تعديلات المنتجات
+"""
+import pytest
+import controllers.product_catalog as product_catalog
+from database.connection import db
+from controllers.product_catalog import catalog
+
+QUERIES = ['ف', 'فلتر', 'فلتر زيت', 'اطار', 'إطار', 'زيت محرك', '622', 'xyz']
+
+
+@pytest.fixture
+def loaded_catalog(generated_db):
+    catalog.invalidate()
+    yield catalog
+    catalog.invalidate()
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_memory_index_matches_fts(loaded_catalog, query):
+    memory = loaded_catalog.match_ids(query)
+    
+    assert set(memory) == loaded_catalog._match_fts(query)
+    assert [catalog.get(pid)['name'] for pid in memory] == sorted(catalog.get(pid)['name'] for pid in memory)
+
+
+def test_broad_prefix_falls_back_to_fts(loaded_catalog, monkeypatch):
+    monkeypatch.setattr(product_catalog, 'CATALOG_SEARCH_MAX_WORDS', 10)
+    fts_queries = []
+    match_fts = loaded_catalog._match_fts
+    monkeypatch.setattr(loaded_catalog, '_match_fts', lambda query: fts_queries.append(query) or match_fts(query))
+    
+    ids = loaded_catalog.match_ids('6')
+    
+    assert fts_queries == ['6']
+    assert len(ids) == db.fetch_one("SELECT COUNT(*) as count FROM products WHERE barcode LIKE '6%'")['count']
+
+
+def test_search_follows_refresh_and_remove(loaded_catalog):
+    product_id = db.fetch_one("SELECT MIN(id) as id FROM products")['id']
+    assert loaded_catalog.search('كمبروسر') == []
+    
+    db.execute("UPDATE products SET name = 'كمبروسر تكييف' WHERE id = ?", (product_id,))
+    loaded_catalog.refresh(product_id)
+    assert [p['id'] for p in loaded_catalog.search('كمبروسر')] == [product_id]
+    
+    loaded_catalog.remove(product_id)
+    assert loaded_catalog.search('كمبروسر') == []
+    assert product_id not in loaded_catalog.match_ids('ت')
+
+
+def test_cached_search_is_a_copy(loaded_catalog):
+    first = loaded_catalog.search('فلتر')
+    first.clear()
+    
+    assert loaded_catalog.search('فلتر')
@@ -0,0 +1,98 @@
+"""
+المشتريات: تعديل المخزون نسبياً في معاملة واحدة مع الملخص اليومي والكتالوج بعد الحفظ
+"""
+import threading
+import pytest
+import controllers.purchase_controller as purchase_controller
+from database.connection import db
+from database.rollup import get_rollup_totals
+from controllers.product_catalog import catalog
+from controllers.purchase_controller import PurchaseController
+
+THREADS = 4
+PURCHASES_PER_THREAD = 25
+
+
+@pytest.fixture
+def product_id(migrated_db):
+    catalog.invalidate()
+    product_id = db.fetch_one("SELECT MIN(id) as id FROM products")['id']
+    db.execute("UPDATE products SET stock = 10 WHERE id = ?", (product_id,))
+    catalog.invalidate()
+    yield product_id
+    catalog.invalidate()
+
+
+def stock(product_id):
+    return db.fetch_one("SELECT stock FROM products WHERE id = ?", (product_id,))['stock']
+
+
+def test_add_and_delete_keep_stock_rollup_and_catalog_in_step(product_id):
+    assert PurchaseController.add_purchase(product_id, 5, 20.0)['success']
+    assert stock(product_id) == 15
+    assert catalog.get(product_id)['stock'] == 15
+    assert get_rollup_totals()['purchases_total'] == 100.0
+    
+    purchase_id = db.fetch_one("SELECT MAX(id) as id FROM purchases")['id']
+    assert PurchaseController.delete_purchase(purchase_id)['success']
+    assert stock(product_id) == 10
+    assert catalog.get(product_id)['stock'] == 10
+    assert get_rollup_totals()['purchases_total'] == 0
+
+
+def test_add_purchase_for_missing_product_writes_nothing(product_id):
+    result = PurchaseController.add_purchase(999999, 5, 20.0)
+    
+    assert not result['success']
+    assert db.fetch_one("SELECT COUNT(*) as count FROM purchases")['count'] == 0
+    assert get_rollup_totals()['purchases_count'] == 0
+
+
+def test_delete_refuses_when_stock_was_sold(product_id):
+    assert PurchaseController.add_purchase(product_id, 5, 20.0)['success']
+    purchase_id = db.fetch_one("SELECT MAX(id) as id FROM purchases")['id']
+    db.execute("UPDATE products SET stock = 3 WHERE id = ?", (product_id,))
+    
+    result = PurchaseController.delete_purchase(purchase_id)
+    
+    assert not result['success']
+    assert stock(product_id) == 3
+    assert db.fetch_one("SELECT COUNT(*) as count FROM purchases")['count'] == 1
+    assert get_rollup_totals()['purchases_total'] == 100.0
+
+
+def test_rollup_failure_rolls_back_stock_and_leaves_catalog(product_id, monkeypatch):
+    assert catalog.get(product_id)['stock'] == 10
+    
+    def fail(*args, **kwargs):
+        raise RuntimeError("rollup")
+    monkeypatch.setattr(purchase_controller, 'add_to_rollup', fail)
+    
+    result = PurchaseController.add_purchase(product_id, 5, 20.0)
+    
+    assert not result['success']
+    assert stock(product_id) == 10
+    assert catalog.get(product_id)['stock'] == 10
+    assert db.fetch_one("SELECT COUNT(*) as count FROM purchases")['count'] == 0
+
+
+def test_concurrent_purchases_do_not_lose_updates(product_id):
+    errors = []
+    start = threading.Barrier(THREADS)
+    
+    def worker():
+        start.wait()
+        for _ in range(PURCHASES_PER_THREAD):
+            result = PurchaseController.add_purchase(product_id, 1, 10.0)
+            if not result['success']:
+                errors.append(result['message'])
+    
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert errors == []
+    assert stock(product_id) == 10 + THREADS * PURCHASES_PER_THREAD
+    assert catalog.get(product_id)['stock'] == 10 + THREADS * PURCHASES_PER_THREAD
@@ -0,0 +1,69 @@
+"""
+خطط تنفيذ الاستعلامات الساخنة: يجب أن تستخدم الفهارس ولا تمسح الجداول كاملة
+"""
+import pytest
+from database.connection import db
+from controllers.report_engine import ReportEngine
+from controllers.sales_controller import SalesController
+from controllers.expense_controller import ExpenseController
+from controllers.purchase_controller import PurchaseController
+
+MONTH = ('2025-12-01', '2025-12-31')
+
+HOT_QUERIES = [
+    ('reports.sales_section', ReportEngine.sales_section, MONTH),
+    ('reports.profit_section', ReportEngine.profit_section, MONTH),
+    ('reports.cash_section', ReportEngine.cash_section, MONTH),
+    ('today.sales', SalesController.get_today_sales, ()),
+    ('today.summary', SalesController.get_sales_summary, ()),
+    ('today.returns', SalesController.get_returns_summary, ('today',)),
+    ('by_date.sales', SalesController.get_all_sales, MONTH),
+    ('by_date.daily_kpis', SalesController.get_daily_kpis, MONTH),
+    ('by_date.expenses', ExpenseController.get_all_expenses, MONTH),
+    ('by_date.purchases', PurchaseController.get_all_purchases, MONTH),
+]
+
+
+def traced_query_plans(func, args):
+    """تشغيل الدالة وإعادة خطة تنفيذ كل استعلام قراءة نفذته: [(الاستعلام، الخطة)]"""
+    queries = []
+    with db.get_connection() as conn:
+        # الاستدعاءات المتداخلة تستخدم الاتصال المحجوز نفسه، فتمر كل استعلاماتها هنا
+        conn.set_trace_callback(queries.append)
+        try:
+            func(*args)
+        finally:
+            conn.set_trace_callback(None)
+        
+        return [
+            (query, [row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query)])
+            for query in queries
+            if query.lstrip().upper().startswith(('SELECT', 'WITH'))
+        ]
+
+
+def full_scans(plan):
+    """خطوات المسح الكامل في الخطة (مسح نتيجة استعلام فرعي MATERIALIZE مسموح)"""
+    materialized = {detail.split()[1] for detail in plan if detail.startswith('MATERIALIZE ')}
+    return [
+        detail for detail in plan
+        if detail.startswith('SCAN ') and detail.split()[1] not in materialized
+    ]
+
+
+@pytest.mark.parametrize('name, func, args', HOT_QUERIES, ids=[case[0] for case in HOT_QUERIES])
+def test_hot_queries_use_indexes(generated_db, name, func, args):
+    plans = traced_query_plans(func, args)
+    assert plans, f"{name}: لم يُنفَّذ أي استعلام"
+    
+    for query, plan in plans:
+        assert not full_scans(plan), f"{name}: مسح كامل في\n{query}\n{plan}"
+
+
+def test_full_scan_is_detected(generated_db):
+    """الاختبار نفسه يكتشف المسح الكامل عند غياب الفهرس"""
+    with db.get_connection() as conn:
+        plan = [row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM sales WHERE notes = 'x'"
+        )]
+    assert full_scans(plan)
@@ -0,0 +1,128 @@
+"""
+SearchDispatcher مع حلقة after() وهمية بساعة افتراضية (بدون Tk)
+"""
+import threading
+import time
+from ui.search_dispatcher import SearchDispatcher
+from config import SEARCH_DEBOUNCE_MS, SEARCH_POLL_MS
+
+# قارئ الباركود يرسل الحروف بفاصل بضع مللي ثوانٍ
+SCANNER_KEY_INTERVAL_MS = 5
+
+
+class FakeWidget:
+    """بديل لعنصر Tk: after / after_cancel على ساعة افتراضية تتقدم يدوياً"""
+    
+    def __init__(self):
+        self.now = 0
+        self._callbacks = {}
+        self._next_id = 0
+    
+    def after(self, ms, func, *args):
+        self._next_id += 1
+        self._callbacks[self._next_id] = (self.now + ms, func, args)
+        return self._next_id
+    
+    def after_cancel(self, after_id):
+        self._callbacks.pop(after_id, None)
+    
+    def pending(self):
+        return len(self._callbacks)
+    
+    def advance(self, ms):
+        """تقديم الساعة وتشغيل ما حان موعده بالترتيب"""
+        target = self.now + ms
+        while True:
+            due = [(when, after_id) for after_id, (when, _, _) in self._callbacks.items() if when <= target]
+            if not due:
+                break
+            when, after_id = min(due)
+            _, func, args = self._callbacks.pop(after_id)
+            self.now = when
+            func(*args)
+        self.now = target
+    
+    def run_until(self, condition, timeout=5):
+        """تشغيل دورات الاستطلاع حتى يتحقق الشرط (الخيط الخلفي حقيقي)"""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "انتهت المهلة"
+            self.advance(SEARCH_POLL_MS)
+            time.sleep(0.001)
+
+
+def make_dispatcher(search_func):
+    widget = FakeWidget()
+    delivered = []
+    dispatcher = SearchDispatcher(widget, search_func, delivered.append)
+    return widget, dispatcher, delivered
+
+
+def test_scanner_burst_runs_one_query():
+    queries = []
+    
+    def search(text):
+        queries.append(text)
+        return [text]
+    
+    widget, dispatcher, delivered = make_dispatcher(search)
+    barcode = "6221234567890"
+    assert len(barcode) == 13
+    
+    for length in range(1, len(barcode) + 1):
+        dispatcher.schedule(barcode[:length])
+        widget.advance(SCANNER_KEY_INTERVAL_MS)
+    
+    assert queries == []
+    widget.advance(SEARCH_DEBOUNCE_MS)
+    widget.run_until(lambda: delivered)
+    
+    assert queries == [barcode]
+    assert delivered == [[barcode]]
+    assert not dispatcher.has_pending()
+    assert widget.pending() == 0
+
+
+def test_slow_typing_runs_each_query():
+    queries = []
+    widget, dispatcher, delivered = make_dispatcher(lambda text: queries.append(text) or text)
+    
+    for text in ("فل", "فلتر"):
+        dispatcher.schedule(text)
+        widget.advance(SEARCH_DEBOUNCE_MS)
+        widget.run_until(lambda: not dispatcher.has_pending())
+    
+    assert queries == ["فل", "فلتر"]
+    assert delivered == ["فل", "فلتر"]
+
+
+def test_stale_results_are_dropped():
+    release = threading.Event()
+    
+    def search(text):
+        if text == "old":
+            release.wait(5)
+        return text
+    
+    widget, dispatcher, delivered = make_dispatcher(search)
+    dispatcher.run_now("old")
+    dispatcher.run_now("new")
+    widget.run_until(lambda: delivered)
+    release.set()
+    widget.advance(SEARCH_POLL_MS * 10)
+    
+    assert delivered == ["new"]
+
+
+def test_cancel_clears_scheduled_callbacks():
+    widget, dispatcher, delivered = make_dispatcher(lambda text: text)
+    dispatcher.schedule("abc")
+    dispatcher.run_now("abcd")
+    dispatcher.schedule("abcde")
+    dispatcher.cancel()
+    
+    assert widget.pending() == 0
+    time.sleep(0.05)
+    widget.advance(SEARCH_DEBOUNCE_MS * 2)
+    assert delivered == []
+    assert not dispatcher.has_pending()
@@ -0,0 +1,107 @@
+"""
+تسويات التجار: التجميع الواحد يطابق الحلقة القديمة لكل تاجر، والفترات المغلقة لا يُعاد حسابها
+"""
+import pytest
+from database.connection import db
+from controllers.trader_controller import TraderController
+from utils.helpers import calculate_trader_share, date_range_filter, get_previous_month_range
+
+PERIODS = [
+    (None, None),
+    ('2025-12-01', '2025-12-31'),
+    ('2025-06-15', '2025-06-15'),
+]
+
+
+def old_trader_profits(trader_id, start_date=None, end_date=None):
+    """calculate_trader_profits قبل التجميع: جلب عناصر التاجر وجمع الربح في بايثون"""
+    trader = db.fetch_one("SELECT * FROM external_traders WHERE id = ?", (trader_id,))
+    if start_date and end_date:
+        date_filter, date_params = date_range_filter('s.created_at', start_date, end_date)
+    else:
+        date_filter, date_params = "1 = 1", ()
+    
+    sales = db.fetch_all(
+        f"""SELECT si.*
+           FROM sale_items si
+           JOIN products p ON si.product_id = p.id
+           JOIN sales s ON si.sale_id = s.id
+           WHERE p.external_trader_id = ?
+           AND {date_filter}""",
+        (trader_id, *date_params)
+    )
+    total_profit = sum((sale['price_at_sale'] - sale['cost_at_sale']) * sale['quantity'] for sale in sales)
+    shares = calculate_trader_share(total_profit, trader['shop_percentage'])
+    
+    return {
+        'trader_name': trader['name'],
+        'total_sales': len(sales),
+        'total_profit': total_profit,
+        'shop_share': shares['shop_share'],
+        'trader_share': shares['trader_share'],
+        'shop_percentage': trader['shop_percentage'],
+        'trader_percentage': trader['trader_percentage']
+    }
+
+
+def old_traders_report(start_date=None, end_date=None):
+    traders = db.fetch_all("SELECT id FROM external_traders ORDER BY name")
+    return [old_trader_profits(trader['id'], start_date, end_date) for trader in traders]
+
+
+def assert_same_report(new, old):
+    assert len(new) == len(old)
+    for new_row, old_row in zip(new, old):
+        for key, value in old_row.items():
+            assert new_row[key] == pytest.approx(value), (old_row['trader_name'], key)
+
+
+@pytest.mark.parametrize('start_date, end_date', PERIODS)
+def test_grouped_settlements_match_per_trader_loop(generated_db, start_date, end_date):
+    old = old_traders_report(start_date, end_date)
+    assert any(row['total_sales'] for row in old)
+    
+    assert_same_report(TraderController.compute_settlements(start_date, end_date), old)
+    assert_same_report(TraderController.get_all_traders_report(start_date, end_date), old)
+    
+    trader_id = db.fetch_one("SELECT MIN(id) as id FROM external_traders")['id']
+    assert_same_report(
+        [TraderController.calculate_trader_profits(trader_id, start_date, end_date)],
+        [old_trader_profits(trader_id, start_date, end_date)]
+    )
+
+
+def test_closed_period_is_served_from_snapshot(generated_db):
+    start_date, end_date = '2025-11-01', '2025-11-30'
+    percentages = [
+        (row['shop_percentage'], row['trader_percentage'], row['id'])
+        for row in db.fetch_all("SELECT id, shop_percentage, trader_percentage FROM external_traders")
+    ]
+    before = TraderController.get_all_traders_report(start_date, end_date)
+    
+    response = TraderController.close_settlement_period(start_date, end_date)
+    assert response['success'], response['message']
+    
+    snapshot = TraderController.get_settlement_snapshot(start_date, end_date)
+    assert_same_report(snapshot, before)
+    
+    # تعديل البيانات بعد الإغلاق لا يغيّر تقرير الفترة المغلقة
+    db.execute("UPDATE external_traders SET shop_percentage = 99, trader_percentage = 1")
+    try:
+        assert_same_report(TraderController.get_all_traders_report(start_date, end_date), before)
+        assert TraderController.compute_settlements(start_date, end_date) != before
+    finally:
+        db.execute("DELETE FROM trader_settlements")
+        db.execute_many(
+            "UPDATE external_traders SET shop_percentage = ?, trader_percentage = ? WHERE id = ?",
+            percentages
+        )
+
+
+def test_open_period_cannot_be_closed(migrated_db):
+    response = TraderController.close_settlement_period('2000-01-01', '2999-12-31')
+    assert not response['success']
+    
+    start_date, end_date = get_previous_month_range()
+    assert TraderController.close_settlement_period(start_date, end_date)['success']
+    assert db.fetch_one("SELECT COUNT(*) as count FROM trader_settlements")['count'] == 0
@@ -0,0 +1,137 @@
+"""
+حساب الجدول الافتراضي بدون شاشة: الصفحات والموضع والتحديد والترتيب على 100 ألف صف
+"""
+import pytest
+from ui.virtual_rows import ListSource, VirtualRows
+
+ROWS = 100000
+
+
+class CountingSource(ListSource):
+    """مصدر من قائمة يسجل الصفحات المطلوبة منه"""
+    
+    def __init__(self, records):
+        super().__init__(records)
+        self.fetched = []
+    
+    def fetch(self, offset, limit):
+        self.fetched.append(offset)
+        return super().fetch(offset, limit)
+
+
+@pytest.fixture
+def rows():
+    table = VirtualRows(key=lambda record: record['id'], sort_keys={
+        'id': lambda record: record['id'],
+        'name': lambda record: record['name'],
+    }, visible=20)
+    table.set_source(CountingSource({'id': i, 'name': f"صنف {ROWS - i:06d}"} for i in range(ROWS)))
+    return table
+
+
+def ids(records):
+    return [record['id'] for record in records]
+
+
+def test_get_rows_crosses_page_boundaries(rows):
+    page = VirtualRows.PAGE_SIZE
+    
+    assert ids(rows.get_rows(page - 5, 10)) == list(range(page - 5, page + 5))
+    assert ids(rows.get_rows(ROWS - 3, 10)) == [ROWS - 3, ROWS - 2, ROWS - 1]
+    assert rows.get_rows(ROWS + 50, 10) == []
+
+
+def test_window_clamps_offset(rows):
+    rows.offset = ROWS + 500
+    assert ids(rows.window()) == list(range(ROWS - 20, ROWS))
+    assert rows.offset == ROWS - 20
+    
+    rows.offset = -7
+    assert ids(rows.window()) == list(range(20))
+    assert rows.offset == 0
+
+
+def test_window_shorter_than_screen():
+    table = VirtualRows(key=lambda record: record['id'], visible=20)
+    table.set_source(ListSource({'id': i} for i in range(5)))
+    table.offset = 3
+    
+    assert ids(table.window()) == [0, 1, 2, 3, 4]
+    assert table.offset == 0
+
+
+def test_full_scroll_fetches_each_page_once(rows):
+    seen = []
+    while True:
+        window = rows.window()
+        seen.extend(ids(window[:rows.visible]))
+        if rows.offset + rows.visible >= ROWS:
+            break
+        rows.offset += rows.visible
+    
+    assert seen == list(range(ROWS))
+    assert len(rows.source.fetched) == ROWS // VirtualRows.PAGE_SIZE
+    assert len(rows.pages) == VirtualRows.PAGE_CACHE_SIZE
+
+
+def test_page_cache_evicts_least_recently_used(rows):
+    size = VirtualRows.PAGE_SIZE
+    for number in range(VirtualRows.PAGE_CACHE_SIZE):
+        rows.page(number)
+    rows.page(0)
+    rows.page(VirtualRows.PAGE_CACHE_SIZE)
+    
+    # الصفحة 1 هي الأقدم استخداماً بعد العودة للصفحة 0
+    assert 1 not in rows.pages
+    assert 0 in rows.pages
+    
+    fetched = len(rows.source.fetched)
+    rows.page(0)
+    assert len(rows.source.fetched) == fetched
+    rows.page(1)
+    assert rows.source.fetched[-1] == size
+
+
+def test_select_index_scrolls_into_view(rows):
+    assert rows.select_index(-1) is None
+    assert rows.select_index(ROWS) is None
+    
+    assert rows.select_index(500)['id'] == 500
+    assert rows.offset == 500 - rows.visible + 1
+    assert rows.select_index(470)['id'] == 470
+    assert rows.offset == 470
+    
+    # صف ظاهر بالفعل: لا تمرير
+    assert rows.select_index(485)['id'] == 485
+    assert rows.offset == 470
+    assert rows.selected_record['id'] == 485
+    assert rows.is_selected({'id': 485}) and not rows.is_selected({'id': 484})
+
+
+def test_selection_follows_key_after_sort(rows):
+    rows.select_index(10)
+    
+    assert rows.sort_by('name')
+    assert rows.offset == 0
+    assert not rows.pages
+    window = rows.window()
+    assert window[0]['id'] == ROWS - 1
+    
+    # الصف المحدد بقي محدداً بمعرفه في موضعه الجديد
+    position = ids(rows.get_rows(0, ROWS)).index(10)
+    assert position == ROWS - 11
+    assert rows.is_selected(rows.get_rows(position, 1)[0])
+
+
+def test_sort_by_toggles_and_survives_set_source(rows):
+    assert not rows.sort_by('missing')
+    
+    rows.sort_by('id')
+    assert rows.sort_reverse is False
+    rows.sort_by('id')
+    assert rows.sort_reverse is True
+    assert ids(rows.window())[:3] == [ROWS - 1, ROWS - 2, ROWS - 3]
+    
+    rows.set_source(ListSource({'id': i, 'name': str(i)} for i in range(50)))
+    assert rows.selected_record is None
+    assert ids(rows.window())[:3] == [49, 48, 47]
@@ -0,0 +1,118 @@
+"""
+تشغيل المهام الطويلة في خيط خلفي مع تسليم النتائج تدريجياً للواجهة
+"""
+import queue
+import threading
+from config import SEARCH_POLL_MS
+
+
+class BackgroundStream:
+    """تشغيل مولّد (generator) في خيط خلفي وتسليم كل جزء في الخيط الرئيسي
+    
+    كل عنصر يعيده المولّد يُسلَّم إلى on_item عبر after() فور جاهزيته، ثم
+    تُستدعى on_done بعد آخر عنصر. بدء مهمة جديدة أو cancel يوقف المهمة
+    السابقة بعد الجزء الحالي ويتجاهل ما تبقى من نتائجها، ويُغلق مولّدها
+    (فتُحرَّر موارده مثل اتصالات db.fetch_batches).
+    
+    max_pending: أقصى عدد عناصر تنتظر التسليم؛ عند امتلائها يتوقف المولّد حتى
+    تلحق به الواجهة (0 = بلا حد).
+    """
+    
+    _DONE = object()
+    
+    # مهلة انتظار مكان في قائمة النتائج قبل إعادة فحص الإلغاء (بالثواني)
+    _PUT_TIMEOUT = 0.1
+    
+    def __init__(self, widget, on_item, on_done=None, on_error=None, max_pending=0):
+        self.widget = widget
+        self.on_item = on_item
+        self.on_done = on_done
+        self.on_error = on_error
+        
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._results = queue.Queue(maxsize=max_pending)
+        self._poll_id = None
+    
+    def start(self, func, *args):
+        """بدء مهمة جديدة (تلغي أي مهمة جارية)"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        
+        threading.Thread(target=self._work, args=(generation, func, args), daemon=True).start()
+        
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(SEARCH_POLL_MS, self._poll)
+    
+    def cancel(self):
+        """إيقاف المهمة الجارية وتجاهل نتائجها"""
+        with self._lock:
+            self._generation += 1
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+    
+    def is_running(self):
+        return self._poll_id is not None
+    
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+    
+    def _put(self, generation, item, error):
+        """إضافة نتيجة (مع الانتظار إذا امتلأت القائمة)، ويعيد False إذا أُلغيت المهمة"""
+        while self._is_current(generation):
+            try:
+                self._results.put((generation, item, error), timeout=self._PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _work(self, generation, func, args):
+        """تشغيل المولّد في الخيط الخلفي"""
+        items = None
+        try:
+            items = func(*args)
+            for item in items:
+                if not self._put(generation, item, None):
+                    return
+        except Exception as e:
+            self._put(generation, None, e)
+            return
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+        
+        self._put(generation, self._DONE, None)
+    
+    def _poll(self):
+        """تسليم النتائج الجاهزة في الخيط الرئيسي"""
+        self._poll_id = None
+        
+        while True:
+            try:
+                generation, item, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            
+            if not self._is_current(generation):
+                continue
+            
+            if error is not None:
+                if self.on_error is not None:
+                    self.on_error(error)
+                else:
+                    print(f"خطأ في المهمة الخلفية: {error}")
+                return
+            
+            if item is self._DONE:
+                if self.on_done is not None:
+                    self.on_done()
+                return
+            
+            self.on_item(item)
+        
+        self._poll_id = self.widget.after(SEARCH_POLL_MS, self._poll)
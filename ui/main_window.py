@@ -1,12 +1,34 @@
 """
 النافذة الرئيسية للتطبيق
 """
+import importlib
 import customtkinter as ctk
 from ui.themes import AppTheme
 from ui.components.sidebar import Sidebar
 from ui.components.dialogs import show_error, ask_yes_no
-from config import APP_NAME, WINDOW_SIZE, MIN_WINDOW_SIZE, COLORS
+from config import (
+    APP_NAME, WINDOW_SIZE, MIN_WINDOW_SIZE, COLORS,
+    PINNED_VIEWS, VIEW_CACHE_SIZE, VIEW_SWITCH_SLOW_MS
+)
 from controllers.auth_controller import AuthController
+from database.connection import db
+from utils.helpers import PhaseTimer
+
+
+# شاشات التطبيق: المعرف ← (الوحدة، اسم الصنف)، وتُستورد عند أول فتح
+VIEW_CLASSES = {
+    'home': ('views.home_view', 'HomeView'),
+    'pos': ('views.pos_view', 'POSView'),
+    'inventory': ('views.inventory_view', 'InventoryView'),
+    'customers': ('views.customers_view', 'CustomersView'),
+    'traders': ('views.traders_view', 'TradersView'),
+    'reports': ('views.reports_view', 'ReportsView'),
+    'product_sales': ('views.product_sales_view', 'ProductSalesView'),
+    'expenses': ('views.expenses_view', 'ExpensesView'),
+    'purchases': ('views.purchases_view', 'PurchasesView'),
+    'users': ('views.users_view', 'UsersView'),
+    'settings': ('views.settings_view', 'SettingsView'),
+}
 
 
 class MainWindow(ctk.CTk):
@@ -26,6 +48,7 @@ class MainWindow(ctk.CTk):
         # المتغيرات
         self.current_user = None
         self.current_view = None
+        self.views = {}
         self.sidebar = None
         self.content_frame = None
         
@@ -37,6 +60,9 @@ class MainWindow(ctk.CTk):
         # مسح المحتوى
         for widget in self.winfo_children():
             widget.destroy()
+        self.views.clear()
+        self.current_view = None
+        db.stats.screen = 'login'
         
         # إطار تسجيل الدخول
         login_frame = ctk.CTkFrame(self, fg_color=COLORS['bg'])
@@ -143,6 +169,8 @@ class MainWindow(ctk.CTk):
         # مسح المحتوى
         for widget in self.winfo_children():
             widget.destroy()
+        self.views.clear()
+        self.current_view = None
         
         # الإطار الرئيسي
         main_frame = ctk.CTkFrame(self, fg_color=COLORS['bg'])
@@ -181,102 +209,56 @@ class MainWindow(ctk.CTk):
             show_error("غير مصرح", "ليس لديك صلاحية للوصول إلى هذه الصفحة")
             return
         
-        # مسح المحتوى السابق
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-        
-        # عرض الشاشة المطلوبة
-        if view_id == 'home':
-            self.show_home()
-        elif view_id == 'pos':
-            self.show_pos()
-        elif view_id == 'inventory':
-            self.show_inventory()
-        elif view_id == 'customers':
-            self.show_customers()
-        elif view_id == 'traders':
-            self.show_traders()
-        elif view_id == 'reports':
-            self.show_reports()
-        elif view_id == 'product_sales':
-            self.show_product_sales()
-        elif view_id == 'expenses':
-            self.show_expenses()
-        elif view_id == 'purchases':
-            self.show_purchases()
-        elif view_id == 'users':
-            self.show_users()
-        elif view_id == 'settings':
-            self.show_settings()
-
-    
-    def show_home(self):
-        """عرض الصفحة الرئيسية"""
-        from views.home_view import HomeView
-        view = HomeView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_pos(self):
-        """عرض نقاط البيع"""
-        from views.pos_view import POSView
-        view = POSView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_inventory(self):
-        """عرض المخزون"""
-        from views.inventory_view import InventoryView
-        view = InventoryView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_customers(self):
-        """عرض العملاء"""
-        from views.customers_view import CustomersView
-        view = CustomersView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_traders(self):
-        """عرض التجار الخارجيين"""
-        from views.traders_view import TradersView
-        view = TradersView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_reports(self):
-        """عرض التقارير"""
-        from views.reports_view import ReportsView
-        view = ReportsView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_product_sales(self):
-        """عرض تقارير مبيعات المنتجات"""
-        from views.product_sales_view import ProductSalesView
-        view = ProductSalesView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_expenses(self):
-        """عرض المصروفات"""
-        from views.expenses_view import ExpensesView
-        view = ExpensesView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
+        self.show_view(view_id)
     
-    def show_purchases(self):
-        """عرض المشتريات"""
-        from views.purchases_view import PurchasesView
-        view = PurchasesView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
-    
-    def show_users(self):
-        """عرض إدارة المستخدمين"""
-        from views.users_view import UsersView
-        view = UsersView(self.content_frame, self.current_user)
+    def show_view(self, view_id):
+        """عرض شاشة محفوظة أو إنشاؤها عند أول فتح
+        
+        الشاشات لا تُهدم عند التنقل بل تُخفى، وعند العودة إليها يُستدعى on_activate
+        (إن وُجد) لتحديث ما تغيّر فقط بدلاً من إعادة بناء الشاشة وتحميلها.
+        """
+        if view_id not in VIEW_CLASSES:
+            return
+        
+        timer = PhaseTimer()
+        
+        # استعلامات الشاشة تُنسب إليها في مراقبة الاستعلامات
+        db.stats.screen = view_id
+        
+        if self.current_view is not None:
+            self.current_view.pack_forget()
+        
+        # آخر شاشة مستخدمة في نهاية القاموس
+        view = self.views.pop(view_id, None)
+        if view is None:
+            module_name, class_name = VIEW_CLASSES[view_id]
+            view_class = getattr(importlib.import_module(module_name), class_name)
+            view = view_class(self.content_frame, self.current_user)
+            timer.mark("الإنشاء")
+        elif hasattr(view, 'on_activate'):
+            view.on_activate()
+            timer.mark("التحديث")
+        
+        self.views[view_id] = view
         view.pack(fill="both", expand=True)
+        self.current_view = view
+        
+        self.evict_views()
+        self.after_idle(self.on_view_shown, view_id, timer)
     
-    def show_settings(self):
-        """عرض الإعدادات"""
-        from views.settings_view import SettingsView
-        view = SettingsView(self.content_frame, self.current_user)
-        view.pack(fill="both", expand=True)
+    def on_view_shown(self, view_id, timer):
+        """نهاية قياس التنقل بعد رسم الشاشة (أول دورة خاملة للحلقة الرئيسية)"""
+        timer.mark("الرسم")
+        if timer.total_ms() >= VIEW_SWITCH_SLOW_MS:
+            timer.report(f"فتح شاشة {view_id}")
     
-
+    def evict_views(self):
+        """حذف أقدم الشاشات غير الدائمة عند تجاوز VIEW_CACHE_SIZE"""
+        cached = [view_id for view_id in self.views if view_id not in PINNED_VIEWS]
+        excess = len(cached) - max(VIEW_CACHE_SIZE, 1)
+        
+        for view_id in cached[:max(excess, 0)]:
+            self.views.pop(view_id).destroy()
     
     def logout(self):
         """تسجيل الخروج"""
@@ -0,0 +1,143 @@
+"""
+تنفيذ البحث أثناء الكتابة في خيط منفصل مع تأخير (debounce)
+"""
+import queue
+import threading
+from config import SEARCH_DEBOUNCE_MS, SEARCH_POLL_MS
+
+
+class SearchDispatcher:
+    """موزّع البحث لحقول البحث المرتبطة بـ KeyRelease
+    
+    كل ضغطة مفتاح تعيد ضبط مؤقت الانتظار، فلا يُنفَّذ الاستعلام إلا بعد توقف
+    الكتابة (دفعة قارئ الباركود كلها تنتج استعلاماً واحداً). الاستعلام يعمل في
+    خيط خلفي، والنتائج تُسلَّم في الخيط الرئيسي عبر after()، وأي نتيجة لبحث
+    أقدم من آخر بحث مطلوب يتم تجاهلها.
+    
+    widget: أي عنصر Tk (للوصول إلى after / after_cancel)
+    search_func: دالة البحث، تُستدعى في الخيط الخلفي بنفس معاملات schedule
+    on_results: تُستدعى في الخيط الرئيسي بالنتائج
+    on_error: تُستدعى في الخيط الرئيسي بالاستثناء إن فشل البحث (اختياري)
+    """
+    
+    def __init__(self, widget, search_func, on_results, on_error=None,
+                 delay=SEARCH_DEBOUNCE_MS):
+        self.widget = widget
+        self.search_func = search_func
+        self.on_results = on_results
+        self.on_error = on_error
+        self.delay = delay
+        
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._pending_id = None
+        self._poll_id = None
+        
+        # رقم آخر طلب أُرسل للخيط الخلفي ولم تُسلَّم نتيجته بعد
+        self._awaiting = None
+        
+        self._results = queue.Queue()
+    
+    def schedule(self, *args):
+        """طلب بحث بعد انتهاء مهلة الانتظار (يلغي أي طلب سابق لم يبدأ)"""
+        self._cancel_pending()
+        self._pending_id = self.widget.after(self.delay, self._dispatch, args)
+    
+    def run_now(self, *args):
+        """تنفيذ البحث في الخلفية فوراً دون انتظار (زر البحث، تغيير القسم)"""
+        self._cancel_pending()
+        self._dispatch(args)
+    
+    def run_sync(self, *args):
+        """تنفيذ البحث في الخيط الحالي وتسليم النتائج مباشرة
+        
+        لعمليات تحتاج النتيجة في الحال (مثل Enter بعد مسح الباركود)،
+        ويُلغي أي بحث سابق لم تصل نتيجته بعد.
+        """
+        self._cancel_pending()
+        with self._lock:
+            self._generation += 1
+        self._awaiting = None
+        
+        results = self.search_func(*args)
+        self.on_results(results)
+        return results
+    
+    def has_pending(self):
+        """هل يوجد بحث منتظر أو جارٍ لم تُسلَّم نتيجته بعد"""
+        return self._pending_id is not None or self._awaiting is not None
+    
+    def cancel(self):
+        """إلغاء البحث المنتظر وتجاهل نتيجة أي بحث جارٍ"""
+        self._cancel_pending()
+        with self._lock:
+            self._generation += 1
+        self._awaiting = None
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+    
+    def _cancel_pending(self):
+        if self._pending_id is not None:
+            self.widget.after_cancel(self._pending_id)
+            self._pending_id = None
+    
+    def _dispatch(self, args):
+        """إرسال الطلب إلى الخيط الخلفي"""
+        self._pending_id = None
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._awaiting = generation
+        
+        threading.Thread(target=self._work, args=(generation, args), daemon=True).start()
+        
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(SEARCH_POLL_MS, self._poll)
+    
+    def _is_current(self, generation):
+        with self._lock:
+            return generation == self._generation
+    
+    def _work(self, generation, args):
+        """تنفيذ البحث في الخيط الخلفي"""
+        # تخطي الطلب إذا حلّ محله طلب أحدث قبل أن يبدأ
+        if not self._is_current(generation):
+            return
+        
+        try:
+            results, error = self.search_func(*args), None
+        except Exception as e:
+            results, error = None, e
+        
+        self._results.put((generation, results, error))
+    
+    def _poll(self):
+        """فحص وصول النتائج في الخيط الرئيسي"""
+        self._poll_id = None
+        delivered = None
+        
+        while True:
+            try:
+                generation, results, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_current(generation):
+                delivered = (results, error)
+        
+        if delivered is None:
+            # الاستمرار ما دام آخر طلب في الخلفية لم تصل نتيجته
+            with self._lock:
+                waiting = self._awaiting == self._generation
+            if waiting:
+                self._poll_id = self.widget.after(SEARCH_POLL_MS, self._poll)
+            return
+        
+        self._awaiting = None
+        results, error = delivered
+        if error is None:
+            self.on_results(results)
+        elif self.on_error is not None:
+            self.on_error(error)
+        else:
+            print(f"خطأ في البحث: {error}")
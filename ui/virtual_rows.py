@@ -0,0 +1,161 @@
+"""
+مصادر بيانات الجدول الافتراضي وحساب الصفوف الظاهرة (بدون Tk)
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class TableSource(ABC):
+    """مصدر بيانات الجدول الافتراضي
+    
+    يكفي تعريف __len__ و fetch لجلب صفحة من الصفوف، فيمكن أن يكون المصدر
+    قائمة في الذاكرة أو استعلاماً بـ LIMIT / OFFSET. الترتيب اختياري:
+    المصدر الذي يدعمه يعيد True من can_sort ويعرّف sort.
+    """
+    
+    @abstractmethod
+    def __len__(self):
+        """عدد الصفوف الكلي"""
+    
+    @abstractmethod
+    def fetch(self, offset, limit):
+        """جلب الصفوف من offset بحد أقصى limit"""
+    
+    def can_sort(self):
+        return False
+    
+    def sort(self, key, reverse=False):
+        """ترتيب المصدر (لا يفعل شيئاً للمصادر التي لا تدعم الترتيب)"""
+
+
+class ListSource(TableSource):
+    """مصدر بيانات من قائمة في الذاكرة"""
+    
+    def __init__(self, records):
+        self.records = list(records)
+    
+    def __len__(self):
+        return len(self.records)
+    
+    def fetch(self, offset, limit):
+        return self.records[offset:offset + limit]
+    
+    def can_sort(self):
+        return True
+    
+    def sort(self, key, reverse=False):
+        self.records.sort(key=key, reverse=reverse)
+
+
+class VirtualRows:
+    """حالة الجدول الافتراضي: موضع التمرير والتحديد والترتيب وصفحات المصدر
+    
+    لا تعرف شيئاً عن Tk: VirtualTreeview يعرض window() ويمرر إليها أحداث
+    التمرير والتحديد، فيمكن اختبار الحساب وقياسه بدون شاشة.
+    
+    key(record): معرف الصف للاحتفاظ بالتحديد أثناء التمرير
+    sort_keys: {اسم العمود: دالة مفتاح الترتيب}
+    """
+    
+    PAGE_SIZE = 200
+    PAGE_CACHE_SIZE = 8
+    
+    def __init__(self, key, sort_keys=None, visible=15):
+        self.key = key
+        self.sort_keys = sort_keys or {}
+        self.visible = visible
+        
+        self.source = ListSource([])
+        self.pages = OrderedDict()
+        self.offset = 0
+        
+        self.selected_key = None
+        self.selected_record = None
+        
+        self.sort_column = None
+        self.sort_reverse = False
+    
+    def __len__(self):
+        return len(self.source)
+    
+    def set_source(self, source):
+        """تغيير المصدر: يلغي التحديد ويعود لأعلى الجدول مع الحفاظ على الترتيب المختار"""
+        self.source = source
+        self.pages.clear()
+        self.offset = 0
+        self.selected_key = None
+        self.selected_record = None
+        
+        if self.sort_column is not None and source.can_sort():
+            source.sort(self.sort_keys[self.sort_column], self.sort_reverse)
+    
+    def page(self, number):
+        """جلب صفحة من المصدر مع الاحتفاظ بآخر PAGE_CACHE_SIZE صفحة مستخدمة"""
+        page = self.pages.get(number)
+        if page is None:
+            page = self.source.fetch(number * self.PAGE_SIZE, self.PAGE_SIZE)
+            self.pages[number] = page
+            if len(self.pages) > self.PAGE_CACHE_SIZE:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(number)
+        return page
+    
+    def get_rows(self, offset, count):
+        """الصفوف من offset بعدد count (من صفحات المصدر)"""
+        rows = []
+        position = offset
+        end = offset + count
+        while position < end:
+            number, start = divmod(position, self.PAGE_SIZE)
+            page = self.page(number)
+            chunk = page[start:start + end - position]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            position += len(chunk)
+        return rows
+    
+    def window(self):
+        """الصفوف الظاهرة بعد حصر الموضع بين أول الجدول وآخر شاشة كاملة منه"""
+        total = len(self.source)
+        self.offset = max(0, min(self.offset, total - self.visible))
+        return self.get_rows(self.offset, min(self.visible, total - self.offset))
+    
+    def is_selected(self, record):
+        return self.selected_key is not None and self.key(record) == self.selected_key
+    
+    def select(self, index):
+        """تحديد الصف في الموضع index بدون تمرير، ويعيد الصف"""
+        record = self.get_rows(index, 1)[0]
+        self.selected_key = self.key(record)
+        self.selected_record = record
+        return record
+    
+    def select_index(self, index):
+        """تحديد الصف في الموضع index وتمريره للظهور، ويعيد الصف أو None"""
+        if not 0 <= index < len(self.source):
+            return None
+        
+        record = self.select(index)
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible:
+            self.offset = index - self.visible + 1
+        return record
+    
+    def sort_by(self, column):
+        """الترتيب حسب عمود (مرة ثانية تعكس الترتيب)، ويعيد False إن لم يكن ممكناً"""
+        if column not in self.sort_keys or not self.source.can_sort():
+            return False
+        
+        if self.sort_column == column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = False
+        
+        self.source.sort(self.sort_keys[column], self.sort_reverse)
+        self.pages.clear()
+        self.offset = 0
+        return True
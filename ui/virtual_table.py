@@ -0,0 +1,217 @@
+"""
+جدول افتراضي (Virtual Treeview) لعرض عدد كبير من الصفوف
+"""
+from tkinter import ttk
+import customtkinter as ctk
+from ui.virtual_rows import TableSource, ListSource, VirtualRows
+
+
+class VirtualTreeview(ctk.CTkFrame):
+    """جدول يعرض الصفوف الظاهرة فقط
+    
+    بدلاً من إنشاء عنصر Tk لكل صف، يحتفظ الجدول بعدد ثابت من العناصر بقدر
+    ما يظهر على الشاشة ويعيد تعبئتها عند التمرير. الموضع والتحديد والترتيب
+    وصفحات المصدر في self.rows (VirtualRows).
+    
+    formatter(index, record): يعيد (القيم، الوسوم) لصف في الموضع index
+    key(record): معرف الصف للاحتفاظ بالتحديد أثناء التمرير (افتراضياً record['id'])
+    sort_keys: {اسم العمود: دالة مفتاح الترتيب} للترتيب عند الضغط على رأس العمود
+    """
+    
+    WHEEL_ROWS = 3
+    
+    def __init__(self, parent, columns, formatter, key=None, widths=None,
+                 height=15, sort_keys=None, **kwargs):
+        kwargs.setdefault('fg_color', 'transparent')
+        super().__init__(parent, **kwargs)
+        
+        self.columns = columns
+        self.formatter = formatter
+        self.sort_keys = sort_keys or {}
+        self.rows = VirtualRows(key or (lambda record: record['id']), self.sort_keys, visible=height)
+        self._items = []
+        
+        # ارتفاع منطقة الجدول و (بداية أول صف، ارتفاع الصف) بعد قياسهما
+        self._height = None
+        self._row_metrics = None
+        
+        self.tree = ttk.Treeview(
+            self,
+            columns=columns,
+            show="headings",
+            height=height,
+            selectmode="browse"
+        )
+        
+        if isinstance(widths, int) or widths is None:
+            widths = [widths or 120] * len(columns)
+        for col, width in zip(columns, widths):
+            if col in self.sort_keys:
+                self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
+            else:
+                self.tree.heading(col, text=col)
+            self.tree.column(col, width=width, anchor="center")
+        
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        
+        self.tree.pack(side="right", fill="both", expand=True)
+        self.scrollbar.pack(side="left", fill="y")
+        
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<Configure>', self._on_configure)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-self.WHEEL_ROWS))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(self.WHEEL_ROWS))
+        self.tree.bind('<Up>', lambda e: self._move_selection(-1))
+        self.tree.bind('<Down>', lambda e: self._move_selection(1))
+        self.tree.bind('<Prior>', lambda e: self._move_selection(-self.rows.visible))
+        self.tree.bind('<Next>', lambda e: self._move_selection(self.rows.visible))
+        self.tree.bind('<Home>', lambda e: self.select_index(0) and "break")
+        self.tree.bind('<End>', lambda e: self.select_index(len(self.rows) - 1) and "break")
+    
+    # ---------- البيانات ----------
+    
+    def set_data(self, records):
+        """عرض قائمة من الصفوف"""
+        self.set_source(ListSource(records))
+    
+    def set_source(self, source):
+        """تغيير مصدر البيانات (يلغي التحديد ويعود لأعلى الجدول)"""
+        self.rows.set_source(source)
+        self._render()
+    
+    def refresh(self):
+        """إعادة قراءة الصفوف الظاهرة من المصدر (بعد تعديل البيانات)"""
+        self.rows.pages.clear()
+        self._render()
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def get_rows(self, offset, count):
+        """الصفوف من offset بعدد count (من صفحات المصدر)"""
+        return self.rows.get_rows(offset, count)
+    
+    # ---------- العرض ----------
+    
+    def _render(self):
+        """تعبئة العناصر الظاهرة بالصفوف ابتداءً من الموضع الحالي"""
+        rows = self.rows.window()
+        offset = self.rows.offset
+        total = len(self.rows)
+        
+        # إنشاء أو حذف العناصر الزائدة فقط، وإعادة استخدام الباقي
+        while len(self._items) < len(rows):
+            self._items.append(self.tree.insert("", "end"))
+        if len(self._items) > len(rows):
+            self.tree.delete(*self._items[len(rows):])
+            del self._items[len(rows):]
+        
+        selected = []
+        for i, (item, record) in enumerate(zip(self._items, rows)):
+            values, tags = self.formatter(offset + i, record)
+            self.tree.item(item, values=values, tags=tags)
+            if self.rows.is_selected(record):
+                selected.append(item)
+        
+        self.tree.selection_set(selected)
+        if selected:
+            self.tree.focus(selected[0])
+        
+        if total:
+            self.scrollbar.set(offset / total, (offset + len(rows)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        
+        # قياس ارتفاع الصف بعد ظهور أول صف
+        if self._row_metrics is None and self._items:
+            self.after_idle(self._update_visible)
+    
+    def _on_configure(self, event):
+        """إعادة حساب عدد الصفوف الظاهرة عند تغيير حجم الجدول"""
+        self._height = event.height
+        self._update_visible()
+    
+    def _update_visible(self):
+        """عدد الصفوف التي تتسع لها مساحة الجدول"""
+        if self._row_metrics is None:
+            bbox = self.tree.bbox(self._items[0]) if self._items else ''
+            if not bbox:
+                return
+            self._row_metrics = (bbox[1], bbox[3])
+        
+        if self._height is None:
+            return
+        
+        top, row_height = self._row_metrics
+        visible = max(1, (self._height - top) // row_height)
+        if visible != self.rows.visible:
+            self.rows.visible = visible
+            self._render()
+    
+    # ---------- التمرير ----------
+    
+    def scroll(self, rows):
+        """تمرير الجدول بعدد من الصفوف"""
+        self.rows.offset += rows
+        self._render()
+        return "break"
+    
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == 'moveto':
+            self.rows.offset = int(float(value) * len(self.rows))
+            self._render()
+        elif action == 'scroll':
+            step = self.rows.visible if unit == 'pages' else 1
+            self.scroll(int(value) * step)
+    
+    def _on_mousewheel(self, event):
+        return self.scroll(-self.WHEEL_ROWS if event.delta > 0 else self.WHEEL_ROWS)
+    
+    # ---------- التحديد ----------
+    
+    def _on_select(self, event):
+        """حفظ الصف المختار بالمعرف حتى يبقى محدداً بعد التمرير"""
+        selection = self.tree.selection()
+        if not selection or selection[0] not in self._items:
+            return
+        
+        self.rows.select(self.rows.offset + self._items.index(selection[0]))
+    
+    def select_index(self, index):
+        """تحديد الصف في الموضع index وتمريره للظهور، ويعيد الصف أو None"""
+        record = self.rows.select_index(index)
+        if record is not None:
+            self._render()
+        return record
+    
+    def _move_selection(self, delta):
+        """التنقل بالأسهم مع التمرير عند الوصول لحافة الجدول"""
+        focus = self.tree.focus()
+        if focus in self._items:
+            index = self.rows.offset + self._items.index(focus) + delta
+        else:
+            index = self.rows.offset
+        
+        self.select_index(max(0, min(index, len(self.rows) - 1)))
+        return "break"
+    
+    def selected_record(self):
+        """الصف المحدد حالياً أو None"""
+        return self.rows.selected_record
+    
+    # ---------- الترتيب ----------
+    
+    def sort_by(self, column):
+        """الترتيب حسب عمود (الضغط مرة ثانية يعكس الترتيب)"""
+        if self.rows.sort_by(column):
+            self._render()
+    
+    # ---------- تمرير لعنصر Treeview ----------
+    
+    def bind_rows(self, sequence, func):
+        """ربط حدث بصفوف الجدول (مثل النقر المزدوج)"""
+        return self.tree.bind(sequence, func, add='+')
+    
+    def tag_configure(self, tag, **kwargs):
+        return self.tree.tag_configure(tag, **kwargs)
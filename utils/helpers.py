@@ -2,10 +2,35 @@
 دوال مساعدة عامة
 """
 import hashlib
+import re
+import time
 from datetime import datetime, timedelta
 import json
 
 
+class PhaseTimer:
+    """قياس زمن مراحل عملية (بدء التشغيل، فتح شاشة) بالمللي ثانية"""
+    
+    def __init__(self, started=None):
+        self.started = time.perf_counter() if started is None else started
+        self.last = self.started
+        self.phases = []
+    
+    def mark(self, phase):
+        """تسجيل نهاية مرحلة"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+    
+    def total_ms(self):
+        return (self.last - self.started) * 1000
+    
+    def report(self, title):
+        """طباعة زمن كل مرحلة والإجمالي بالمللي ثانية"""
+        parts = " | ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in self.phases)
+        print(f"⏱️ {title}: {parts} | الإجمالي {self.total_ms():.0f}ms")
+
+
 def hash_password(password):
     """تشفير كلمة المرور"""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -37,6 +62,85 @@ def get_date_range(days_back=30):
     }
 
 
+def get_day_bounds(start_date, end_date=None):
+    """تحويل نطاق أيام [start_date, end_date] إلى حدود نصف مفتوحة [start, end)
+    
+    الحد الأعلى هو بداية اليوم التالي لـ end_date، فيشمل النطاق كل أوقات اليوم الأخير
+    """
+    end_date = end_date or start_date
+    end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+    return start_date, end.strftime('%Y-%m-%d')
+
+
+def get_period_bounds(period='today'):
+    """حدود الفترات الجاهزة (today / week / month) حتى نهاية اليوم الحالي"""
+    today = datetime.now()
+    days_back = {'today': 0, 'week': 7, 'month': 30}.get(period, 0)
+    start = today - timedelta(days=days_back)
+    return get_day_bounds(start.strftime('%Y-%m-%d'), today.strftime('%Y-%m-%d'))
+
+
+def get_previous_month_range(today=None):
+    """أول وآخر يوم في الشهر السابق (YYYY-MM-DD)"""
+    today = today or datetime.now()
+    last_day = today.replace(day=1) - timedelta(days=1)
+    return last_day.replace(day=1).strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
+
+
+def date_range_filter(column, start_date=None, end_date=None):
+    """بناء شرط تاريخ قابل للاستفادة من الفهرس: column >= ? AND column < ?
+    
+    يقارن العمود مباشرة بدلاً من DATE(column) حتى يستخدم SQLite فهرس created_at.
+    بدون تواريخ يُستخدم اليوم الحالي. يعيد (نص الشرط، المعاملات).
+    """
+    if start_date:
+        bounds = get_day_bounds(start_date, end_date)
+    else:
+        bounds = get_period_bounds('today')
+    
+    return f"{column} >= ? AND {column} < ?", bounds
+
+
+# توحيد أشكال الحروف العربية في البحث: الهمزات على الألف، التاء المربوطة، الألف المقصورة
+# مع حذف التشكيل والتطويل (يُستخدم نفس الجدول في مشغلات فهرس البحث FTS)
+ARABIC_NORMALIZATION = {
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    'ـ': '',
+    **{chr(code): '' for code in range(0x064B, 0x0653)},
+    'ٰ': '',
+}
+
+_ARABIC_TRANSLATION = str.maketrans(ARABIC_NORMALIZATION)
+
+
+def normalize_arabic(text):
+    """توحيد النص العربي للبحث (أ/إ/آ → ا، ة → ه، ى → ي، بدون تشكيل)"""
+    return (text or '').translate(_ARABIC_TRANSLATION).lower()
+
+
+# كلمة بحث: حروف وأرقام متتالية (كما يقسم فهرس FTS5 النص)
+_SEARCH_WORD = re.compile(r'[^\W_]+')
+
+
+def search_words(text):
+    """كلمات النص بعد توحيد الحروف العربية، لمطابقة بداياتها في البحث"""
+    return _SEARCH_WORD.findall(normalize_arabic(text))
+
+
+def build_fts_query(text):
+    """تحويل نص البحث إلى استعلام FTS5 بمطابقة بادئة لكل كلمة
+    
+    كل كلمة توضع بين علامتي تنصيص حتى لا تُفسَّر رموزها كعوامل FTS،
+    ويعيد None إذا لم يبقَ شيء للبحث عنه.
+    """
+    words = normalize_arabic(text).replace('"', ' ').split()
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
 def calculate_profit(sale_price, purchase_price, quantity=1):
     """حساب الربح"""
     total_sale = sale_price * quantity
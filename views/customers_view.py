@@ -5,7 +5,9 @@ import customtkinter as ctk
 from tkinter import ttk
 from config import COLORS
 from controllers.customer_controller import CustomerController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import InputDialog, show_error, show_info, ask_yes_no
+from ui.search_dispatcher import SearchDispatcher
 
 
 class CustomersView(ctk.CTkFrame):
@@ -41,7 +43,15 @@ class CustomersView(ctk.CTkFrame):
             width=300
         )
         self.search_entry.pack(side="right", padx=5)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.load_data())
+        
+        # البحث أثناء الكتابة في الخلفية
+        self.search_dispatcher = SearchDispatcher(
+            self, CustomerController.get_all_customers, self.display_data
+        )
+        self.search_entry.bind(
+            '<KeyRelease>',
+            lambda e: self.search_dispatcher.schedule(self.search_entry.get().strip())
+        )
         
         ctk.CTkButton(
             toolbar,
@@ -85,11 +95,28 @@ class CustomersView(ctk.CTkFrame):
         self.tree.pack(side="right", fill="both", expand=True, padx=10, pady=10)
         scrollbar.pack(side="left", fill="y", pady=10)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('customers')
+    
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_data()
+    
+    def destroy(self):
+        """إلغاء البحث الجاري قبل حذف الشاشة"""
+        self.search_dispatcher.cancel()
+        super().destroy()
+    
     def load_data(self):
         """تحميل البيانات"""
+        self.loaded_stamp = self.data_stamp()
         query = self.search_entry.get().strip()
-        customers = CustomerController.get_all_customers(query)
-        
+        self.search_dispatcher.run_sync(query)
+    
+    def display_data(self, customers):
+        """عرض العملاء في الجدول"""
         self.tree.delete(*self.tree.get_children())
         
         for customer in customers:
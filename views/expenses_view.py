@@ -5,6 +5,7 @@ import customtkinter as ctk
 from tkinter import ttk
 from config import COLORS
 from controllers.expense_controller import ExpenseController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import InputDialog, show_error, show_info, ask_yes_no
 from ui.components.cards import StatCard
 
@@ -90,8 +91,18 @@ class ExpensesView(ctk.CTkFrame):
         self.tree.pack(side="right", fill="both", expand=True, padx=10, pady=10)
         scrollbar.pack(side="left", fill="y", pady=10)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('expenses')
+    
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_data()
+    
     def load_data(self):
         """تحميل البيانات"""
+        self.loaded_stamp = self.data_stamp()
         expenses = ExpenseController.get_all_expenses()
         
         self.tree.delete(*self.tree.get_children())
@@ -5,7 +5,7 @@ import customtkinter as ctk
 from config import COLORS, APP_NAME
 from controllers.sales_controller import SalesController
 from controllers.product_controller import ProductController
-from controllers.expense_controller import ExpenseController
+from controllers.data_versions import data_versions
 from ui.components.cards import StatCard
 
 
@@ -146,38 +146,39 @@ class HomeView(ctk.CTkFrame):
             height=40
         ).pack(pady=10)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('sales', 'returns', 'expenses'), ProductController.get_catalog_version()
+    
+    def on_activate(self):
+        """تحديث الإحصائيات عند العودة للصفحة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_stats()
+    
     def load_stats(self):
         """تحميل الإحصائيات"""
-        # مبيعات اليوم
-        sales_summary = SalesController.get_sales_summary()
-        self.sales_count_card.update_value(sales_summary.get('total_sales', 0) or 0)
+        self.loaded_stamp = self.data_stamp()
         
-        total_revenue = sales_summary.get('total_revenue') or 0
-        self.revenue_card.update_value(f"{total_revenue:.2f} جنيه")
+        # مبيعات وأرباح ومصروفات اليوم (قراءة واحدة من الملخص اليومي)
+        kpis = SalesController.get_daily_kpis()
+        self.sales_count_card.update_value(kpis['sales_count'])
+        self.revenue_card.update_value(f"{kpis['revenue']:.2f} جنيه")
         
         # الأرباح
-        profit_data = SalesController.calculate_profit()
-        profit = profit_data.get('profit') or 0
-        profit_margin = profit_data.get('profit_margin') or 0
-        
-        self.profit_card.update_value(f"{profit:.2f} جنيه")
-        self.profit_margin_card.update_value(f"{profit_margin:.1f}%")
+        self.profit_card.update_value(f"{kpis['profit']:.2f} جنيه")
+        self.profit_margin_card.update_value(f"{kpis['profit_margin']:.1f}%")
         
         # المصروفات
-        expenses = ExpenseController.get_today_expenses()
-        expenses_total = expenses.get('total') or 0
-        self.expenses_card.update_value(f"{expenses_total:.2f} جنيه")
+        self.expenses_card.update_value(f"{kpis['expenses']:.2f} جنيه")
         
         # صافي الربح (الربح - المصروفات)
-        net_profit = profit - expenses_total
-        self.net_profit_card.update_value(f"{net_profit:.2f} جنيه")
+        self.net_profit_card.update_value(f"{kpis['net_profit']:.2f} جنيه")
         
         # المخزون
-        products = ProductController.get_all_products()
         inventory = ProductController.get_total_inventory_value()
         low_stock = ProductController.get_low_stock_products()
         
-        self.products_count_card.update_value(len(products))
+        self.products_count_card.update_value(inventory['items_count'])
         self.inv_value_card.update_value(f"{inventory['total_sell']:.2f} جنيه")
         self.low_stock_card.update_value(len(low_stock))
     
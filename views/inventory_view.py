@@ -2,11 +2,12 @@
 شاشة إدارة المخزون
 """
 import customtkinter as ctk
-from tkinter import ttk
 from config import COLORS
 from controllers.product_controller import ProductController
 from ui.components.dialogs import InputDialog, show_error, show_info, ask_yes_no
 from ui.components.cards import StatCard
+from ui.search_dispatcher import SearchDispatcher
+from ui.virtual_table import VirtualTreeview
 
 
 class InventoryView(ctk.CTkFrame):
@@ -65,7 +66,17 @@ class InventoryView(ctk.CTkFrame):
             width=300
         )
         self.search_entry.pack(side="right", padx=5)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.load_data())
+        
+        # البحث أثناء الكتابة في الخلفية (بدون إعادة حساب الإحصائيات)
+        self.search_dispatcher = SearchDispatcher(
+            self, ProductController.get_all_products, self.display_data
+        )
+        self.search_entry.bind(
+            '<KeyRelease>',
+            lambda e: self.search_dispatcher.schedule(
+                self.search_entry.get().strip(), self.get_selected_category_id()
+            )
+        )
         
         # الصف الثاني: تصفية القسم
         filter_row = ctk.CTkFrame(search_filter_frame, fg_color="transparent")
@@ -132,22 +143,22 @@ class InventoryView(ctk.CTkFrame):
         table_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
         columns = ("الاسم", "الفئة", "سعر البيع", "سعر الشراء", "المخزون", "التاجر", "الباركود")
-        self.tree = ttk.Treeview(
+        self.tree = VirtualTreeview(
             table_frame,
             columns=columns,
-            show="headings",
-            height=15
+            formatter=self.format_product_row,
+            widths=120,
+            sort_keys={
+                "الاسم": lambda p: p['name'],
+                "الفئة": lambda p: p['category_name'] or "",
+                "سعر البيع": lambda p: p['sell_price'],
+                "سعر الشراء": lambda p: p['cost_price'],
+                "المخزون": lambda p: p['stock'],
+                "التاجر": lambda p: p['trader_name'] or "",
+                "الباركود": lambda p: p['barcode'] or "",
+            }
         )
-        
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=120, anchor="center")
-        
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree.pack(side="right", fill="both", expand=True, padx=10, pady=10)
-        scrollbar.pack(side="left", fill="y", pady=10)
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
     
     def load_categories(self):
         """تحميل الأقسام"""
@@ -155,6 +166,15 @@ class InventoryView(ctk.CTkFrame):
         category_names = ["جميع الأقسام"] + [c['name'] for c in self.categories]
         self.category_combo.configure(values=category_names)
     
+    def on_activate(self):
+        """تحديث الشاشة عند العودة إليها دون إعادة بنائها"""
+        self.load_categories()
+        
+        if ProductController.get_catalog_version() != self.catalog_version:
+            self.load_data()
+        else:
+            self.update_statistics()
+    
     def get_selected_category_id(self):
         """الحصول على معرف القسم المختار"""
         category_name = self.category_var.get()
@@ -175,56 +195,51 @@ class InventoryView(ctk.CTkFrame):
         query = self.search_entry.get().strip()
         category_id = self.get_selected_category_id()
         
-        products = ProductController.get_all_products(query, category_id)
-        
-        self.tree.delete(*self.tree.get_children())
-        
-        for product in products:
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    product['name'],
-                    product['category_name'] or "",
-                    f"{product['sell_price']:.2f}",
-                    f"{product['cost_price']:.2f}",
-                    product['stock'],
-                    product['trader_name'] or "",
-                    product['barcode'] or ""
-                ),
-                tags=(product['id'],)
-            )
+        self.search_dispatcher.run_sync(query, category_id)
         
         # تحديث الإحصائيات
         self.update_statistics()
     
+    def display_data(self, products):
+        """عرض المنتجات في الجدول"""
+        self.catalog_version = ProductController.get_catalog_version()
+        self.tree.set_data(products)
+    
+    def format_product_row(self, index, product):
+        """قيم صف المنتج في الجدول"""
+        return (
+            product['name'],
+            product['category_name'] or "",
+            f"{product['sell_price']:.2f}",
+            f"{product['cost_price']:.2f}",
+            product['stock'],
+            product['trader_name'] or "",
+            product['barcode'] or ""
+        ), ()
+    
     def update_statistics(self):
         """تحديث الإحصائيات"""
-        products = ProductController.get_all_products()
         inventory_value = ProductController.get_total_inventory_value()
         low_stock = ProductController.get_low_stock_products()
         
-        self.total_products_card.update_value(len(products))
+        self.total_products_card.update_value(inventory_value['items_count'])
         self.total_value_card.update_value(f"{inventory_value['total_sell']:.2f} جنيه")
         self.low_stock_card.update_value(len(low_stock))
     
     def add_product(self):
         """إضافة منتج"""
-        from database.connection import db
         from ui.components.dialogs import ProductDialog
         
         # الحصول على البيانات المساعدة
-        categories = db.fetch_all("SELECT * FROM categories ORDER BY name")
-        suppliers = db.fetch_all("SELECT * FROM suppliers ORDER BY name")
-        traders = db.fetch_all("SELECT * FROM external_traders ORDER BY name")
+        options = ProductController.get_form_options()
         
         # فتح نموذج الإضافة
         dialog = ProductDialog(
             self.winfo_toplevel(),
             title="إضافة منتج جديد",
-            categories=categories,
-            suppliers=suppliers,
-            traders=traders
+            categories=options['categories'],
+            suppliers=options['suppliers'],
+            traders=options['traders']
         )
         
         result = dialog.get_result()
@@ -241,15 +256,14 @@ class InventoryView(ctk.CTkFrame):
     
     def edit_product(self):
         """تعديل منتج"""
-        from database.connection import db
         from ui.components.dialogs import ProductDialog
         
-        selection = self.tree.selection()
-        if not selection:
+        selected = self.tree.selected_record()
+        if not selected:
             show_error("خطأ", "يرجى اختيار منتج")
             return
         
-        product_id = int(self.tree.item(selection[0])['tags'][0])
+        product_id = selected['id']
         
         # الحصول على بيانات المنتج
         product = ProductController.get_product_by_id(product_id)
@@ -259,18 +273,16 @@ class InventoryView(ctk.CTkFrame):
             return
         
         # الحصول على البيانات المساعدة
-        categories = db.fetch_all("SELECT * FROM categories ORDER BY name")
-        suppliers = db.fetch_all("SELECT * FROM suppliers ORDER BY name")
-        traders = db.fetch_all("SELECT * FROM external_traders ORDER BY name")
+        options = ProductController.get_form_options()
         
         # فتح نموذج التعديل
         dialog = ProductDialog(
             self.winfo_toplevel(),
             title="تعديل منتج",
             product_data=product,
-            categories=categories,
-            suppliers=suppliers,
-            traders=traders
+            categories=options['categories'],
+            suppliers=options['suppliers'],
+            traders=options['traders']
         )
         
         result = dialog.get_result()
@@ -287,13 +299,13 @@ class InventoryView(ctk.CTkFrame):
     
     def delete_product(self):
         """حذف منتج"""
-        selection = self.tree.selection()
-        if not selection:
+        selected = self.tree.selected_record()
+        if not selected:
             show_error("خطأ", "يرجى اختيار منتج")
             return
         
         if ask_yes_no("تأكيد", "هل تريد حذف هذا المنتج؟"):
-            product_id = int(self.tree.item(selection[0])['tags'][0])
+            product_id = selected['id']
             result = ProductController.delete_product(product_id)
             
             if result['success']:
@@ -305,11 +317,11 @@ class InventoryView(ctk.CTkFrame):
     def bulk_purchase(self):
         """إضافة عملية شراء متعددة المنتجات"""
         from ui.components.dialogs import BulkPurchaseDialog
-        from database.connection import db
+        from controllers.purchase_controller import PurchaseController
         
         # الحصول على قائمة المنتجات والموردين
-        products = db.fetch_all("SELECT * FROM products ORDER BY name")
-        suppliers = db.fetch_all("SELECT * FROM suppliers ORDER BY name")
+        products = ProductController.get_all_products()
+        suppliers = PurchaseController.get_suppliers()
         
         if not products:
             show_error("خطأ", "لا توجد منتجات في المخزون. يرجى إضافة منتجات أولاً.")
@@ -326,8 +338,6 @@ class InventoryView(ctk.CTkFrame):
         
         if result:
             # معالجة عملية الشراء
-            from controllers.purchase_controller import PurchaseController
-            
             response = PurchaseController.process_bulk_purchase(
                 supplier_id=result['supplier_id'],
                 items=result['items'],
@@ -343,43 +353,44 @@ class InventoryView(ctk.CTkFrame):
     def bulk_add_products(self):
         """إضافة منتجات متعددة جديدة"""
         from ui.components.dialogs import BulkProductDialog
-        from database.connection import db
         
         # الحصول على الفئات والموردين والتجار
-        categories = db.fetch_all("SELECT * FROM categories ORDER BY name")
-        suppliers = db.fetch_all("SELECT * FROM suppliers ORDER BY name")
-        traders = db.fetch_all("SELECT * FROM external_traders ORDER BY name")
+        options = ProductController.get_form_options()
         
-        if not categories:
+        if not options['categories']:
             show_error("خطأ", "لا توجد فئات. يرجى إضافة فئة واحدة على الأقل أولاً.")
             return
         
         # فتح نموذج إضافة المنتجات المتعددة
         dialog = BulkProductDialog(
             self.winfo_toplevel(),
-            categories=categories,
-            suppliers=suppliers,
-            traders=traders
+            categories=options['categories'],
+            suppliers=options['suppliers'],
+            traders=options['traders']
         )
         
         result = dialog.get_result()
         
         if result:
-            # حفظ جميع المنتجات
-            success_count = 0
-            error_count = 0
+            # حفظ جميع المنتجات دفعة واحدة
+            response = ProductController.add_products_bulk(result)
+            errors = response['errors']
             
-            for product_data in result:
-                response = ProductController.add_product(product_data)
-                if response['success']:
-                    success_count += 1
-                else:
-                    error_count += 1
-            
-            if error_count == 0:
-                show_info("نجاح", f"تم إضافة {success_count} منتج بنجاح!")
+            if not response['success'] and not errors:
+                show_error("خطأ", response['message'])
+            elif not errors:
+                show_info("نجاح", f"تم إضافة {response['added']} منتج بنجاح!")
             else:
-                show_info("تنبيه", f"تم إضافة {success_count} منتج بنجاح\nفشل {error_count} منتج")
+                details = "\n".join(
+                    f"سطر {error['row']} ({error['name'] or '-'}): {error['message']}"
+                    for error in errors[:10]
+                )
+                if len(errors) > 10:
+                    details += f"\n... و {len(errors) - 10} أخرى"
+                show_info(
+                    "تنبيه",
+                    f"تم إضافة {response['added']} منتج بنجاح\nفشل {len(errors)} منتج:\n{details}"
+                )
             
             self.load_data()
     
@@ -8,8 +8,11 @@ from controllers.product_controller import ProductController
 from controllers.sales_controller import SalesController
 from controllers.customer_controller import CustomerController
 from controllers.expense_controller import ExpenseController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import show_error, show_info, ask_yes_no, InputDialog, SimpleInputDialog
 from utils.validators import validate_number, format_currency
+from ui.search_dispatcher import SearchDispatcher
+from ui.virtual_table import VirtualTreeview
 
 
 class POSView(ctk.CTkFrame):
@@ -121,7 +124,17 @@ class POSView(ctk.CTkFrame):
             font=("Arial", 12)
         )
         self.search_entry.pack(side="right", fill="x", expand=True, padx=(0, 10))
-        self.search_entry.bind('<KeyRelease>', lambda e: self.search_products())
+        
+        # البحث أثناء الكتابة في الخلفية (دفعة قارئ الباركود تنتج استعلاماً واحداً)
+        self.search_dispatcher = SearchDispatcher(
+            self, ProductController.get_all_products, self.display_products
+        )
+        self.search_entry.bind(
+            '<KeyRelease>',
+            lambda e: self.search_dispatcher.schedule(
+                self.search_entry.get().strip(), self.get_selected_category_id()
+            )
+        )
         self.search_entry.bind('<Return>', lambda e: self.add_first_product())
         
         search_btn = ctk.CTkButton(
@@ -156,30 +169,23 @@ class POSView(ctk.CTkFrame):
         products_frame = ctk.CTkFrame(left_frame, fg_color="transparent")
         products_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
-        # Treeview للمنتجات
+        # جدول المنتجات (يعرض الصفوف الظاهرة فقط)
         columns = ("الاسم", "السعر", "المخزون", "الباركود")
-        self.products_tree = ttk.Treeview(
+        self.products_tree = VirtualTreeview(
             products_frame,
             columns=columns,
-            show="headings",
-            height=15
-        )
-        
-        for col in columns:
-            self.products_tree.heading(col, text=col)
-            self.products_tree.column(col, width=150, anchor="center")
-        
-        scrollbar = ttk.Scrollbar(
-            products_frame,
-            orient="vertical",
-            command=self.products_tree.yview
+            formatter=self.format_product_row,
+            widths=150,
+            sort_keys={
+                "الاسم": lambda p: p['name'],
+                "السعر": lambda p: p['sell_price'],
+                "المخزون": lambda p: p['stock'],
+                "الباركود": lambda p: p['barcode'] or "",
+            }
         )
-        self.products_tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.products_tree.pack(side="right", fill="both", expand=True)
-        scrollbar.pack(side="left", fill="y")
+        self.products_tree.pack(fill="both", expand=True)
         
-        self.products_tree.bind('<Double-1>', lambda e: self.add_to_cart())
+        self.products_tree.bind_rows('<Double-1>', lambda e: self.add_to_cart())
         
         # الجزء الأيمن - السلة والدفع
         right_frame = ctk.CTkFrame(self, fg_color=COLORS['card_bg'])
@@ -324,8 +330,24 @@ class POSView(ctk.CTkFrame):
         self.load_categories()
         self.load_products()
     
+    def on_activate(self):
+        """تحديث الشاشة عند العودة إليها دون إعادة بنائها"""
+        # إعادة تحميل العملاء فقط إذا تغيّر جدولهم (الأقسام ثابتة: تُحمَّل مع إنشاء الشاشة)
+        if data_versions.stamp('customers') != self.customers_stamp:
+            self.load_customers()
+        
+        # إعادة عرض المنتجات فقط إذا تغيّر الكتالوج (البحث نفسه من الذاكرة)
+        if ProductController.get_catalog_version() != self.catalog_version:
+            self.search_dispatcher.run_sync(
+                self.search_entry.get().strip(), self.get_selected_category_id()
+            )
+        
+        if data_versions.stamp('sales', 'returns', 'expenses') != self.stats_stamp:
+            self.update_daily_stats()
+    
     def load_customers(self):
         """تحميل العملاء"""
+        self.customers_stamp = data_versions.stamp('customers')
         self.customers = CustomerController.get_all_customers()
         customer_names = ["بدون عميل"] + [c['name'] for c in self.customers]
         self.customer_combo.configure(values=customer_names)
@@ -338,60 +360,50 @@ class POSView(ctk.CTkFrame):
     
     def load_products(self):
         """تحميل المنتجات"""
-        self.products_tree.delete(*self.products_tree.get_children())
-        
         # تحديد القسم المختار
         category_id = self.get_selected_category_id()
         
-        products = ProductController.get_all_products(category_id=category_id)
-        for product in products:
-            self.products_tree.insert(
-                "",
-                "end",
-                values=(
-                    product['name'],
-                    f"{product['sell_price']:.2f}",
-                    product['stock'],
-                    product['barcode'] or ""
-                ),
-                tags=(product['id'],)
-            )
+        self.search_dispatcher.run_sync("", category_id)
     
     def search_products(self):
         """البحث عن المنتجات"""
         query = self.search_entry.get().strip()
         category_id = self.get_selected_category_id()
         
-        self.products_tree.delete(*self.products_tree.get_children())
-        
-        products = ProductController.get_all_products(query, category_id)
-        for product in products:
-            self.products_tree.insert(
-                "",
-                "end",
-                values=(
-                    product['name'],
-                    f"{product['sell_price']:.2f}",
-                    product['stock'],
-                    product['barcode'] or ""
-                ),
-                tags=(product['id'],)
-            )
+        self.search_dispatcher.run_now(query, category_id)
+    
+    def display_products(self, products):
+        """عرض المنتجات في الجدول"""
+        self.catalog_version = ProductController.get_catalog_version()
+        self.products_tree.set_data(products)
+    
+    def format_product_row(self, index, product):
+        """قيم صف المنتج في الجدول"""
+        return (
+            product['name'],
+            f"{product['sell_price']:.2f}",
+            product['stock'],
+            product['barcode'] or ""
+        ), ()
     
     def add_first_product(self):
         """إضافة أول منتج من نتائج البحث"""
-        children = self.products_tree.get_children()
-        if children:
-            self.products_tree.selection_set(children[0])
+        # Enter بعد مسح الباركود مباشرة: تنفيذ البحث المنتظر الآن بدلاً من النتائج القديمة
+        if self.search_dispatcher.has_pending():
+            self.search_dispatcher.run_sync(
+                self.search_entry.get().strip(), self.get_selected_category_id()
+            )
+        
+        if self.products_tree.select_index(0):
             self.add_to_cart()
     
     def add_to_cart(self):
         """إضافة منتج للسلة"""
-        selection = self.products_tree.selection()
-        if not selection:
+        selected = self.products_tree.selected_record()
+        if not selected:
             return
         
-        product_id = int(self.products_tree.item(selection[0])['tags'][0])
+        product_id = selected['id']
         product = ProductController.get_product_by_id(product_id)
         
         if not product:
@@ -575,48 +587,24 @@ class POSView(ctk.CTkFrame):
         
         def process_custom_sale():
             """معالجة البيع المنفرد"""
-            reason = reason_entry.get().strip()
-            if not reason:
-                show_error("خطأ", "يرجى إدخال السبب/الوصف")
-                return
-            
-            try:
-                amount = float(amount_entry.get() or 0)
-                if amount <= 0:
-                    show_error("خطأ", "المبلغ يجب أن يكون أكبر من صفر")
-                    return
-            except ValueError:
-                show_error("خطأ", "يرجى إدخال مبلغ صحيح")
+            # إنشاء عملية بيع خاصة (بدون منتج محدد)
+            result = SalesController.create_quick_sale(
+                self.current_user['id'], reason_entry.get(), amount_entry.get()
+            )
+            if not result['success']:
+                show_error("خطأ", result['message'])
                 return
             
-            # إنشاء عملية بيع خاصة (بدون منتج محدد)
-            from database.connection import db
+            show_info(
+                "نجاح",
+                f"تم تسجيل العملية بنجاح!\n"
+                f"السبب: {result['reason']}\n"
+                f"المبلغ: {result['amount']:.2f} جنيه\n"
+                f"رقم الفاتورة: {result['invoice_number']}"
+            )
             
-            try:
-                # إنشاء رقم فاتورة
-                invoice_number = f"CUSTOM-{db.fetch_one('SELECT COUNT(*) as count FROM sales')['count'] + 1:06d}"
-                
-                # إدخال البيع في قاعدة البيانات
-                db.execute(
-                    """INSERT INTO sales 
-                       (invoice_number, user_id, total_amount, discount, payment_method, notes)
-                       VALUES (?, ?, ?, 0, 'نقدي', ?)""",
-                    (invoice_number, self.current_user['id'], amount, f"بيع منفرد: {reason}")
-                )
-                
-                show_info(
-                    "نجاح",
-                    f"تم تسجيل العملية بنجاح!\n"
-                    f"السبب: {reason}\n"
-                    f"المبلغ: {amount:.2f} جنيه\n"
-                    f"رقم الفاتورة: {invoice_number}"
-                )
-                
-                dialog.destroy()
-                self.update_daily_stats()  # تحديث الإحصائيات
-                
-            except Exception as e:
-                show_error("خطأ", f"فشل في حفظ العملية: {str(e)}")
+            dialog.destroy()
+            self.update_daily_stats()  # تحديث الإحصائيات
         
         # ربط Enter بالحقول
         reason_entry.bind('<Return>', lambda e: amount_entry.focus())
@@ -711,12 +699,12 @@ class POSView(ctk.CTkFrame):
     
     def update_daily_stats(self):
         """تحديث إحصائيات اليوم"""
-        # مبيعات اليوم
-        sales_summary = SalesController.get_sales_summary()
-        today_sales = sales_summary.get('total_revenue') or 0
+        self.stats_stamp = data_versions.stamp('sales', 'returns', 'expenses')
         
-        # مصاريف اليوم
-        today_expenses = ExpenseController.get_today_total()
+        # مبيعات ومصاريف اليوم (قراءة واحدة من الملخص اليومي)
+        kpis = SalesController.get_daily_kpis()
+        today_sales = kpis['revenue']
+        today_expenses = kpis['expenses']
         
         # المبلغ في الدرج
         drawer_amount = today_sales - today_expenses
@@ -859,17 +847,9 @@ class POSView(ctk.CTkFrame):
     def open_returns_dialog(self):
         """فتح نافذة المرتجعات"""
         from ui.components.dialogs import ReturnsDialog
-        from database.connection import db
         
         # الحصول على مبيعات آخر أسبوع (بما فيها اليوم)
-        today_sales = db.fetch_all(
-            """SELECT s.id, s.invoice_number, s.total_amount, s.created_at,
-                      c.name as customer_name
-               FROM sales s
-               LEFT JOIN customers c ON s.customer_id = c.id
-               WHERE DATE(s.created_at) >= DATE('now', '-7 days')
-               ORDER BY s.created_at DESC"""
-        )
+        today_sales = SalesController.get_recent_sales('week')
         
         if not today_sales:
             show_info("معلومة", "لا توجد مبيعات في آخر أسبوع")
@@ -880,18 +860,10 @@ class POSView(ctk.CTkFrame):
         
         if result:
             # معالجة المرتجعات
-            success_count = 0
-            for item in result:
-                response = SalesController.return_sale_item(
-                    sale_id=item['sale_id'],
-                    product_id=item['product_id'],
-                    quantity=item['quantity']
-                )
-                if response['success']:
-                    success_count += 1
+            response = SalesController.return_sale_items(result, self.current_user['id'])
             
-            if success_count > 0:
-                show_info("نجاح", f"تم استرجاع {success_count} منتج بنجاح")
+            if response['success']:
+                show_info("نجاح", response['message'])
                 self.update_daily_stats()
             else:
-                show_error("خطأ", "فشل استرجاع المنتجات")
+                show_error("خطأ", response['message'])
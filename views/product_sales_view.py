@@ -2,11 +2,13 @@
 شاشة تقارير مبيعات المنتجات
 """
 import customtkinter as ctk
-from tkinter import ttk
 from config import COLORS
-from database.connection import db
-from utils.helpers import format_currency
+from controllers.product_controller import ProductController
+from controllers.sales_controller import SalesController
+from utils.helpers import format_currency, normalize_arabic
 from ui.components.cards import StatCard
+from ui.search_dispatcher import SearchDispatcher
+from ui.virtual_table import VirtualTreeview
 from datetime import datetime, timedelta
 
 
@@ -120,6 +122,9 @@ class ProductSalesView(ctk.CTkFrame):
             width=300
         )
         self.search_entry.pack(side="right", padx=5)
+        
+        # البحث أثناء الكتابة في الخلفية
+        self.search_dispatcher = SearchDispatcher(self, self.match_rows, self.display_data)
         self.search_entry.bind('<KeyRelease>', lambda e: self.filter_data())
         
         # الجدول
@@ -130,31 +135,25 @@ class ProductSalesView(ctk.CTkFrame):
         columns = ("الترتيب", "المنتج", "الفئة", "القطع المباعة", "الإيرادات", 
                   "التكلفة", "الأرباح", "هامش الربح %")
         
-        self.tree = ttk.Treeview(
+        # تنسيق الأعمدة (الترتيب من أزرار الترتيب أعلى الجدول)
+        column_widths = [60, 200, 120, 100, 120, 120, 120, 100]
+        self.tree = VirtualTreeview(
             table_frame,
             columns=columns,
-            show="headings",
-            height=15
+            formatter=self.format_row,
+            widths=column_widths
         )
+        self.tree.pack(fill="both", expand=True, padx=10, pady=10)
         
-        # تنسيق الأعمدة
-        column_widths = [60, 200, 120, 100, 120, 120, 120, 100]
-        for i, col in enumerate(columns):
-            self.tree.heading(col, text=col)
-            self.tree.column(col, width=column_widths[i], anchor="center")
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree.pack(side="right", fill="both", expand=True, padx=10, pady=10)
-        scrollbar.pack(side="left", fill="y", pady=10)
+        # تنسيق الألوان
+        self.tree.tag_configure('profit', foreground=COLORS['success'])
+        self.tree.tag_configure('loss', foreground=COLORS['danger'])
         
         # تخزين البيانات الكاملة
         self.all_data = []
     
     def get_date_range(self, period):
-        """حساب نطاق التاريخ حسب الفترة"""
+        """حساب نطاق الأيام حسب الفترة (None, None لكل الفترة)"""
         end_date = datetime.now()
         
         if period == "اليوم":
@@ -183,64 +182,32 @@ class ProductSalesView(ctk.CTkFrame):
         else:  # كل الفترة
             return None, None
         
-        return start_date.strftime('%Y-%m-%d %H:%M:%S'), end_date.strftime('%Y-%m-%d %H:%M:%S')
+        return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
     
     def on_period_change(self, period):
         """تغيير الفترة الزمنية"""
         self.current_period = period
         self.load_data()
     
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة"""
+        self.load_data()
+    
+    def destroy(self):
+        """إلغاء البحث الجاري قبل حذف الشاشة"""
+        self.search_dispatcher.cancel()
+        super().destroy()
+    
     def load_data(self):
         """تحميل بيانات المبيعات حسب المنتج"""
         start_date, end_date = self.get_date_range(self.current_period)
         
-        # استعلام SQL لحساب المبيعات حسب المنتج
-        if start_date and end_date:
-            query = """
-                SELECT 
-                    p.id,
-                    p.name as product_name,
-                    c.name as category_name,
-                    SUM(si.quantity) as total_quantity,
-                    SUM(si.total_price) as total_revenue,
-                    SUM(si.quantity * si.cost_at_sale) as total_cost,
-                    SUM((si.price_at_sale - si.cost_at_sale) * si.quantity) as total_profit
-                FROM sale_items si
-                JOIN products p ON si.product_id = p.id
-                LEFT JOIN categories c ON p.category_id = c.id
-                JOIN sales s ON si.sale_id = s.id
-                WHERE s.created_at BETWEEN ? AND ?
-                GROUP BY p.id, p.name, c.name
-                HAVING total_quantity > 0
-            """
-            raw_data = db.fetch_all(query, (start_date, end_date))
-        else:
-            query = """
-                SELECT 
-                    p.id,
-                    p.name as product_name,
-                    c.name as category_name,
-                    SUM(si.quantity) as total_quantity,
-                    SUM(si.total_price) as total_revenue,
-                    SUM(si.quantity * si.cost_at_sale) as total_cost,
-                    SUM((si.price_at_sale - si.cost_at_sale) * si.quantity) as total_profit
-                FROM sale_items si
-                JOIN products p ON si.product_id = p.id
-                LEFT JOIN categories c ON p.category_id = c.id
-                GROUP BY p.id, p.name, c.name
-                HAVING total_quantity > 0
-            """
-            raw_data = db.fetch_all(query)
-        
-        # تحويل sqlite3.Row إلى قواميس وحساب هامش الربح
-        self.all_data = []
-        for row in raw_data:
-            item = dict(row)
-            if item['total_revenue'] > 0:
-                item['profit_margin'] = (item['total_profit'] / item['total_revenue']) * 100
-            else:
-                item['profit_margin'] = 0
-            self.all_data.append(item)
+        # مجاميع الفترة وهامش الربح من جدول مبيعات المنتجات اليومية
+        # (سجلات Product تُعرض وتُرتب مباشرة بدون تحويلها إلى قواميس)
+        self.all_data = SalesController.get_product_sales(start_date, end_date)
+        
+        # نتيجة بحث جارٍ على البيانات السابقة لم تعد صالحة
+        self.search_dispatcher.cancel()
         
         # ترتيب البيانات
         self.sort_data(self.current_sort, reload=False)
@@ -276,47 +243,43 @@ class ProductSalesView(ctk.CTkFrame):
     
     def filter_data(self):
         """تصفية البيانات حسب البحث"""
-        search_term = self.search_entry.get().strip().lower()
+        search_term = self.search_entry.get().strip()
         
         if not search_term:
+            self.search_dispatcher.cancel()
             self.sort_data(self.current_sort, reload=False)
             return
         
-        filtered_data = [
+        self.search_dispatcher.schedule(search_term)
+    
+    def match_rows(self, search_term):
+        """الصفوف المطابقة لنص البحث (تُستدعى في خيط البحث)"""
+        # أسماء المنتجات من فهرس البحث، والأقسام بمطابقة النص بعد التوحيد
+        matched_ids = set(ProductController.search_product_ids(search_term))
+        category_term = normalize_arabic(search_term)
+        
+        return [
             item for item in self.all_data
-            if search_term in item['product_name'].lower() or 
-               (item['category_name'] and search_term in item['category_name'].lower())
+            if item['id'] in matched_ids or
+               (item['category_name'] and category_term in normalize_arabic(item['category_name']))
         ]
-        
-        self.display_data(filtered_data)
     
     def display_data(self, data):
         """عرض البيانات في الجدول"""
-        # مسح الجدول
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # إضافة البيانات
-        for i, item in enumerate(data, 1):
-            self.tree.insert(
-                "",
-                "end",
-                values=(
-                    i,
-                    item['product_name'],
-                    item['category_name'] or "غير مصنف",
-                    f"{item['total_quantity']:,}",
-                    format_currency(item['total_revenue']),
-                    format_currency(item['total_cost']),
-                    format_currency(item['total_profit']),
-                    f"{item['profit_margin']:.1f}%"
-                ),
-                tags=('profit' if item['total_profit'] > 0 else 'loss',)
-            )
-        
-        # تنسيق الألوان
-        self.tree.tag_configure('profit', foreground=COLORS['success'])
-        self.tree.tag_configure('loss', foreground=COLORS['danger'])
+        self.tree.set_data(data)
+    
+    def format_row(self, index, item):
+        """قيم صف المنتج في الجدول (الترتيب يبدأ من 1)"""
+        return (
+            index + 1,
+            item['product_name'],
+            item['category_name'] or "غير مصنف",
+            f"{item['total_quantity']:,}",
+            format_currency(item['total_revenue']),
+            format_currency(item['total_cost']),
+            format_currency(item['total_profit']),
+            f"{item['profit_margin']:.1f}%"
+        ), ('profit' if item['total_profit'] > 0 else 'loss',)
     
     def update_statistics(self):
         """تحديث البطاقات الإحصائية"""
@@ -5,6 +5,7 @@ import customtkinter as ctk
 from config import COLORS
 from controllers.purchase_controller import PurchaseController
 from controllers.product_controller import ProductController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import show_info, show_error, ask_yes_no
 from utils.validators import format_currency
 
@@ -161,8 +162,19 @@ class PurchasesView(ctk.CTkFrame):
         )
         self.purchases_frame.pack(fill="both", expand=True, padx=10, pady=10)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('purchases', 'suppliers'), ProductController.get_catalog_version()
+    
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_data()
+    
     def load_data(self):
         """تحميل البيانات"""
+        self.loaded_stamp = self.data_stamp()
+        
         # تحميل المنتجات
         products = ProductController.get_all_products()
         if products:
@@ -2,15 +2,18 @@
 شاشة التقارير المتقدمة - نسخة احترافية
 """
 import customtkinter as ctk
+from tkinter import filedialog
 from datetime import datetime, timedelta
 from config import COLORS
 from controllers.sales_controller import SalesController
-from controllers.product_controller import ProductController
 from controllers.trader_controller import TraderController
 from controllers.expense_controller import ExpenseController
 from controllers.purchase_controller import PurchaseController
 from ui.components.cards import StatCard
+from ui.components.dialogs import show_error, show_info
 from utils.validators import format_currency
+from controllers.report_engine import ReportEngine
+from ui.background import BackgroundStream
 
 
 class ReportsView(ctk.CTkFrame):
@@ -21,6 +24,16 @@ class ReportsView(ctk.CTkFrame):
         
         self.current_user = current_user
         self.current_period = "اليوم"
+        self.report_sections = {}
+        self.report_stream = BackgroundStream(self, self.show_section)
+        
+        # تصدير سطور المبيعات في الخلفية (دفعتان على الأكثر تنتظران العرض)
+        self.export_stream = BackgroundStream(
+            self, self.on_export_progress,
+            on_done=self.on_export_done, on_error=self.on_export_error,
+            max_pending=2
+        )
+        self.export_count = 0
         
         self.create_widgets()
         self.load_reports()
@@ -49,6 +62,17 @@ class ReportsView(ctk.CTkFrame):
         )
         refresh_btn.pack(side="left", padx=5)
         
+        # زر تصدير سطور مبيعات الفترة
+        self.export_btn = ctk.CTkButton(
+            header,
+            text="📤 تصدير المبيعات (CSV)",
+            command=self.export_sales,
+            fg_color=COLORS['primary'],
+            width=170,
+            height=35
+        )
+        self.export_btn.pack(side="left", padx=5)
+        
         # شريط اختيار الفترة الزمنية
         period_frame = ctk.CTkFrame(self, fg_color=COLORS['card_bg'])
         period_frame.pack(fill="x", padx=20, pady=5)
@@ -304,83 +328,97 @@ class ReportsView(ctk.CTkFrame):
         
         return start_date, end_date
     
-    def load_reports(self):
-        """تحميل جميع التقارير"""
-        start_date, end_date = self.get_date_range()
-        
-        self.load_summary(start_date, end_date)
-        self.load_sales_report(start_date, end_date)
-        self.load_expenses_report(start_date, end_date)
-        self.load_purchases_report(start_date, end_date)
-        self.load_traders_report(start_date, end_date)
-        self.load_inventory_report()
+    def on_activate(self):
+        """تحديث التقارير عند العودة للشاشة (في الخلفية)"""
+        self.load_reports()
     
-    def load_summary(self, start_date, end_date):
-        """تحميل الملخص السريع"""
-        from database.connection import db
-        
-        # عدد المبيعات والإيرادات
-        sales_data = db.fetch_one(
-            """SELECT COUNT(*) as count, 
-                      COALESCE(SUM(total_amount), 0) as revenue
-               FROM sales 
-               WHERE DATE(created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
-        )
-        
-        sales_count = sales_data['count'] or 0
-        revenue = sales_data['revenue'] or 0
+    def destroy(self):
+        """إيقاف حساب التقارير والتصدير الجاري قبل حذف الشاشة"""
+        self.report_stream.cancel()
+        self.export_stream.cancel()
+        super().destroy()
+    
+    def export_sales(self):
+        """تصدير سطور مبيعات الفترة المحددة إلى ملف CSV"""
+        if self.export_stream.is_running():
+            return
         
-        # حساب الأرباح من sale_items
-        profit_data = db.fetch_one(
-            """SELECT COALESCE(SUM((si.price_at_sale - si.cost_at_sale) * si.quantity), 0) as profit
-               FROM sale_items si
-               JOIN sales s ON s.id = si.sale_id
-               WHERE DATE(s.created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
+        start_date, end_date = self.get_date_range()
+        filename = filedialog.asksaveasfilename(
+            title="حفظ ملف التصدير",
+            defaultextension=".csv",
+            initialfile=f"sales_{start_date}_{end_date}.csv",
+            filetypes=[("CSV", "*.csv")]
         )
+        if not filename:
+            return
         
-        profit = profit_data['profit'] or 0
+        self.export_count = 0
+        self.export_btn.configure(state="disabled", text="⏳ جاري التصدير...")
+        self.export_stream.start(SalesController.export_sale_lines, filename, start_date, end_date)
+    
+    def on_export_progress(self, written):
+        """تحديث عدد السطور المكتوبة"""
+        self.export_count = written
+        self.export_btn.configure(text=f"⏳ {written} سطر")
+    
+    def on_export_done(self):
+        self.export_btn.configure(state="normal", text="📤 تصدير المبيعات (CSV)")
+        show_info("نجاح", f"تم تصدير {self.export_count} سطر مبيعات")
+    
+    def on_export_error(self, error):
+        self.export_btn.configure(state="normal", text="📤 تصدير المبيعات (CSV)")
+        show_error("خطأ", f"فشل التصدير: {error}")
+    
+    def load_reports(self):
+        """تحميل جميع التقارير في الخلفية وعرض كل قسم فور جاهزيته"""
+        start_date, end_date = self.get_date_range()
         
-        # المصروفات
-        expenses_data = db.fetch_one(
-            """SELECT COALESCE(SUM(amount), 0) as total
-               FROM expenses 
-               WHERE DATE(created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
-        )
+        # بدء تشغيل جديد يلغي نتائج الفترة السابقة إن لم تكتمل
+        self.report_sections = {}
+        self.report_stream.start(ReportEngine.iter_report, start_date, end_date)
+    
+    def show_section(self, item):
+        """عرض قسم من أقسام التقرير عند وصوله من المحرك"""
+        section, data = item
+        self.report_sections[section] = data
+        
+        if section == 'sales':
+            self.show_sales_report(data)
+        elif section == 'profit':
+            self.show_traders_report(data)
+        elif section == 'cash':
+            self.show_expenses_report(data)
+            self.show_purchases_report(data)
+        elif section == 'inventory':
+            self.show_inventory_report(data)
+        
+        self.show_summary()
+    
+    def show_summary(self):
+        """تحديث الملخص السريع بما وصل من الأقسام"""
+        sales = self.report_sections.get('sales')
+        profit = self.report_sections.get('profit')
+        cash = self.report_sections.get('cash')
         
-        expenses = expenses_data['total'] or 0
+        if sales is not None:
+            self.sales_count_card.update_value(f"{sales['total_sales']}")
+            self.revenue_card.update_value(format_currency(sales['total_revenue']))
         
-        # صافي الربح
-        net_profit = profit - expenses
+        if cash is not None:
+            self.expenses_card.update_value(format_currency(cash['expenses_total']))
         
-        # هامش الربح
-        profit_margin = (net_profit / revenue * 100) if revenue > 0 else 0
+        if sales is None or profit is None or cash is None:
+            return
         
-        # تحديث البطاقات
-        self.sales_count_card.update_value(f"{sales_count}")
-        self.revenue_card.update_value(format_currency(revenue))
-        self.expenses_card.update_value(format_currency(expenses))
-        self.profit_card.update_value(format_currency(net_profit))
-        self.margin_card.update_value(f"{profit_margin:.1f}%")
+        summary = ReportEngine.summary(sales, profit, cash)
+        self.profit_card.update_value(format_currency(summary['net_profit']))
+        self.margin_card.update_value(f"{summary['profit_margin']:.1f}%")
     
-    def load_sales_report(self, start_date, end_date):
-        """تحميل إحصائيات المبيعات الرقمية فقط"""
-        from database.connection import db
+    def show_sales_report(self, sales_stats):
+        """عرض إحصائيات المبيعات الرقمية فقط"""
         self.sales_text.delete("1.0", "end")
-        sales_stats = db.fetch_one(
-            """SELECT 
-                COUNT(*) as total_sales,
-                COALESCE(SUM(total_amount), 0) as total_revenue,
-                COALESCE(AVG(total_amount), 0) as avg_sale,
-                COALESCE(MAX(total_amount), 0) as max_sale,
-                COALESCE(MIN(total_amount), 0) as min_sale
-               FROM sales 
-               WHERE DATE(created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
-        )
-        if not sales_stats or sales_stats['total_sales'] == 0:
+        if sales_stats['total_sales'] == 0:
             self.sales_text.insert("1.0", "📊 لا توجد مبيعات في هذه الفترة")
             return
         report = "📈 ملخص المبيعات الرقمي\n"
@@ -392,104 +430,52 @@ class ReportsView(ctk.CTkFrame):
         report += f"🔻 أصغر عملية: {format_currency(sales_stats['min_sale'])}\n"
         self.sales_text.insert("1.0", report)
     
-    def load_expenses_report(self, start_date, end_date):
-        """تحميل إحصائيات المصروفات الرقمية فقط"""
-        from database.connection import db
+    def show_expenses_report(self, cash):
+        """عرض إحصائيات المصروفات الرقمية فقط"""
         self.expenses_text.delete("1.0", "end")
-        expenses_stats = db.fetch_one(
-            """SELECT 
-                COUNT(*) as total_count,
-                COALESCE(SUM(amount), 0) as total_amount,
-                COALESCE(AVG(amount), 0) as avg_expense,
-                COALESCE(MAX(amount), 0) as max_expense
-               FROM expenses 
-               WHERE DATE(created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
-        )
-        if not expenses_stats or expenses_stats['total_count'] == 0:
+        if cash['expenses_count'] == 0:
             self.expenses_text.insert("1.0", "💰 لا توجد مصروفات في هذه الفترة")
             return
         report = "💸 ملخص المصروفات الرقمي\n"
         report += "═" * 40 + "\n\n"
-        report += f"🔢 عدد العمليات: {expenses_stats['total_count']}\n"
-        report += f"💰 إجمالي المصروفات: {format_currency(expenses_stats['total_amount'])}\n"
-        report += f"📊 متوسط المصروف: {format_currency(expenses_stats['avg_expense'])}\n"
-        report += f"🔝 أكبر مصروف: {format_currency(expenses_stats['max_expense'])}\n"
+        report += f"🔢 عدد العمليات: {cash['expenses_count']}\n"
+        report += f"💰 إجمالي المصروفات: {format_currency(cash['expenses_total'])}\n"
+        report += f"📊 متوسط المصروف: {format_currency(cash['avg_expense'])}\n"
+        report += f"🔝 أكبر مصروف: {format_currency(cash['max_expense'])}\n"
         self.expenses_text.insert("1.0", report)
     
-    def load_purchases_report(self, start_date, end_date):
-        """تحميل إحصائيات المشتريات الرقمية فقط"""
-        from database.connection import db
+    def show_purchases_report(self, cash):
+        """عرض إحصائيات المشتريات الرقمية فقط"""
         self.purchases_text.delete("1.0", "end")
-        purchases_stats = db.fetch_one(
-            """SELECT 
-                COUNT(*) as total_count,
-                COALESCE(SUM(total_amount), 0) as total_amount,
-                COALESCE(SUM(quantity), 0) as total_quantity,
-                COALESCE(AVG(cost_price), 0) as avg_cost
-               FROM purchases 
-               WHERE DATE(created_at) BETWEEN ? AND ?""",
-            (start_date, end_date)
-        )
-        if not purchases_stats or purchases_stats['total_count'] == 0:
+        if cash['purchases_count'] == 0:
             self.purchases_text.insert("1.0", "📦 لا توجد مشتريات في هذه الفترة")
             return
         report = "🛒 ملخص المشتريات الرقمي\n"
         report += "═" * 40 + "\n\n"
-        report += f"🔢 عدد العمليات: {purchases_stats['total_count']}\n"
-        report += f"💰 إجمالي التكلفة: {format_currency(purchases_stats['total_amount'])}\n"
-        report += f"📦 إجمالي الكميات: {purchases_stats['total_quantity']}\n"
-        report += f"📊 متوسط سعر الشراء: {format_currency(purchases_stats['avg_cost'])}\n"
+        report += f"🔢 عدد العمليات: {cash['purchases_count']}\n"
+        report += f"💰 إجمالي التكلفة: {format_currency(cash['purchases_total'])}\n"
+        report += f"📦 إجمالي الكميات: {cash['purchases_quantity']}\n"
+        report += f"📊 متوسط سعر الشراء: {format_currency(cash['avg_cost'])}\n"
         self.purchases_text.insert("1.0", report)
     
-    def load_traders_report(self, start_date, end_date):
-        """تحميل تقرير التجار الخارجيين الرقمي فقط"""
-        from database.connection import db
+    def show_traders_report(self, profit):
+        """عرض تقرير التجار الخارجيين الرقمي فقط"""
         self.traders_text.delete("1.0", "end")
-        traders = db.fetch_all(
-            """SELECT et.id, et.name, et.shop_percentage, et.trader_percentage,
-                      COUNT(DISTINCT s.id) as sales_count,
-                      COALESCE(SUM((si.price_at_sale - si.cost_at_sale) * si.quantity), 0) as total_profit
-               FROM external_traders et
-               LEFT JOIN products p ON p.external_trader_id = et.id
-               LEFT JOIN sale_items si ON si.product_id = p.id
-               LEFT JOIN sales s ON s.id = si.sale_id 
-                    AND DATE(s.created_at) BETWEEN ? AND ?
-               GROUP BY et.id""",
-            (start_date, end_date)
-        )
-        if not traders:
-            self.traders_text.insert("1.0", "لا توجد بيانات للتجار")
-            return
-        total_shop_share = 0
-        total_trader_share = 0
-        total_profit = 0
-        total_sales = 0
-        for trader in traders:
-            if trader['total_profit'] > 0:
-                shop_share = trader['total_profit'] * (trader['shop_percentage'] / 100)
-                trader_share = trader['total_profit'] * (trader['trader_percentage'] / 100)
-                total_shop_share += shop_share
-                total_trader_share += trader_share
-                total_profit += trader['total_profit']
-                total_sales += trader['sales_count']
         report = "🤝 ملخص أرباح التجار الخارجيين\n"
         report += "═" * 40 + "\n\n"
-        report += f"🔢 عدد عمليات البيع: {total_sales}\n"
-        report += f"💰 إجمالي أرباح التجار: {format_currency(total_profit)}\n"
-        report += f"🏪 إجمالي حصة المحل: {format_currency(total_shop_share)}\n"
-        report += f"🧑‍💼 إجمالي حصة التجار: {format_currency(total_trader_share)}\n"
+        report += f"🔢 عدد عمليات البيع: {profit['traders_sales']}\n"
+        report += f"💰 إجمالي أرباح التجار: {format_currency(profit['traders_profit'])}\n"
+        report += f"🏪 إجمالي حصة المحل: {format_currency(profit['shop_share'])}\n"
+        report += f"🧑‍💼 إجمالي حصة التجار: {format_currency(profit['trader_share'])}\n"
         self.traders_text.insert("1.0", report)
     
-    def load_inventory_report(self):
-        """تحميل ملخص المخزون الرقمي فقط"""
+    def show_inventory_report(self, inventory):
+        """عرض ملخص المخزون الرقمي فقط"""
         self.inventory_text.delete("1.0", "end")
-        inventory = ProductController.get_total_inventory_value()
-        total_cost = inventory.get('total_cost') or 0
-        total_sell = inventory.get('total_sell') or 0
-        expected_profit = inventory.get('expected_profit') or 0
-        products = ProductController.get_all_products()
-        items_count = len(products) if products else 0
+        total_cost = inventory['total_cost']
+        total_sell = inventory['total_sell']
+        expected_profit = inventory['expected_profit']
+        items_count = inventory['items_count']
         self.inv_cost_card.update_value(format_currency(total_cost))
         self.inv_value_card.update_value(format_currency(total_sell))
         self.inv_profit_card.update_value(format_currency(expected_profit))
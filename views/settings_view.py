@@ -1,10 +1,16 @@
 """
 شاشة الإعدادات
 """
+import os
 import customtkinter as ctk
+from tkinter import filedialog
 from config import COLORS, APP_NAME, APP_VERSION
 from controllers.auth_controller import AuthController
-from ui.components.dialogs import InputDialog, show_error, show_info
+from controllers.backup_controller import BackupController
+from controllers.report_engine import ReportEngine
+from database.backup import get_backup_dir
+from ui.background import BackgroundStream
+from ui.components.dialogs import InputDialog, show_error, show_info, ask_yes_no
 from database.connection import db
 
 
@@ -15,6 +21,10 @@ class SettingsView(ctk.CTkFrame):
         super().__init__(parent, fg_color=COLORS['bg'])
         
         self.current_user = current_user
+        
+        # النسخ الاحتياطي والاستعادة في خيط خلفي حتى لا تتوقف الواجهة
+        self.backup_stream = BackgroundStream(self, self.on_backup_done)
+        
         self.create_widgets()
     
     def create_widgets(self):
@@ -112,6 +122,17 @@ class SettingsView(ctk.CTkFrame):
                 height=40,
                 width=300
             ).pack(pady=10)
+            
+            ctk.CTkButton(
+                actions_frame,
+                text="📈 مراقبة الاستعلامات",
+                command=self.show_query_stats,
+                fg_color=COLORS['accent'],
+                height=40,
+                width=300
+            ).pack(pady=10)
+            
+            self.create_backup_section(actions_frame)
         
         ctk.CTkButton(
             actions_frame,
@@ -122,6 +143,95 @@ class SettingsView(ctk.CTkFrame):
             width=300
         ).pack(pady=(10, 20))
     
+    def create_backup_section(self, parent):
+        """أزرار النسخ الاحتياطي والاستعادة (للمدير فقط)"""
+        self.backup_button = ctk.CTkButton(
+            parent,
+            text="💾 نسخة احتياطية الآن",
+            command=self.create_backup,
+            fg_color=COLORS['primary'],
+            height=40,
+            width=300
+        )
+        self.backup_button.pack(pady=10)
+        
+        self.restore_button = ctk.CTkButton(
+            parent,
+            text="♻️ استعادة نسخة احتياطية",
+            command=self.restore_backup,
+            fg_color=COLORS['warning'],
+            height=40,
+            width=300
+        )
+        self.restore_button.pack(pady=10)
+        
+        self.backup_status = ctk.CTkLabel(
+            parent,
+            text=self.get_backup_status(),
+            font=("Arial", 11),
+            text_color=COLORS['text_secondary']
+        )
+        self.backup_status.pack(pady=(0, 10))
+    
+    def get_backup_status(self):
+        """وصف آخر نسخة احتياطية"""
+        backups = BackupController.get_backups()
+        if not backups:
+            return "لا توجد نسخ احتياطية بعد"
+        return f"آخر نسخة: {backups[0]['name']} - عدد النسخ: {len(backups)}"
+    
+    def set_backup_busy(self, message):
+        """تعطيل الأزرار أثناء العملية"""
+        self.backup_button.configure(state="disabled")
+        self.restore_button.configure(state="disabled")
+        self.backup_status.configure(text=message)
+    
+    def create_backup(self):
+        """إنشاء نسخة احتياطية دون إيقاف البيع"""
+        self.set_backup_busy("⏳ جاري إنشاء النسخة الاحتياطية...")
+        self.backup_stream.start(self._run_backup_task, BackupController.create_backup)
+    
+    def restore_backup(self):
+        """استعادة نسخة احتياطية بعد التأكيد"""
+        path = filedialog.askopenfilename(
+            title="اختر النسخة الاحتياطية",
+            initialdir=get_backup_dir(),
+            filetypes=[("نسخ احتياطية", "*.db.gz *.db"), ("جميع الملفات", "*.*")]
+        )
+        if not path:
+            return
+        
+        if not ask_yes_no(
+            "تأكيد الاستعادة",
+            "سيتم استبدال جميع البيانات الحالية بمحتوى النسخة المختارة.\n"
+            "(تُحفظ نسخة من الحالة الحالية قبل الاستبدال)\n\nهل تريد المتابعة؟"
+        ):
+            return
+        
+        self.set_backup_busy("⏳ جاري فحص النسخة واستعادتها...")
+        self.backup_stream.start(self._run_backup_task, BackupController.restore_backup, path)
+    
+    @staticmethod
+    def _run_backup_task(func, *args):
+        """تشغيل عملية النسخ أو الاستعادة في الخيط الخلفي"""
+        yield func(*args)
+    
+    def on_backup_done(self, response):
+        """عرض نتيجة النسخ أو الاستعادة"""
+        self.backup_button.configure(state="normal")
+        self.restore_button.configure(state="normal")
+        self.backup_status.configure(text=self.get_backup_status())
+        
+        if response['success']:
+            show_info("نجاح", response['message'])
+        else:
+            show_error("خطأ", response['message'])
+    
+    def destroy(self):
+        """تجاهل نتيجة أي عملية جارية قبل حذف الشاشة"""
+        self.backup_stream.cancel()
+        super().destroy()
+    
     def change_password(self):
         """تغيير كلمة المرور"""
         fields = [
@@ -171,18 +281,45 @@ class SettingsView(ctk.CTkFrame):
     
     def show_db_stats(self):
         """عرض إحصائيات قاعدة البيانات"""
-        stats = []
-        
-        tables = ['users', 'products', 'customers', 'external_traders', 
-                 'sales', 'categories', 'expenses']
-        
-        for table in tables:
-            count = db.fetch_one(f"SELECT COUNT(*) as count FROM {table}")
-            stats.append(f"{table}: {count['count']}")
+        stats = [f"{table}: {count}" for table, count in ReportEngine.table_counts().items()]
         
         message = "📊 إحصائيات قاعدة البيانات:\n\n" + "\n".join(stats)
         show_info("إحصائيات", message)
     
+    def show_query_stats(self):
+        """تفعيل مراقبة الاستعلامات، أو عرض عدد استعلامات كل شاشة وحفظ التفاصيل"""
+        stats = db.stats
+        
+        if not stats.enabled:
+            if ask_yes_no(
+                "مراقبة الاستعلامات",
+                f"تفعيل تسجيل زمن كل استعلام وعدد استعلامات كل شاشة؟\n"
+                f"(الاستعلامات الأبطأ من {stats.slow_ms}ms تُكتب في {stats.slow_log})"
+            ):
+                stats.reset()
+                db.set_instrumentation(True)
+                show_info("مراقبة الاستعلامات", "تم التفعيل. تنقّل بين الشاشات ثم عد إلى هنا لعرض النتائج.")
+            return
+        
+        snapshot = stats.snapshot()
+        path = stats.dump(os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "query_stats.json"))
+        
+        screens = sorted(snapshot['screens'].items(), key=lambda item: -item[1]['total'])
+        lines = [f"{screen}: {data['total']} استعلام" for screen, data in screens]
+        lines.append("")
+        lines.append("الأعلى زمناً:")
+        lines += [
+            f"{query['total_ms']:.0f}ms ({query['count']}×) {query['sql'][:60]}"
+            for query in snapshot['queries'][:5]
+        ]
+        lines.append("")
+        lines.append(f"التفاصيل في: {path}")
+        show_info("مراقبة الاستعلامات", "\n".join(lines))
+        
+        if ask_yes_no("مراقبة الاستعلامات", "إيقاف المراقبة وتصفير الإحصائيات؟"):
+            db.set_instrumentation(False)
+            stats.reset()
+    
     def show_about(self):
         """عن النظام"""
         message = f"""
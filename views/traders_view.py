@@ -5,8 +5,11 @@ import customtkinter as ctk
 from tkinter import ttk
 from config import COLORS
 from controllers.trader_controller import TraderController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import InputDialog, show_error, show_info, ask_yes_no
 from ui.components.cards import StatCard
+from ui.search_dispatcher import SearchDispatcher
+from utils.helpers import get_previous_month_range
 
 
 class TradersView(ctk.CTkFrame):
@@ -42,7 +45,15 @@ class TradersView(ctk.CTkFrame):
             width=300
         )
         self.search_entry.pack(side="right", padx=5)
-        self.search_entry.bind('<KeyRelease>', lambda e: self.load_data())
+        
+        # البحث أثناء الكتابة في الخلفية
+        self.search_dispatcher = SearchDispatcher(
+            self, TraderController.get_all_traders, self.display_data
+        )
+        self.search_entry.bind(
+            '<KeyRelease>',
+            lambda e: self.search_dispatcher.schedule(self.search_entry.get().strip())
+        )
         
         ctk.CTkButton(
             toolbar,
@@ -64,6 +75,13 @@ class TradersView(ctk.CTkFrame):
             fg_color=COLORS['success']
         ).pack(side="left", padx=5)
         
+        ctk.CTkButton(
+            toolbar,
+            text="📅 تسوية الشهر السابق",
+            command=self.close_last_month,
+            fg_color=COLORS['success']
+        ).pack(side="left", padx=5)
+        
         ctk.CTkButton(
             toolbar,
             text="🗑️ حذف",
@@ -93,11 +111,28 @@ class TradersView(ctk.CTkFrame):
         self.tree.pack(side="right", fill="both", expand=True, padx=10, pady=10)
         scrollbar.pack(side="left", fill="y", pady=10)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('external_traders')
+    
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_data()
+    
+    def destroy(self):
+        """إلغاء البحث الجاري قبل حذف الشاشة"""
+        self.search_dispatcher.cancel()
+        super().destroy()
+    
     def load_data(self):
         """تحميل البيانات"""
+        self.loaded_stamp = self.data_stamp()
         query = self.search_entry.get().strip()
-        traders = TraderController.get_all_traders(query)
-        
+        self.search_dispatcher.run_sync(query)
+    
+    def display_data(self, traders):
+        """عرض التجار في الجدول"""
         self.tree.delete(*self.tree.get_children())
         
         for trader in traders:
@@ -168,6 +203,35 @@ class TradersView(ctk.CTkFrame):
         else:
             show_error("خطأ", "لم يتم العثور على بيانات")
     
+    def close_last_month(self):
+        """إغلاق تسوية الشهر السابق: تُحفظ أرقامه ولا يُعاد حسابها بعد ذلك"""
+        start_date, end_date = get_previous_month_range()
+        
+        if TraderController.get_settlement_snapshot(start_date, end_date):
+            if not ask_yes_no("تأكيد", f"الفترة {start_date} - {end_date} مغلقة بالفعل.\nهل تريد إعادة إغلاقها بالأرقام الحالية؟"):
+                return
+        
+        response = TraderController.close_settlement_period(start_date, end_date)
+        if not response['success']:
+            show_error("خطأ", response['message'])
+            return
+        
+        # أكبر حصص التجار في الفترة (من اللقطة المحفوظة)
+        report = TraderController.get_all_traders_report(start_date, end_date)
+        traders = sorted((row for row in report if row['total_sales']), key=lambda row: -row['trader_share'])
+        lines = [
+            f"{row['trader_name']}: ربح {row['total_profit']:.2f} - حصة التاجر {row['trader_share']:.2f} جنيه"
+            for row in traders[:15]
+        ]
+        if len(traders) > 15:
+            lines.append(f"... و{len(traders) - 15} تاجر آخر")
+        
+        show_info(
+            "تسوية التجار",
+            f"{response['message']}\n{start_date} - {end_date}\n\n"
+            + ("\n".join(lines) or "لا توجد مبيعات للتجار في هذه الفترة")
+        )
+    
     def delete_trader(self):
         """حذف تاجر"""
         selection = self.tree.selection()
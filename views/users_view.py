@@ -4,6 +4,7 @@
 import customtkinter as ctk
 from config import COLORS
 from controllers.auth_controller import AuthController
+from controllers.data_versions import data_versions
 from ui.components.dialogs import show_info, show_error, ask_yes_no
 from utils.validators import format_currency
 
@@ -57,8 +58,19 @@ class UsersView(ctk.CTkFrame):
         )
         self.users_frame.pack(fill="both", expand=True)
     
+    def data_stamp(self):
+        """ختم بيانات الشاشة (يتغير عند تعديل الجداول المعروضة)"""
+        return data_versions.stamp('users')
+    
+    def on_activate(self):
+        """تحديث البيانات عند العودة للشاشة إذا تغيّرت بياناتها"""
+        if self.data_stamp() != self.loaded_stamp:
+            self.load_users()
+    
     def load_users(self):
         """تحميل قائمة المستخدمين"""
+        self.loaded_stamp = self.data_stamp()
+        
         # مسح القائمة
         for widget in self.users_frame.winfo_children():
             widget.destroy()